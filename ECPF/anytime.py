@@ -0,0 +1,153 @@
+"""
+Defines an anytime search over the product of a ValueFilter's value iterators.
+
+Candidates of every position are ranked by how close they bring the calculation function to the target when the
+other positions hold their median value, and the product is visited by increasing sum of ranks, so the most
+promising permutations are evaluated first. The search can stop after a time or evaluation budget and still
+return the best results found so far.
+"""
+
+from typing import Tuple, List, Sequence, Callable, Iterator, Optional, Any
+import functools
+import operator
+import math
+import time
+
+import numpy as np  # type: ignore
+
+from ECPF.component_array import ComponentArray
+from ECPF.result_store import TopKResults
+from ECPF.vectorized import apply_elementwise
+
+
+def _compositions(total: int, limits: Sequence[int]) -> Iterator[Tuple[int, ...]]:
+    """
+    Every tuple of ranks summing to total, with rank p below limits[p], in lexicographic order
+    """
+    if len(limits) == 1:
+        if total < limits[0]:
+            yield total,
+        return
+
+    rest_max = sum(limit - 1 for limit in limits[1:])
+    for first in range(max(0, total - rest_max), min(limits[0] - 1, total) + 1):
+        for rest in _compositions(total - first, limits[1:]):
+            yield (first,) + rest
+
+
+def rank_sum_order(sizes: Sequence[int]) -> Iterator[Tuple[int, ...]]:
+    """
+    Every tuple of ranks of the product of sizes, by increasing sum of ranks
+    """
+    if len(sizes) == 0:
+        yield ()
+        return
+    if min(sizes) == 0:
+        return
+
+    for total in range(sum(size - 1 for size in sizes) + 1):
+        yield from _compositions(total, sizes)
+
+
+class AnytimeSearch:
+    """
+    Searches the product of the candidate positions in a good first order, within optional budgets.
+
+    Like the vectorized mode, the calculation function and filters are called with the nominal float values.
+    """
+
+    def __init__(self,
+                 candidates: List[ComponentArray],
+                 calculation_function: Callable[..., Any],
+                 filters: Sequence[Callable[..., bool]],
+                 target_value: float,
+                 results: TopKResults,
+                 time_budget: Optional[float] = None,
+                 max_evaluations: Optional[int] = None):
+
+        self.candidates = candidates
+        self.calculation_function = calculation_function
+        self.filters = tuple(filters)
+        self.target_value = float(target_value)
+        self.results = results
+
+        # The search stops after time_budget seconds or max_evaluations evaluated permutations, whichever comes first
+        self.time_budget = time_budget
+        self.max_evaluations = max_evaluations
+
+        sizes = [len(c) for c in candidates]
+        self.strides: List[int] = [functools.reduce(operator.mul, sizes[p + 1:], 1) for p in range(len(sizes))]
+        self.total: int = functools.reduce(operator.mul, sizes, 1)
+
+        self.tested = 0
+        self.filtered = 0
+
+        # Whether every permutation was evaluated before a budget ran out
+        self.complete = False
+
+    @property
+    def coverage(self) -> float:
+        """
+        The fraction of the permutations that were evaluated
+        """
+        return self.tested / self.total if self.total > 0 else 1.0
+
+    def _ranked_indices(self) -> List[np.ndarray]:
+        """
+        The candidate indices of every position, from the most to the least promising
+        """
+        medians = [float(np.median(c.nominal)) if len(c) > 0 else 0.0 for c in self.candidates]
+
+        ranked = []
+        for position, candidate in enumerate(self.candidates):
+            arguments = [
+                candidate.nominal if p == position else np.full(len(candidate), median)
+                for p, median in enumerate(medians)
+            ]
+            try:
+                with np.errstate(all="ignore"):
+                    values = apply_elementwise(self.calculation_function, arguments, len(candidate))
+                    errors = np.abs((self.target_value - values) / self.target_value)
+            except (ArithmeticError, TypeError, ValueError):
+                errors = np.zeros(len(candidate))
+            ranked.append(np.argsort(np.where(np.isnan(errors), np.inf, errors), kind="stable"))
+        return ranked
+
+    def _budget_exhausted(self, deadline: Optional[float]) -> bool:
+        if self.max_evaluations is not None and self.tested >= self.max_evaluations:
+            return True
+        return deadline is not None and time.perf_counter() >= deadline
+
+    def snapshots(self) -> Iterator[List[Tuple[float, Any, Tuple[Any, ...]]]]:
+        """
+        Run the search, yielding the sorted results (see TopKResults.items) every time they improve.
+        """
+        deadline = None if self.time_budget is None else time.perf_counter() + self.time_budget
+        ranked = self._ranked_indices()
+        nominal = [c.nominal for c in self.candidates]
+
+        for ranks in rank_sum_order([len(c) for c in self.candidates]):
+            if self._budget_exhausted(deadline):
+                return
+
+            indices = [int(r[rank]) for r, rank in zip(ranked, ranks)]
+            values = tuple(float(n[i]) for n, i in zip(nominal, indices))
+            self.tested += 1
+
+            if not all(f(*values) for f in self.filters):
+                self.filtered += 1
+                continue
+
+            value = self.calculation_function(*values)
+            error = math.fabs((self.target_value - float(value)) / self.target_value)
+            if math.isnan(error):
+                continue
+
+            flat_index = sum(i * stride for i, stride in zip(indices, self.strides))
+            if self.results.accepts(error, flat_index):
+                # Only the kept permutations are built into component objects
+                permutation = tuple(c.build(i) for c, i in zip(self.candidates, indices))
+                if self.results.add(permutation, value, error, order=flat_index):
+                    yield self.results.items()
+
+        self.complete = True
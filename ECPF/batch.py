@@ -0,0 +1,107 @@
+"""
+Defines batch searches of several ValueFilters over the same value iterators.
+
+A design usually needs several dividers and networks picked from the same inventory. Searching them as a batch
+enumerates the inventory once: the searches answered by the bisect solver share one sorted inventory, and every
+block of the permutation product is built once and evaluated by all the other searches, each keeping its own results.
+"""
+
+from typing import Tuple, List, Iterable, Sequence, Callable, Union, Any
+import contextlib
+
+from ECPF.value_filter import ValueFilter
+from ECPF.bisect_solver import BisectPlan, plan_bisect, _is_identity
+
+
+def populate_results_batch(value_filters: Sequence[ValueFilter], block_size: int = 2 ** 16,
+                           use_bisect: bool = True) -> None:
+    """
+    Populate the results of several ValueFilters sharing the same value iterators, enumerating them once.
+
+    Like populate_results(vectorized=True), the calculation functions and filters of the searches that are not
+    answered by the bisect solver are called with float64 arrays of nominal values.
+
+    :param value_filters: The searches, whose value iterators must be the same objects
+    :param block_size: The number of permutations evaluated per block
+    :param use_bisect: Answer the searches the bisect solver supports by bisecting the shared sorted inventory
+    :return: None
+    """
+    from ECPF.vectorized import materialize_value_iterators, search_product_many
+
+    if len(value_filters) == 0:
+        return
+
+    value_iterators = list(value_filters[0].value_iterators)
+    for value_filter in value_filters[1:]:
+        others = list(value_filter.value_iterators)
+        if len(others) != len(value_iterators) or any(a is not b for a, b in zip(others, value_iterators)):
+            raise ValueError("The value filters of a batch must share the same value iterators")
+
+    with contextlib.ExitStack() as stack:
+        for value_filter in value_filters:
+            stack.enter_context(value_filter._bound_filters())
+            stack.enter_context(value_filter._profiled())
+
+        # The bisect plan sorts the inventory once for every search returning its argument
+        plan: Union[BisectPlan, None] = None
+        plan_checked = False
+
+        product_searches: List[ValueFilter] = []
+        for value_filter in value_filters:
+            value_filter._reset_results()
+            value_filter.search_coverage = 1.0
+            value_filter.search_complete = True
+
+            if use_bisect and _is_identity(value_filter.calculation_function):
+                if not plan_checked:
+                    plan = plan_bisect(value_iterators, value_filter.calculation_function)
+                    plan_checked = True
+                if plan is not None:
+                    value_filter._populate_results_bisect(plan)
+                    continue
+            product_searches.append(value_filter)
+
+        if len(product_searches) == 0:
+            return
+
+        candidates, values = materialize_value_iterators(value_iterators)
+        searches = search_product_many(values, [
+            (vf.calculation_function, list(vf.filters), vf.target_value, vf.number_of_results,
+             vf.results.duplicate_tolerance)
+            for vf in product_searches
+        ], block_size)
+        for value_filter, search in zip(product_searches, searches):
+            value_filter._add_product_search_results(candidates, *search)
+
+
+def solve_batch(value_iterators: Iterable[Any],
+                jobs: Iterable[Tuple[float, Union[Callable[..., float], str]]],
+                number_of_results: int,
+                filters: Iterable[Callable[..., bool]] = (),
+                block_size: int = 2 ** 16,
+                use_bisect: bool = True) -> List[ValueFilter]:
+    """
+    Search the best permutations of the same value iterators for several targets and calculation functions.
+
+        feedback, current_sense = solve_batch(
+            [resistors, resistors],
+            [(0.55, "ra / (ra + rb)"), (2.9, "(6 * ra / (ra + rb) - 1) / 0.4")],
+            number_of_results=20
+        )
+
+    :param value_iterators: The value iterators shared by every search
+    :param jobs: The (target value, calculation function) of every search
+    :param number_of_results: The number of results every search keeps
+    :param filters: Filters applied to every search
+    :param block_size: The number of permutations evaluated per block
+    :param use_bisect: See populate_results_batch
+    :return: The ValueFilters holding the results of every search, in the order of the jobs
+    """
+    value_iterators = list(value_iterators)
+    filters = list(filters)
+    value_filters = [
+        ValueFilter(target_value, value_iterators, calculation_function, filters, number_of_results)
+        for target_value, calculation_function in jobs
+    ]
+    populate_results_batch(value_filters, block_size, use_bisect)
+    return value_filters
@@ -0,0 +1,251 @@
+"""
+Defines a solver for searches whose calculation function simply returns a single value iterator's component.
+
+Such searches only need the inventory sorted once: single components are found by bisecting for the target,
+and two element series/parallel chains by bisecting for the exact complement of every first value.
+This turns the O(n^2) scan of a two element chain into O(n log(n)).
+"""
+
+from typing import Tuple, List, Iterable, Sequence, Callable, Iterator, Optional, Any
+from bisect import bisect_left
+import itertools
+import math
+
+from ECPF.components import iComponent, Component, ChainPermutation
+from ECPF.value_permutator import ComponentPermutator, ChainPermutator, iSortedPermutator
+from ECPF.component_config_functs import find_complement
+from ECPF.result_store import TopKResults
+from ECPF.index_space import MixedRadix
+
+
+class BisectPlan:
+    """
+    The shape of a search that the bisect solver can answer.
+
+    components holds the materialized components of each chain position (one or two positions),
+    function_permutations the chaining function tuples in the order the permutator emits them,
+    and as_chain whether the candidates are wrapped in a ChainPermutation.
+    """
+
+    def __init__(self, components: List[Tuple[Component, ...]],
+                 function_permutations: List[Tuple[Callable[[float, float], float], ...]],
+                 as_chain: bool, canonical: bool = False):
+        self.components = components
+        self.function_permutations = function_permutations
+        self.as_chain = as_chain
+
+        # Whether only canonical chains are candidates, as for ChainPermutator(canonical=True)
+        self.canonical = canonical
+
+        # The sorted last position, computed once for all the searches sharing the plan
+        self._sorted_last: Optional[Tuple[Sequence[int], Sequence[float]]] = None
+
+    @property
+    def positions(self) -> int:
+        return len(self.components)
+
+    @property
+    def candidate_count(self) -> int:
+        """
+        The number of candidates the permutator emits, counted without building them
+        """
+        if not self.canonical or self.positions < 2:
+            return len(MixedRadix([len(c) for c in self.components])) * len(self.function_permutations)
+
+        # Both positions draw from the same inventory, and a chain is canonical when its second operand
+        # does not sort before its first one
+        keys = sorted(ChainPermutation._operand_key(c) for c in self.components[1])
+        return sum(len(keys) - bisect_left(keys, ChainPermutation._operand_key(c))
+                   for c in self.components[0]) * len(self.function_permutations)
+
+    def sorted_last(self) -> Tuple[Sequence[int], Sequence[float]]:
+        """
+        :return: The indices of the last position's components sorted by value, and their sorted values
+        """
+        if self._sorted_last is None:
+            last_components = self.components[-1]
+            sorted_indices = sorted(range(len(last_components)), key=lambda i: float(last_components[i]))
+            self._sorted_last = sorted_indices, [float(last_components[i]) for i in sorted_indices]
+        return self._sorted_last
+
+    def build(self, component_indices: Tuple[int, ...], function_index: int) -> iComponent:
+        """
+        Build the candidate the permutator would have emitted for the given indices.
+        """
+        chain_vals = tuple(c[i] for c, i in zip(self.components, component_indices))
+        if not self.as_chain:
+            return chain_vals[0]
+        return ChainPermutation(chain_vals, self.function_permutations[function_index])
+
+    def order(self, component_indices: Tuple[int, ...], function_index: int) -> int:
+        """
+        The position of a candidate in the order the permutator would have emitted it.
+        """
+        flat_index = 0
+        for c, i in zip(self.components, component_indices):
+            flat_index = flat_index * len(c) + i
+        return flat_index * len(self.function_permutations) + function_index
+
+
+class SortedInventoryPlan(BisectPlan):
+    """
+    The plan for an inventory that is already stored sorted, such as a NetworkIndex
+    """
+
+    def __init__(self, inventory: iSortedPermutator):
+        super().__init__([], [()], as_chain=False)
+        self.inventory = inventory
+
+    @property
+    def positions(self) -> int:
+        return 1
+
+    @property
+    def candidate_count(self) -> int:
+        return len(self.inventory.sorted_values)
+
+    def sorted_last(self) -> Tuple[Sequence[int], Sequence[float]]:
+        sorted_values = self.inventory.sorted_values
+        return range(len(sorted_values)), sorted_values
+
+    def build(self, component_indices: Tuple[int, ...], function_index: int) -> iComponent:
+        return self.inventory.component_at(component_indices[0])
+
+    def order(self, component_indices: Tuple[int, ...], function_index: int) -> int:
+        return component_indices[0]
+
+
+def _is_identity(calculation_function: Callable[..., Any]) -> bool:
+    probe = Component(1.0, 0.0)
+    try:
+        return calculation_function(probe) is probe
+    except Exception:
+        return False
+
+
+def plan_bisect(value_iterators: Iterable[Any], calculation_function: Callable[..., Any]) -> Optional[BisectPlan]:
+    """
+    Check if a search can be answered by the bisect solver.
+
+    :param value_iterators: The value iterators of a ValueFilter
+    :param calculation_function: The calculation function of a ValueFilter
+    :return: The plan describing the search, or None if the search has another shape
+    """
+    value_iterators = list(value_iterators)
+    if len(value_iterators) != 1 or not _is_identity(calculation_function):
+        return None
+
+    value_iterator = value_iterators[0]
+    if isinstance(value_iterator, iSortedPermutator):
+        return SortedInventoryPlan(value_iterator)
+
+    if isinstance(value_iterator, ComponentPermutator):
+        return BisectPlan([tuple(value_iterator)], [()], as_chain=False)
+
+    if not isinstance(value_iterator, ChainPermutator):
+        return None
+
+    components = [tuple(c) for c in value_iterator.components]
+    function_permutations = list(itertools.permutations(value_iterator.chaining_functions, r=len(components) - 1))
+
+    if len(components) == 1 or (
+            len(components) == 2 and all(find_complement(f) is not None for f, in function_permutations)):
+        return BisectPlan(components, function_permutations, as_chain=True, canonical=value_iterator.canonical)
+
+    return None
+
+
+def nearest_first(count: int, position: int, value_at: Callable[[int], Any],
+                  target_value: float) -> Iterator[Tuple[int, Any, float]]:
+    """
+    Walk outwards from position over count sorted entries, yielding (sorted index, value, error) from the smallest
+    error to the largest. The values must cross the target at position and move away from it on either side,
+    as the values of a monotonic function of the sorted entries do, so the errors grow on each side of it.
+    """
+    def error_at(i: int) -> Tuple[float, Any]:
+        if i < 0 or i >= count:
+            return math.inf, math.inf
+        value = value_at(i)
+        return math.fabs((target_value - float(value)) / target_value), value
+
+    left, right = position - 1, position
+    left_error, left_value = error_at(left)
+    right_error, right_value = error_at(right)
+
+    while left >= 0 or right < count:
+        if left_error <= right_error and left >= 0:
+            yield left, left_value, left_error
+            left -= 1
+            left_error, left_value = error_at(left)
+        else:
+            yield right, right_value, right_error
+            right += 1
+            right_error, right_value = error_at(right)
+
+
+def bisect_search(plan: BisectPlan,
+                  calculation_function: Callable[..., Any],
+                  filters: Iterable[Callable[..., bool]],
+                  target_value: float,
+                  results: TopKResults) -> Tuple[int, int]:
+    """
+    Fill the result store with the candidates of the plan closest to the target.
+
+    The store ends up holding exactly what an exhaustive scan would have kept.
+    Only candidates that could still make it into the store are evaluated.
+
+    :param plan: The plan returned by plan_bisect
+    :param calculation_function: The calculation function of the ValueFilter
+    :param filters: Filters that every kept candidate must satisfy
+    :param target_value: The value the calculation function aims to achieve
+    :param results: The store to add the best candidates to
+    :return: The number of candidates evaluated and the number of candidates filtered
+    """
+    filters = tuple(filters)
+    target_value = float(target_value)
+    tested = 0
+    filtered = 0
+
+    sorted_indices, sorted_values = plan.sorted_last()
+
+    def walk(prefix: Tuple[int, ...], function_index: int, value_of: Callable[[float], float], ideal: float):
+        nonlocal tested, filtered
+
+        for sorted_index, value, error in nearest_first(
+                len(sorted_values), bisect_left(sorted_values, ideal),
+                lambda i: value_of(float(sorted_values[i])), target_value):
+
+            # Every remaining candidate is further from the target than the worst kept result
+            if error > results.worst_error:
+                return
+
+            component_indices = prefix + (sorted_indices[sorted_index],)
+            order = plan.order(component_indices, function_index)
+            if not results.accepts(error, order):
+                continue
+
+            candidate = plan.build(component_indices, function_index)
+            if plan.canonical and not candidate.is_canonical():  # type: ignore
+                continue
+
+            tested += 1
+            if all(f(candidate) for f in filters):
+                results.add((candidate,), calculation_function(candidate), error, order=order)
+            else:
+                filtered += 1
+
+    if plan.positions == 1:
+        walk((), 0, lambda v: v, target_value)
+        return tested, filtered
+
+    for function_index, (chaining_function,) in enumerate(plan.function_permutations):
+        complement = find_complement(chaining_function)
+        for first_index, first_component in enumerate(plan.components[0]):
+            first_value = float(first_component)
+            walk(
+                (first_index,), function_index,
+                lambda v: chaining_function(first_value, v),
+                complement(target_value, first_value)
+            )
+
+    return tested, filtered
@@ -0,0 +1,189 @@
+"""
+Defines a branch and bound search over the product of a ValueFilter's value iterators.
+
+Positions are fixed one at a time, and the candidates of the position being fixed are split into ranges of
+neighbouring values. For every such subtree the range the calculation function can still reach is bounded,
+and subtrees whose best possible error cannot beat the worst kept result are skipped without evaluating any
+of their permutations.
+"""
+
+from typing import Tuple, List, Sequence, Callable, Optional, Any, TYPE_CHECKING
+import functools
+import operator
+import math
+
+from ECPF.interval import Interval
+from ECPF.result_store import TopKResults
+from ECPF.partial_filters import PartialFilter
+
+if TYPE_CHECKING:
+    from ECPF.component_array import ComponentArray
+
+
+class BranchAndBoundSearch:
+    """
+    Searches the product of the candidate positions, pruning subtrees that cannot improve the results.
+
+    The reachable range of the calculation function is bounded in one of two ways:
+    * With a declared monotonicity, a sequence holding 1 for every argument the function increases with
+      and -1 for every argument it decreases with, the range is found by evaluating the two extreme corners.
+    * Without one, the unfixed arguments are passed in as Interval objects.
+      This requires a calculation function written with plain arithmetic (no float() calls).
+
+    Like the vectorized mode, the calculation function and filters are called with the nominal float values.
+    """
+
+    def __init__(self,
+                 candidates: List["ComponentArray"],
+                 calculation_function: Callable[..., Any],
+                 filters: Sequence[Callable[..., bool]],
+                 target_value: float,
+                 results: TopKResults,
+                 monotonicity: Optional[Sequence[int]] = None,
+                 leaf_size: int = 8):
+
+        self.candidates = candidates
+        self.calculation_function = calculation_function
+        self.target_value = float(target_value)
+        self.results = results
+
+        # Filters of some positions are tested as soon as their positions are fixed, the others on full permutations
+        self.filters_at: List[List[PartialFilter]] = [[] for _ in candidates]
+        full_filters = []
+        for filter_funct in filters:
+            if isinstance(filter_funct, PartialFilter) and filter_funct.depth < len(candidates) - 1:
+                self.filters_at[filter_funct.depth].append(filter_funct)
+            else:
+                full_filters.append(filter_funct)
+        self.filters = tuple(full_filters)
+
+        # Ranges smaller than this are evaluated (or fixed) value by value instead of being split further
+        self.leaf_size = max(1, leaf_size)
+
+        # The original index of every candidate sorted by nominal value, and the sorted nominal values
+        self.sorted_indices: List[List[int]] = []
+        self.sorted_values: List[List[float]] = []
+        for position in candidates:
+            values = position.nominal.tolist()
+            order = sorted(range(len(values)), key=values.__getitem__)
+            self.sorted_indices.append(order)
+            self.sorted_values.append([values[i] for i in order])
+
+        sizes = [len(c) for c in candidates]
+        self.strides: List[int] = [functools.reduce(operator.mul, sizes[p + 1:], 1) for p in range(len(sizes))]
+        self.total: int = functools.reduce(operator.mul, sizes, 1)
+
+        if self.total == 0:
+            self._bound: Callable[[Tuple[float, ...], List[Tuple[float, float]]], Tuple[float, float]] = \
+                self._interval_bound
+        elif monotonicity is not None:
+            if len(monotonicity) != len(candidates) or any(d not in (1, -1) for d in monotonicity):
+                raise ValueError("monotonicity must hold 1 or -1 for every argument of the calculation function")
+            self._bound = functools.partial(self._corner_bound, tuple(monotonicity))
+        elif self._accepts_intervals():
+            self._bound = self._interval_bound
+        else:
+            raise ValueError(
+                "Branch and bound needs either a declared monotonicity, "
+                "or a calculation function that can be evaluated with Interval arguments"
+            )
+
+        self.tested = 0
+        self.filtered = 0
+        self.pruned = 0
+
+    def _full_range(self, position: int) -> Tuple[float, float]:
+        return self.sorted_values[position][0], self.sorted_values[position][-1]
+
+    def _accepts_intervals(self) -> bool:
+        try:
+            self._interval_bound((), [self._full_range(p) for p in range(len(self.candidates))])
+        except (TypeError, ValueError, ZeroDivisionError):
+            return False
+        return True
+
+    def _interval_bound(self, fixed: Tuple[float, ...], free: List[Tuple[float, float]]) -> Tuple[float, float]:
+        result = self.calculation_function(*fixed, *(Interval(lo, hi) for lo, hi in free))
+        if isinstance(result, Interval):
+            return result.bounds()
+        return float(result), float(result)
+
+    def _corner_bound(self, monotonicity: Tuple[int, ...], fixed: Tuple[float, ...],
+                      free: List[Tuple[float, float]]) -> Tuple[float, float]:
+        directions = monotonicity[len(fixed):]
+        low = self.calculation_function(*fixed, *((lo if d > 0 else hi) for (lo, hi), d in zip(free, directions)))
+        high = self.calculation_function(*fixed, *((hi if d > 0 else lo) for (lo, hi), d in zip(free, directions)))
+        return min(low, high), max(low, high)
+
+    def _best_case_error(self, fixed: Tuple[float, ...], free: List[Tuple[float, float]]) -> float:
+        try:
+            lo, hi = self._bound(fixed, free)
+        except ZeroDivisionError:
+            return 0.0
+        if math.isnan(lo) or math.isnan(hi) or lo <= self.target_value <= hi:
+            return 0.0
+        return min(math.fabs(self.target_value - lo), math.fabs(self.target_value - hi)) / math.fabs(self.target_value)
+
+    def run(self) -> Tuple[int, int, int]:
+        """
+        Fill the result store.
+
+        :return: The number of permutations tested, filtered and pruned
+        """
+        if self.total > 0:
+            self._search_range((), 0, 0, len(self.sorted_values[0]))
+        return self.tested, self.filtered, self.pruned
+
+    def _search_range(self, fixed: Tuple[float, ...], flat_offset: int, lo: int, hi: int) -> None:
+        """
+        Search every permutation that extends fixed with a value of the sorted range [lo, hi) of the next position.
+        """
+        position = len(fixed)
+        values = self.sorted_values[position]
+        rest = [self._full_range(p) for p in range(position + 1, len(self.candidates))]
+
+        if hi - lo <= self.leaf_size:
+            for i in range(lo, hi):
+                original_index = self.sorted_indices[position][i]
+                child_offset = flat_offset + original_index * self.strides[position]
+
+                if position == len(self.candidates) - 1:
+                    self._evaluate(fixed + (values[i],), child_offset)
+                elif not all(f.test(fixed + (values[i],)) for f in self.filters_at[position]):
+                    # Every permutation below a value failing a partial filter counts as tested and filtered
+                    self.tested += self.strides[position]
+                    self.filtered += self.strides[position]
+                elif self._best_case_error(fixed + (values[i],), rest) > self.results.worst_error:
+                    self.pruned += self.strides[position]
+                else:
+                    self._search_range(fixed + (values[i],), child_offset, 0, len(self.sorted_values[position + 1]))
+            return
+
+        # Visit the most promising half first so the worst kept error drops as early as possible
+        mid = (lo + hi) // 2
+        halves = sorted(
+            (self._best_case_error(fixed, [(values[a], values[b - 1])] + rest), a, b)
+            for a, b in ((lo, mid), (mid, hi))
+        )
+        for best_case_error, a, b in halves:
+            if best_case_error > self.results.worst_error:
+                self.pruned += (b - a) * self.strides[position]
+            else:
+                self._search_range(fixed, flat_offset, a, b)
+
+    def _evaluate(self, values: Tuple[float, ...], flat_index: int) -> None:
+        self.tested += 1
+
+        for filter_funct in self.filters:
+            if not filter_funct(*values):
+                self.filtered += 1
+                return
+
+        value = self.calculation_function(*values)
+        error = math.fabs((self.target_value - float(value)) / self.target_value)
+        if self.results.accepts(error, flat_index):
+            # Only the kept permutations are built into component objects
+            permutation = tuple(
+                c.build((flat_index // stride) % len(c)) for c, stride in zip(self.candidates, self.strides)
+            )
+            self.results.add(permutation, value, error, order=flat_index)
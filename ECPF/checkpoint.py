@@ -0,0 +1,118 @@
+"""
+Defines the checkpoints that let a long ValueFilter search continue after its process stopped.
+
+A checkpoint holds the flat index of the next permutation to evaluate (see index_space), the counters of the search
+and the kept results, stored by the flat index of their permutation so they can be rebuilt without pickling
+components. It is written as a small JSON file, replaced atomically so a crash while writing leaves the previous
+checkpoint intact.
+"""
+
+from typing import Tuple, List, Dict, Optional, Any
+import json
+import os
+import tempfile
+import time
+
+CHECKPOINT_VERSION = 1
+
+
+def write_atomically(path: str, text: str) -> None:
+    """
+    Write a text file so readers only ever see its previous or its new content
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(descriptor, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+
+class SearchCheckpoint:
+    """
+    The state of a search of the product of a ValueFilter's value iterators
+    """
+
+    def __init__(self, fingerprint: str, next_index: int, tested: int, filtered: int,
+                 results: List[Tuple[float, int, float]]):
+        """
+        :param fingerprint: The fingerprint of the search problem, see fingerprint.problem_fingerprint
+        :param next_index: The flat index of the first permutation not evaluated yet
+        :param tested: The number of permutations tested
+        :param filtered: The number of permutations filtered
+        :param results: The (error, flat index, value) of every kept result
+        """
+        self.fingerprint: str = fingerprint
+        self.next_index: int = next_index
+        self.tested: int = tested
+        self.filtered: int = filtered
+        self.results: List[Tuple[float, int, float]] = results
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": CHECKPOINT_VERSION,
+            "fingerprint": self.fingerprint,
+            "next_index": self.next_index,
+            "tested": self.tested,
+            "filtered": self.filtered,
+            "results": [list(r) for r in self.results],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SearchCheckpoint":
+        if data.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version: {data.get('version')}")
+        return cls(
+            data["fingerprint"], int(data["next_index"]), int(data["tested"]), int(data["filtered"]),
+            [(float(error), int(order), float(value)) for error, order, value in data["results"]]
+        )
+
+    def save(self, path: str) -> None:
+        write_atomically(path, json.dumps(self.to_dict()))
+
+    @classmethod
+    def load(cls, path: str) -> Optional["SearchCheckpoint"]:
+        """
+        :return: The checkpoint saved at path, None if there is none
+        """
+        try:
+            with open(path) as f:
+                return cls.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+
+
+class Checkpointer:
+    """
+    Saves checkpoints of a search, at most once every interval seconds
+    """
+
+    def __init__(self, path: str, fingerprint: str, interval: float):
+        self.path: str = path
+        self.fingerprint: str = fingerprint
+        self.interval: float = interval
+        self.saved: int = 0
+        self._due_at: float = time.monotonic() + interval
+
+    @property
+    def due(self) -> bool:
+        return time.monotonic() >= self._due_at
+
+    def save(self, next_index: int, tested: int, filtered: int, results: Any) -> None:
+        """
+        :param results: The TopKResults of the search, whose results were added with their flat index as order
+        """
+        SearchCheckpoint(
+            self.fingerprint, next_index, tested, filtered,
+            [(error, order, float(value)) for error, order, value, _ in results.entries()]
+        ).save(self.path)
+        self.saved += 1
+        self._due_at = time.monotonic() + self.interval
+
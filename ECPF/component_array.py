@@ -0,0 +1,258 @@
+"""
+Defines a compact, struct of arrays representation of the candidates a permutator generates.
+
+Instead of one Component or ChainPermutation object per candidate, the nominal value, tolerance, minimum and
+maximum of every candidate are stored in parallel float64 arrays. Chains also store an int topology column
+(the index of their chaining functions) and the index of each of their parts in the parts' own arrays.
+Component objects are only built for the candidates that end up in the results.
+"""
+
+from typing import Tuple, List, Sequence, Callable, Optional, Any
+import itertools
+
+import numpy as np  # type: ignore
+
+from ECPF.components import iComponent, Component, ChainPermutation
+from ECPF.vectorized import apply_elementwise
+
+
+class ComponentArray:
+    """
+    The candidates of one value iterator, stored column by column.
+
+    nominal, tolerance, minimum and maximum hold one float64 entry per candidate.
+    For chains, topology holds the index of every candidate's chaining functions in functions,
+    and parts the index of each chain value in the matching ComponentArray of part_arrays,
+    -1 for the positions a shorter chain does not use.
+    """
+
+    def __init__(self,
+                 nominal: np.ndarray,
+                 minimum: np.ndarray,
+                 maximum: np.ndarray,
+                 tolerance: Optional[np.ndarray] = None,
+                 topology: Optional[np.ndarray] = None,
+                 functions: Sequence[Tuple[Callable[[float, float], float], ...]] = ((),),
+                 parts: Optional[np.ndarray] = None,
+                 part_arrays: Sequence["ComponentArray"] = (),
+                 objects: Optional[Sequence[iComponent]] = None):
+
+        self.nominal: np.ndarray = np.asarray(nominal, dtype=np.float64)
+        self.minimum: np.ndarray = np.asarray(minimum, dtype=np.float64)
+        self.maximum: np.ndarray = np.asarray(maximum, dtype=np.float64)
+
+        if tolerance is None:
+            # The relative tolerance that covers both extremes
+            with np.errstate(divide="ignore", invalid="ignore"):
+                tolerance = np.fmax(self.maximum / self.nominal - 1.0, 1.0 - self.minimum / self.nominal)
+        self.tolerance: np.ndarray = np.asarray(tolerance, dtype=np.float64)
+
+        if topology is None:
+            topology = np.zeros(len(self.nominal), dtype=np.int32)
+        self.topology: np.ndarray = topology
+        self.functions: List[Tuple[Callable[[float, float], float], ...]] = list(functions)
+
+        self.parts: Optional[np.ndarray] = parts
+        self.part_arrays: List[ComponentArray] = list(part_arrays)
+
+        # The original objects, for candidates that can not be rebuilt from the columns
+        self.objects: Optional[Sequence[iComponent]] = objects
+
+    @classmethod
+    def from_values(cls, values: Sequence[float], tolerance: float) -> "ComponentArray":
+        """
+        The candidates of a ComponentPermutator: one Component per value, all with the same tolerance
+        """
+        nominal = np.asarray(values, dtype=np.float64).reshape(-1)
+        return cls(
+            nominal, nominal * (1.0 - tolerance), nominal * (1.0 + tolerance),
+            tolerance=np.full(len(nominal), tolerance, dtype=np.float64)
+        )
+
+    @classmethod
+    def from_components(cls, components: Sequence[iComponent]) -> "ComponentArray":
+        """
+        The candidates of any other iterable of components. The objects are kept to return as results.
+        """
+        components = tuple(components)
+        count = len(components)
+        return cls(
+            np.fromiter((float(c) for c in components), dtype=np.float64, count=count),
+            np.fromiter((c.min_val for c in components), dtype=np.float64, count=count),
+            np.fromiter((c.max_val for c in components), dtype=np.float64, count=count),
+            objects=components
+        )
+
+    @classmethod
+    def from_chains(cls,
+                    part_arrays: Sequence["ComponentArray"],
+                    functions: Sequence[Tuple[Callable[[float, float], float], ...]],
+                    canonical: bool = False) -> "ComponentArray":
+        """
+        Every chain of one candidate per part array and one tuple of chaining functions, in the order
+        ChainPermutator emits them: the part indices vary like itertools.product, and the functions fastest.
+
+        :param part_arrays: The candidates of every position in the chain
+        :param functions: The chaining function tuples, each holding one function less than there are parts
+        :param canonical: Only keep the canonical chains (see ChainPermutation.is_canonical),
+            which needs every part array to hold the same candidates
+        """
+        part_arrays = list(part_arrays)
+        functions = list(functions)
+        if canonical and not all(_same_candidates(part_arrays[0], a) for a in part_arrays[1:]):
+            raise ValueError("Canonical chains need every position of the chain to hold the same candidates")
+        shape = tuple(len(a) for a in part_arrays) + (len(functions),)
+
+        flat = np.arange(int(np.prod(shape, dtype=np.int64)), dtype=np.int64)
+        *part_indices, topology = np.unravel_index(flat, shape)
+        parts = np.stack(part_indices, axis=1) if part_indices else np.empty((len(flat), 0), dtype=np.int64)
+        topology = topology.astype(np.int32)
+
+        if canonical:
+            keep = np.ones(len(flat), dtype=bool)
+            for code, chain_functions in enumerate(functions):
+                rows = np.flatnonzero(topology == code)
+                keep[rows] = _canonical_mask(part_arrays, parts[rows], chain_functions)
+            parts, topology = parts[keep], topology[keep]
+
+        nominal = np.empty(len(topology), dtype=np.float64)
+        minimum = np.empty(len(topology), dtype=np.float64)
+        maximum = np.empty(len(topology), dtype=np.float64)
+
+        for code, chain_functions in enumerate(functions):
+            rows = np.flatnonzero(topology == code)
+            columns = list(zip(part_arrays, parts[rows].T))
+
+            nominal[rows] = _fold(chain_functions, [a.nominal[i] for a, i in columns])
+
+            # The extremes of a chain are found among the corners of its parts' ranges
+            corners = [
+                _fold(chain_functions, [(a.minimum if low else a.maximum)[i] for (a, i), low in zip(columns, corner)])
+                for corner in itertools.product((False, True), repeat=len(columns))
+            ]
+            minimum[rows] = np.min(corners, axis=0)
+            maximum[rows] = np.max(corners, axis=0)
+
+        return cls(nominal, minimum, maximum, topology=topology, functions=functions,
+                   parts=parts, part_arrays=part_arrays)
+
+    def __len__(self) -> int:
+        return len(self.nominal)
+
+    def __getitem__(self, index: int) -> "ComponentView":
+        return ComponentView(self, index)
+
+    def build(self, index: int) -> iComponent:
+        """
+        Create the full component object of a candidate
+        """
+        if self.objects is not None:
+            return self.objects[index]
+        if self.parts is None:
+            return Component(float(self.nominal[index]), float(self.tolerance[index]))
+        return ChainPermutation(
+            tuple(a.build(int(i)) for a, i in zip(self.part_arrays, self.parts[index]) if i >= 0),  # type: ignore
+            self.functions[int(self.topology[index])]
+        )
+
+
+class ComponentView(iComponent):
+    """
+    A light view of one candidate of a ComponentArray.
+    The value and range are read from the columns, everything else is delegated to the full component object,
+    which is only built when it is needed.
+    """
+
+    __slots__ = ("array", "index")
+
+    def __init__(self, array: ComponentArray, index: int):
+        self.array = array
+        self.index = index
+
+    def component(self) -> iComponent:
+        return self.array.build(self.index)
+
+    @property
+    def value(self) -> float:
+        return float(self.array.nominal[self.index])
+
+    def __float__(self) -> float:
+        return float(self.array.nominal[self.index])
+
+    def __str__(self):
+        return str(self.component())
+
+    @property
+    def min_val(self) -> float:
+        return float(self.array.minimum[self.index])
+
+    @property
+    def max_val(self) -> float:
+        return float(self.array.maximum[self.index])
+
+    def sample(self) -> float:
+        return self.component().sample()
+
+    def sample_many(self, n: int, rng: "np.random.Generator" = None) -> np.ndarray:
+        return self.component().sample_many(n, rng)
+
+    def __getattr__(self, name: str) -> Any:
+        # Chain specific attributes, like text_representation and chain_vals
+        if name in ComponentView.__slots__:
+            raise AttributeError(name)
+        return getattr(self.component(), name)
+
+
+def _fold(chain_functions: Sequence[Callable[[float, float], float]], columns: List[np.ndarray]) -> np.ndarray:
+    """
+    Apply the chaining functions from left to right over columns of values
+    """
+    current = columns[0]
+    for column, function in zip(columns[1:], chain_functions):
+        current = apply_elementwise(function, [current, column], len(column))
+    return current
+
+
+def _same_candidates(a: ComponentArray, b: ComponentArray) -> bool:
+    return a is b or (
+        np.array_equal(a.nominal, b.nominal) and np.array_equal(a.minimum, b.minimum)
+        and np.array_equal(a.maximum, b.maximum)
+    )
+
+
+def _canonical_mask(part_arrays: Sequence[ComponentArray], parts: np.ndarray,
+                    chain_functions: Sequence[Callable[[float, float], float]]) -> np.ndarray:
+    """
+    The vectorized ChainPermutation.is_canonical of every row of part indices sharing the same chaining functions
+    """
+    keys = [(a.nominal[i], a.minimum[i], a.maximum[i]) for a, i in zip(part_arrays, parts.T)]
+
+    keep = np.ones(len(parts), dtype=bool)
+    run_start = 0
+    for i in range(1, len(keys)):
+        if i >= 2 and chain_functions[i - 1] is not chain_functions[i - 2]:
+            run_start = i
+        if i > run_start:
+            keep &= ~_key_less(keys[i], keys[i - 1])
+    return keep
+
+
+def _key_less(a: Tuple[np.ndarray, ...], b: Tuple[np.ndarray, ...]) -> np.ndarray:
+    """
+    Elementwise lexicographic a < b of tuples of columns
+    """
+    less = np.zeros(len(a[0]), dtype=bool)
+    equal = np.ones(len(a[0]), dtype=bool)
+    for x, y in zip(a, b):
+        less |= equal & (x < y)
+        equal &= x == y
+    return less
+
+
+def as_component_array(value_iterator: Any) -> ComponentArray:
+    """
+    The compact representation of a value iterator, using its as_array method when it has one
+    """
+    if hasattr(value_iterator, "as_array"):
+        return value_iterator.as_array()
+    return ComponentArray.from_components(tuple(value_iterator))
@@ -2,6 +2,58 @@
 This function defines component configuration functions to be used to simplify the writing of value permutators.
 """
 
+from typing import Tuple, Callable, Optional, TypeVar
+import math
+
+F = TypeVar("F", bound=Callable[..., float])
+
+
+def monotonic(*directions: int) -> Callable[[F], F]:
+    """
+    Declare the monotonicity of a chaining function: 1 for every argument it increases with, -1 for every
+    argument it decreases with. The bounds of chains using only declared functions are computed from two folds
+    instead of every combination of their values' extremes.
+
+        @monotonic(1, 1)
+        def series(v1, v2):
+            return v1 + v2
+    """
+    if any(d not in (1, -1) for d in directions):
+        raise ValueError("Monotonic directions must be 1 or -1")
+
+    def declare(function: F) -> F:
+        function.monotonicity = tuple(directions)  # type: ignore
+        return function
+    return declare
+
+
+def find_monotonicity(function: Callable[..., float]) -> Optional[Tuple[int, ...]]:
+    """
+    The monotonicity declared with monotonic() on a function, None if it declares nothing
+    """
+    directions = getattr(function, "monotonicity", None)
+    # Expression objects have a monotonicity method, which is not a declaration
+    if isinstance(directions, tuple):
+        return directions
+    return None
+
+
+def _sum_complement(total: float, v1: float) -> float:
+    """
+    The value v2 for which v1 + v2 == total
+    """
+    return total - v1
+
+
+def _reciprocal_sum_complement(total: float, v1: float) -> float:
+    """
+    The value v2 for which v1 * v2 / (v1 + v2) == total, infinite if v1 alone is already too small
+    """
+    remainder = 1.0 / total - 1.0 / v1
+    if remainder <= 0.0:
+        return math.inf
+    return 1.0 / remainder
+
 
 class iConfiguration:
     """
@@ -16,41 +68,89 @@ class iConfiguration:
     def parallel(v1: float, v2: float) -> float:
         raise NotImplementedError
 
+    @staticmethod
+    def series_complement(total: float, v1: float) -> float:
+        """
+        The value that has to be put in series with v1 to reach total
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def parallel_complement(total: float, v1: float) -> float:
+        """
+        The value that has to be put in parallel with v1 to reach total
+        """
+        raise NotImplementedError
+
 
 class ResistorConfiguration(iConfiguration):
     """
     Resistor configurations
     """
     @staticmethod
+    @monotonic(1, 1)
     def series(v1: float, v2: float) -> float:
         return v1 + v2
 
     @staticmethod
+    @monotonic(1, 1)
     def parallel(v1: float, v2: float) -> float:
         return v1 * v2 / (v1 + v2)
 
+    series_complement = staticmethod(_sum_complement)
+    parallel_complement = staticmethod(_reciprocal_sum_complement)
+
 
 class CapacitorConfiguration(iConfiguration):
     """
     Capacitor configurations
     """
     @staticmethod
+    @monotonic(1, 1)
     def series(v1: float, v2: float) -> float:
         return v1 * v2 / (v1 + v2)
 
     @staticmethod
+    @monotonic(1, 1)
     def parallel(v1: float, v2: float) -> float:
         return v1 + v2
 
+    series_complement = staticmethod(_reciprocal_sum_complement)
+    parallel_complement = staticmethod(_sum_complement)
+
 
 class InductorConfiguration(iConfiguration):
     """
     Inductor configurations
     """
     @staticmethod
+    @monotonic(1, 1)
     def series(v1: float, v2: float) -> float:
         return v1 + v2
 
     @staticmethod
+    @monotonic(1, 1)
     def parallel(v1: float, v2: float) -> float:
         return v1 * v2 / (v1 + v2)
+
+    series_complement = staticmethod(_sum_complement)
+    parallel_complement = staticmethod(_reciprocal_sum_complement)
+
+
+CONFIGURATIONS = (ResistorConfiguration, CapacitorConfiguration, InductorConfiguration)
+
+
+def find_complement(chaining_function: Callable[[float, float], float]
+                    ) -> Optional[Callable[[float, float], float]]:
+    """
+    Find the complement of one of the configuration functions defined in this module.
+
+    :param chaining_function: A series or parallel function of one of the configuration classes
+    :return: The matching complement function, or None for functions defined elsewhere
+    """
+    for configuration in CONFIGURATIONS:
+        if chaining_function is configuration.series:
+            return configuration.series_complement
+        if chaining_function is configuration.parallel:
+            return configuration.parallel_complement
+    return None
@@ -1,5 +1,5 @@
 import decimal
-from typing import Set, Tuple, Dict, List, Deque, Iterable, Callable, Generator, Any
+from typing import Set, Tuple, Dict, List, Deque, Iterable, Callable, Generator, Any, TYPE_CHECKING
 from collections import deque
 from operator import mul
 import itertools
@@ -8,6 +8,11 @@ import operator
 import math
 import random
 from ECPF.float_representation_tools import eng_format
+from ECPF.component_config_functs import find_monotonicity
+
+# NumPy is only imported when samples are drawn in batches
+if TYPE_CHECKING:
+    import numpy as np  # type: ignore
 
 
 class iComponent:
@@ -15,6 +20,8 @@ class iComponent:
     Abstract class defining interfaces that all Component subclasses must implement
     """
 
+    __slots__ = ()
+
     @property
     def value(self) -> float:
         raise NotImplementedError
@@ -33,11 +40,47 @@ class iComponent:
     def sample(self) -> float:
         raise NotImplementedError
 
+    def sample_many(self, n: int, rng: "np.random.Generator" = None) -> "np.ndarray":
+        """
+        Draw n samples of the component's value at once.
+        Subclasses should override this with a vectorized version, by default sample() is called n times.
+
+        :param n: The number of samples to draw
+        :param rng: The random generator to draw the samples from, a new unseeded one if omitted
+        :return: A float64 array of the samples
+        """
+        import numpy as np  # type: ignore
+
+        return np.fromiter((self.sample() for _ in range(n)), dtype=np.float64, count=n)
+
+
+class iImmutableComponent(iComponent):
+    """
+    A component whose attributes can not be reassigned once it is created,
+    so values cached from them stay valid. Attributes are set through _set, by __init__ and the caches only.
+    """
+
+    __slots__ = ()
+
+    def _set(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable, {name} can not be set")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable, {name} can not be deleted")
+
+
+class Component(iImmutableComponent):
+    __slots__ = ("_value", "_tolerance")
 
-class Component(iComponent):
     def __init__(self, value, tolerance):
-        self._value: float = value
-        self._tolerance: float = tolerance
+        self._set("_value", value)
+        self._set("_tolerance", tolerance)
+
+    def __reduce__(self):
+        return Component, (self._value, self._tolerance)
 
     @property
     def value(self) -> float:
@@ -57,20 +100,35 @@ class Component(iComponent):
     def sample(self) -> float:
         return self.min_val + random.random() * (self.max_val - self.min_val)
 
+    def sample_many(self, n: int, rng: "np.random.Generator" = None) -> "np.ndarray":
+        import numpy as np  # type: ignore
 
-class ChainPermutation(iComponent):
+        if rng is None:
+            rng = np.random.default_rng()
+        return rng.uniform(self.min_val, self.max_val, n)
+
+
+class ChainPermutation(iImmutableComponent):
     """
     A chain permutation is a component that abstracts a chain of components.
     This provides an interface for treating the chain as a single component.
+
+    The nominal value, minimum and maximum are computed once, when they are first needed.
     """
 
+    __slots__ = ("chain_vals", "chain_functions", "_value", "_min_val", "_max_val")
+
     def __init__(self, chain_vals: Tuple[Any],
                  chain_functions: Iterable[Callable[[float, float], float]]):
 
-        self.chain_vals: Tuple[iComponent] = chain_vals
-        self.chain_functions = chain_functions
-        self._max_val = None
-        self._min_val = None
+        self._set("chain_vals", tuple(chain_vals))
+        self._set("chain_functions", tuple(chain_functions))
+        self._set("_value", None)
+        self._set("_max_val", None)
+        self._set("_min_val", None)
+
+    def __reduce__(self):
+        return ChainPermutation, (self.chain_vals, self.chain_functions)
 
     def __str__(self):
         return f"{self.value}"
@@ -84,23 +142,38 @@ class ChainPermutation(iComponent):
 
         return "\n".join((line1, line2, line3))
 
+    @staticmethod
+    def _is_parallel(function: Callable[[float, float], float]) -> bool:
+        if function.__name__ == "parallel":
+            return True
+        if function.__name__ == "series":
+            return False
+        raise ValueError(
+            f"Function must be names series or parallel in order to have a text representation: {function}"
+        )
+
+    @classmethod
+    def _operand_text(cls, component: Any) -> str:
+        """
+        The label of a chain value: its value in engineering notation, or the formula of a nested network,
+        with "+" for series and "//" for parallel
+        """
+        if not isinstance(component, ChainPermutation):
+            return eng_format(float(component))
+        text = cls._operand_text(component.chain_vals[0])
+        for function, v in zip(component.chain_functions, component.chain_vals[1:]):
+            text = f"{text} {'//' if cls._is_parallel(function) else '+'} {cls._operand_text(v)}"
+        return f"({text})"
+
     def text_representation(self):
 
-        # Format the components in engineering notation
-        val_texts: Tuple[str] = [eng_format(float(v)) for v in self.chain_vals]
+        # Format the components in engineering notation, and nested networks as formulas
+        val_texts: Tuple[str] = [self._operand_text(v) for v in self.chain_vals]
         max_length = max(len(v) for v in val_texts) + 4
 
         # Check if the component was added in series or parallel
         parallel_components = [False]
-        for v in self.chain_functions:
-            if v.__name__ == "parallel":
-                parallel_components.append(True)
-            elif v.__name__ == "series":
-                parallel_components.append(False)
-            else:
-                raise ValueError(
-                    f"Function must be names series or parallel in order to have a text representation: {v}"
-                )
+        parallel_components.extend(self._is_parallel(v) for v in self.chain_functions)
         parallel_components.append(False)
 
         string_parts = []
@@ -116,6 +189,14 @@ class ChainPermutation(iComponent):
 
     @property
     def value(self) -> float:
+        if self._value is None:
+            self._set("_value", self._fold_value())
+        return self._value
+
+    def _fold_value(self) -> float:
+        """
+        Apply the chain functions over the nominal values of the chain
+        """
         current_value = float(self.chain_vals[0])
         chain_vals: Iterable[Component] = self.chain_vals[1:]
 
@@ -131,42 +212,87 @@ class ChainPermutation(iComponent):
     def __float__(self):
         return float(self.value)
 
+    @staticmethod
+    def _operand_key(component: iComponent) -> Tuple[float, float, float]:
+        return float(component), component.min_val, component.max_val
+
+    def is_canonical(self) -> bool:
+        """
+        Check if the chain is the canonical form of the electrically equivalent chains.
+
+        Series and parallel functions are commutative, so the operands combined by a run of the same chain function
+        can be swapped without changing the network. The first run also includes the first value of the chain.
+        A chain is canonical when the operands of every run are sorted by value (then by tolerance).
+
+        Every chain only has a canonical equivalent among the chains of a permutator when all the positions of the
+        chain draw from the same inventory, which ChainPermutator(canonical=True) checks.
+        """
+        keys = [self._operand_key(v) for v in self.chain_vals]
+
+        run_start = 0
+        for i in range(1, len(keys)):
+            # chain_vals[i] is combined by chain_functions[i - 1]
+            if i >= 2 and self.chain_functions[i - 1] is not self.chain_functions[i - 2]:
+                run_start = i
+            if i > run_start and keys[i] < keys[i - 1]:
+                return False
+        return True
+
     @property
     def min_val(self):
         if self._min_val is None:
-            self._min_val, self._max_val = self._get_min_max()
+            self._set_min_max()
         return self._min_val
 
     @property
     def max_val(self):
         if self._min_val is None:
-            self._min_val, self._max_val = self._get_min_max()
+            self._set_min_max()
         return self._max_val
 
-    def _get_min_max(self):
+    def _set_min_max(self) -> None:
+        min_val, max_val = self._get_min_max()
+        self._set("_min_val", min_val)
+        self._set("_max_val", max_val)
 
-        min_val = None
-        max_val = None
+    def _get_min_max(self) -> Tuple[float, float]:
+        """
+        The minimum and maximum of the chain over the tolerances of its values.
 
-        max_min_chain = []
+        When every chain function declares its monotonicity (see component_config_functs.monotonic), the extremes
+        are folds of the extremes of the values in the declared directions, exact and linear in the chain length.
+        Otherwise every combination of the values' extremes is evaluated.
+        """
+        directions = [find_monotonicity(f) for f in self.chain_functions]
+        if all(d is not None for d in directions):
+            return self._monotonic_min_max(directions)
 
-        for v in self.chain_vals:
-            # nominal = v.value
-            max_val = v.max_val
-            min_val = v.min_val
-            max_min_chain.append((max_val, min_val))
+        max_min_chain = [(v.max_val, v.min_val) for v in self.chain_vals]
 
-        for initial_value in max_min_chain[0]:
-            for extreme_vals in itertools.product(*max_min_chain[1:]):
-                current_value = initial_value
-                for v, f in zip(extreme_vals, self.chain_functions):
-                    current_value = f(current_value, v)
+        min_val = math.inf
+        max_val = -math.inf
+        for extreme_vals in itertools.product(*max_min_chain):
+            current_value = extreme_vals[0]
+            for v, f in zip(extreme_vals[1:], self.chain_functions):
+                current_value = f(current_value, v)
 
-                min_val = min(min_val, current_value)
-                max_val = max(max_val, current_value)
+            min_val = min(min_val, current_value)
+            max_val = max(max_val, current_value)
 
         return min_val, max_val
 
+    def _monotonic_min_max(self, directions: List[Tuple[int, ...]]) -> Tuple[float, float]:
+        low = self.chain_vals[0].min_val
+        high = self.chain_vals[0].max_val
+
+        for v, f, (d_current, d_v) in zip(self.chain_vals[1:], self.chain_functions, directions):
+            v_low, v_high = v.min_val, v.max_val
+            low, high = (
+                f(low if d_current > 0 else high, v_low if d_v > 0 else v_high),
+                f(high if d_current > 0 else low, v_high if d_v > 0 else v_low),
+            )
+        return low, high
+
     def sample(self) -> float:
         current_value = self.chain_vals[0].sample()
         chain_vals: Iterable[Component] = self.chain_vals[1:]
@@ -175,6 +301,21 @@ class ChainPermutation(iComponent):
             current_value = f(current_value, v.sample())
         return current_value
 
+    def sample_many(self, n: int, rng: "np.random.Generator" = None) -> "np.ndarray":
+        """
+        Draw n samples of the chain's value, applying the chain functions elementwise over the sample arrays.
+        The chain functions therefore have to work on arrays, like the configuration functions do.
+        """
+        import numpy as np  # type: ignore
+
+        if rng is None:
+            rng = np.random.default_rng()
+
+        current_value = self.chain_vals[0].sample_many(n, rng)
+        for v, f in zip(self.chain_vals[1:], self.chain_functions):
+            current_value = f(current_value, v.sample_many(n, rng))
+        return current_value
+
 
 def iterate_value_order_magnitude(values, magnitude_orders):
     for v in values:
@@ -0,0 +1,351 @@
+"""
+Defines calculation functions written as expression strings, such as "0.8 * (r1 + r2) / (r1 + r2 / 2)".
+
+The expression is parsed once into an abstract syntax tree restricted to arithmetic, and compiled into a scalar
+function (for components and floats), a NumPy kernel (for arrays of candidates) and an interval evaluator
+(for bounds). Unlike a lambda, an expression can be sent to worker processes as its source,
+and differentiated to find the directions it is monotonic in.
+"""
+
+from typing import Tuple, List, Dict, Sequence, Callable, Optional, Any, Union
+import inspect
+import math
+import ast
+
+from ECPF.interval import Interval
+
+# The functions an expression may call, for scalar, NumPy and Interval arguments
+_FUNCTION_NAMES = ("sqrt", "exp", "log", "abs")
+
+_BINARY_OPERATORS: Dict[type, str] = {ast.Add: "+", ast.Sub: "-", ast.Mult: "*", ast.Div: "/", ast.Pow: "**"}
+_UNARY_OPERATORS: Dict[type, str] = {ast.USub: "-", ast.UAdd: "+"}
+
+
+def _interval_monotonic(function: Callable[[float], float], domain_lo: float = -math.inf
+                        ) -> Callable[[Union[Interval, float]], Union[Interval, float]]:
+    """
+    An increasing function extended to intervals, unbounded below where the interval leaves its domain
+    """
+    def extended(x):
+        if not isinstance(x, Interval):
+            return function(x)
+        lo = function(x.lo) if x.lo > domain_lo else -math.inf
+        hi = function(x.hi) if x.hi > domain_lo else -math.inf
+        return Interval(lo, hi)
+    return extended
+
+
+def _scalar_namespace() -> Dict[str, Any]:
+    return {"__builtins__": {}, "_float": float, "inf": math.inf,
+            "sqrt": math.sqrt, "exp": math.exp, "log": math.log, "abs": abs}
+
+
+def _array_namespace() -> Dict[str, Any]:
+    import numpy as np  # type: ignore
+
+    return {"__builtins__": {}, "inf": math.inf,
+            "sqrt": np.sqrt, "exp": np.exp, "log": np.log, "abs": np.abs}
+
+
+def _interval_namespace() -> Dict[str, Any]:
+    return {"__builtins__": {}, "inf": math.inf,
+            "sqrt": _interval_monotonic(math.sqrt, 0.0),
+            "exp": _interval_monotonic(math.exp),
+            "log": _interval_monotonic(math.log, 0.0),
+            "abs": abs}
+
+
+class Expression:
+    """
+    A calculation function parsed from an arithmetic expression over named variables.
+
+    Expressions may use numbers, the variables, + - * / **, parentheses and the functions sqrt, exp, log and abs.
+    The variables are the positional arguments, in the given order or, by default, in alphabetical order
+    (as sorted() orders the names), so "rb / (ra + rb)" takes ra first. Pass variables whenever the positions
+    of the value iterators do not follow the alphabetical order of the names.
+
+    Called with components or floats the expression returns a float, called with NumPy arrays it evaluates
+    the whole arrays at once, and called with Interval arguments it returns an Interval bounding the result.
+    """
+
+    def __init__(self, source: str, variables: Optional[Sequence[str]] = None):
+        """
+        :param source: The expression, for instance "1.2 * (rovp1 + rovp2 + trim_pot) / rovp2"
+        :param variables: The names of the positional arguments, in order, the sorted names of the variables
+            of the expression if omitted
+        """
+        try:
+            tree = ast.parse(source.strip(), mode="eval").body
+        except SyntaxError as e:
+            raise ValueError(f"Invalid expression {source!r}: {e.msg}") from None
+
+        self._validate(tree, source)
+        found = self._variables_of(tree)
+        if variables is None:
+            variables = sorted(found)
+        else:
+            variables = list(variables)
+            missing = [name for name in found if name not in variables]
+            if missing:
+                raise ValueError(f"The expression {source!r} uses undeclared variables {tuple(missing)}")
+
+        self.source: str = source
+        self.variables: Tuple[str, ...] = tuple(variables)
+        self._tree: ast.AST = tree
+
+        parameters = ", ".join(self.variables)
+        generic = f"lambda {parameters}: {_unparse(tree)}"
+        scalar = f"lambda {parameters}: {_unparse(tree, lambda name: f'_float({name})')}"
+
+        self._scalar: Callable[..., float] = eval(compile(scalar, "<expression>", "eval"), _scalar_namespace())
+        self._generic_code = compile(generic, "<expression>", "eval")
+        self._array_kernel: Optional[Callable[..., Any]] = None
+        self._interval_function: Callable[..., Any] = eval(self._generic_code, _interval_namespace())
+
+        # Derivatives are compiled once, monotonicity proofs are repeated for every box
+        self._derivatives: Dict[str, "Expression"] = {}
+
+        # Lets inspect.signature (and so partial filter matching) see the variables as parameters
+        self.__signature__ = inspect.Signature([
+            inspect.Parameter(name, inspect.Parameter.POSITIONAL_OR_KEYWORD) for name in self.variables
+        ])
+
+    @staticmethod
+    def _validate(node: ast.AST, source: str) -> None:
+        for child in ast.walk(node):
+            if isinstance(child, ast.BinOp):
+                supported = type(child.op) in _BINARY_OPERATORS
+            elif isinstance(child, ast.UnaryOp):
+                supported = type(child.op) in _UNARY_OPERATORS
+            elif isinstance(child, ast.Call):
+                supported = isinstance(child.func, ast.Name) and child.func.id in _FUNCTION_NAMES \
+                    and len(child.args) == 1 and len(child.keywords) == 0
+            elif isinstance(child, ast.Name):
+                supported = child.id not in ("_float", "inf")
+            elif _constant_value(child) is not None:
+                supported = True
+            else:
+                supported = isinstance(child, (ast.Load, ast.operator, ast.unaryop))
+            if not supported:
+                raise ValueError(
+                    f"Unsupported syntax in expression {source!r}: {type(child).__name__}. "
+                    f"Expressions may only use numbers, variables, + - * / **, and the functions "
+                    f"{', '.join(_FUNCTION_NAMES)}"
+                )
+
+    @staticmethod
+    def _variables_of(node: ast.AST) -> List[str]:
+        names: List[str] = []
+        function_names = {id(c.func) for c in ast.walk(node) if isinstance(c, ast.Call)}
+        for child in _in_order(node):
+            if isinstance(child, ast.Name) and id(child) not in function_names and child.id not in names:
+                names.append(child.id)
+        return names
+
+    @classmethod
+    def _from_tree(cls, tree: ast.AST, variables: Sequence[str]) -> "Expression":
+        return cls(_unparse(tree), variables)
+
+    def __repr__(self) -> str:
+        return f"Expression({self.source!r}, variables={self.variables!r})"
+
+    def __reduce__(self):
+        return Expression, (self.source, self.variables)
+
+    @property
+    def __name__(self) -> str:
+        return self.source
+
+    def __call__(self, *args) -> Any:
+        if len(args) > 0 and hasattr(type(args[0]), "ndim"):
+            return self.array_kernel(*args)
+
+        # Scalar calls are by far the most frequent, intervals and arrays make float() fail
+        try:
+            return self._scalar(*args)
+        except TypeError:
+            if any(isinstance(a, Interval) for a in args):
+                return self._interval_function(*args)
+            if any(hasattr(type(a), "ndim") for a in args):
+                return self.array_kernel(*args)
+            raise
+
+    @property
+    def array_kernel(self) -> Callable[..., Any]:
+        """
+        The expression evaluated over NumPy arrays of nominal values
+        """
+        if self._array_kernel is None:
+            self._array_kernel = eval(self._generic_code, _array_namespace())
+        return self._array_kernel
+
+    def bounds(self, *intervals: Tuple[float, float]) -> Tuple[float, float]:
+        """
+        Bound the values the expression reaches when every variable lies in its (lo, hi) interval.
+        The bounds contain every reachable value but may be wider than the exact range.
+        """
+        result = self._interval_function(*(Interval(lo, hi) for lo, hi in intervals))
+        if isinstance(result, Interval):
+            return result.bounds()
+        return float(result), float(result)
+
+    def derivative(self, variable: str) -> "Expression":
+        """
+        :return: The partial derivative of the expression with respect to a variable
+        """
+        if variable not in self.variables:
+            raise ValueError(f"{variable} is not a variable of the expression {self.source!r}")
+        if variable not in self._derivatives:
+            self._derivatives[variable] = self._from_tree(_derivative(self._tree, variable), self.variables)
+        return self._derivatives[variable]
+
+    def monotonicity(self, *intervals: Tuple[float, float]) -> Optional[Tuple[int, ...]]:
+        """
+        Find the direction the expression changes in with every variable, over a box of variable intervals.
+
+        :param intervals: The (lo, hi) interval of every variable
+        :return: 1 for every variable the expression is non decreasing in and -1 for every variable it is
+            non increasing in (0 if it does not depend on it), or None if a direction can not be proven
+        """
+        directions = []
+        for variable in self.variables:
+            lo, hi = self.derivative(variable).bounds(*intervals)
+            if lo == hi == 0.0:
+                directions.append(0)
+            elif lo >= 0.0:
+                directions.append(1)
+            elif hi <= 0.0:
+                directions.append(-1)
+            else:
+                return None
+        return tuple(directions)
+
+
+def _in_order(node: ast.AST):
+    """
+    Walk the tree depth first from left to right, so variables are found in their order in the source
+    """
+    yield node
+    for child in ast.iter_child_nodes(node):
+        yield from _in_order(child)
+
+
+def _constant_value(node: ast.AST) -> Optional[float]:
+    """
+    The value of a number node (ast.Num before Python 3.8), None for any other node
+    """
+    value = getattr(node, "value", None) if isinstance(node, ast.Constant) else getattr(node, "n", None)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    return None
+
+
+def _unparse(node: ast.AST, name_format: Callable[[str], str] = lambda name: name) -> str:
+    """
+    The fully parenthesized source of a validated expression tree
+    """
+    value = _constant_value(node)
+    if value is not None:
+        return "inf" if value == math.inf else repr(value)
+    if isinstance(node, ast.Name):
+        return name_format(node.id)
+    if isinstance(node, ast.UnaryOp):
+        return f"({_UNARY_OPERATORS[type(node.op)]}{_unparse(node.operand, name_format)})"
+    if isinstance(node, ast.BinOp):
+        operator = _BINARY_OPERATORS[type(node.op)]
+        return f"({_unparse(node.left, name_format)} {operator} {_unparse(node.right, name_format)})"
+    if isinstance(node, ast.Call):
+        return f"{node.func.id}({_unparse(node.args[0], name_format)})"  # type: ignore
+    raise ValueError(f"Unsupported expression node: {type(node).__name__}")
+
+
+# Tree builders used by the derivative, folding the constants 0 and 1 so derivatives stay small
+
+def _number(value: float) -> ast.AST:
+    return ast.Constant(value=value)
+
+
+def _add(a: ast.AST, b: ast.AST) -> ast.AST:
+    if _constant_value(a) == 0:
+        return b
+    if _constant_value(b) == 0:
+        return a
+    return ast.BinOp(left=a, op=ast.Add(), right=b)
+
+
+def _sub(a: ast.AST, b: ast.AST) -> ast.AST:
+    if _constant_value(b) == 0:
+        return a
+    if _constant_value(a) == 0:
+        return ast.UnaryOp(op=ast.USub(), operand=b)
+    return ast.BinOp(left=a, op=ast.Sub(), right=b)
+
+
+def _mul(a: ast.AST, b: ast.AST) -> ast.AST:
+    if _constant_value(a) == 0 or _constant_value(b) == 0:
+        return _number(0)
+    if _constant_value(a) == 1:
+        return b
+    if _constant_value(b) == 1:
+        return a
+    return ast.BinOp(left=a, op=ast.Mult(), right=b)
+
+
+def _div(a: ast.AST, b: ast.AST) -> ast.AST:
+    if _constant_value(a) == 0:
+        return _number(0)
+    if _constant_value(b) == 1:
+        return a
+    return ast.BinOp(left=a, op=ast.Div(), right=b)
+
+
+def _pow(a: ast.AST, b: ast.AST) -> ast.AST:
+    if _constant_value(b) == 1:
+        return a
+    if _constant_value(b) == 0:
+        return _number(1)
+    return ast.BinOp(left=a, op=ast.Pow(), right=b)
+
+
+def _call(name: str, argument: ast.AST) -> ast.AST:
+    return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=[argument], keywords=[])
+
+
+def _derivative(node: ast.AST, variable: str) -> ast.AST:
+    if _constant_value(node) is not None:
+        return _number(0)
+    if isinstance(node, ast.Name):
+        return _number(1 if node.id == variable else 0)
+
+    if isinstance(node, ast.UnaryOp):
+        d = _derivative(node.operand, variable)
+        return d if isinstance(node.op, ast.UAdd) else _sub(_number(0), d)
+
+    if isinstance(node, ast.Call):
+        a = node.args[0]
+        da = _derivative(a, variable)
+        name = node.func.id  # type: ignore
+        if name == "sqrt":
+            return _div(da, _mul(_number(2), node))
+        if name == "exp":
+            return _mul(node, da)
+        if name == "log":
+            return _div(da, a)
+        return _mul(da, _div(a, node))  # abs
+
+    a, b = node.left, node.right  # type: ignore
+    da, db = _derivative(a, variable), _derivative(b, variable)
+    if isinstance(node.op, ast.Add):  # type: ignore
+        return _add(da, db)
+    if isinstance(node.op, ast.Sub):  # type: ignore
+        return _sub(da, db)
+    if isinstance(node.op, ast.Mult):  # type: ignore
+        return _add(_mul(da, b), _mul(a, db))
+    if isinstance(node.op, ast.Div):  # type: ignore
+        return _div(_sub(_mul(da, b), _mul(a, db)), _pow(b, _number(2)))
+
+    # Power: constant exponents use the power rule, others d(a^b) = a^b * (db * log(a) + b * da / a)
+    exponent = _constant_value(b)
+    if exponent is not None:
+        return _mul(_mul(_number(exponent), _pow(a, _number(exponent - 1))), da)
+    return _mul(node, _add(_mul(db, _call("log", a)), _div(_mul(b, da), a)))
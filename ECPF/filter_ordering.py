@@ -0,0 +1,138 @@
+"""
+Defines a chain of filters that reorders itself to reject permutations as cheaply as possible.
+
+A permutation passes the chain when it passes every filter, so the filters can be evaluated in any order
+without changing which permutations pass. The chain measures the cost and rejection rate of every filter
+and runs the filters that reject the most for the least time first.
+"""
+
+from typing import List, Sequence, Callable, Any
+import time
+
+
+class AdaptiveFilterChain:
+    """
+    A single filter that passes when all of its filters pass, evaluating them in the cheapest order measured.
+
+    When called with single values, every filter is evaluated and timed for the first sample_size permutations
+    of every recheck_interval permutations, and the filters are reordered at the end of each sample.
+    When called with arrays of values (vectorized searches), every filter runs on the permutations that passed
+    the previous ones, and the filters are reordered after every call from the rates measured in it.
+
+    Filters should have no side effects. If a filter raises an error while the chain evaluates the filters in
+    another order than declared, the permutation is evaluated again in the declared order, so errors are only
+    raised where the declared order would have raised them.
+    """
+
+    def __init__(self, filters: Sequence[Callable[..., Any]], sample_size: int = 256, recheck_interval: int = 2 ** 16):
+        """
+        :param filters: The filters, in their declared order
+        :param sample_size: The number of permutations every filter is measured on before reordering
+        :param recheck_interval: Measure the filters again every this many permutations, in case the
+            distribution of the values changes across the product
+        """
+        self.filters: List[Callable[..., Any]] = list(filters)
+        self.sample_size: int = sample_size
+        self.recheck_interval: int = max(recheck_interval, sample_size + 1)
+
+        # The current order the filters are evaluated in, as indices into filters
+        self.order: List[int] = list(range(len(self.filters)))
+
+        self.calls: int = 0
+        self._reset_measurements()
+
+    def _reset_measurements(self) -> None:
+        self._seconds: List[float] = [0.0] * len(self.filters)
+        self._evaluations: List[int] = [0] * len(self.filters)
+        self._rejections: List[int] = [0] * len(self.filters)
+
+    def _reorder(self) -> None:
+        """
+        Sort the filters by cost per rejection, which minimizes the expected cost of independent filters
+        """
+        def rank(i: int) -> float:
+            if self._evaluations[i] == 0:
+                return 0.0
+            if self._rejections[i] == 0:
+                return float("inf")
+            return self._seconds[i] / self._rejections[i]
+
+        self.order = sorted(range(len(self.filters)), key=lambda i: (rank(i), i))
+
+    def __reduce__(self):
+        # Lambdas are sent to worker processes wrapped like the other search functions
+        from ECPF.parallel import PortableFunction
+
+        return AdaptiveFilterChain, (
+            [PortableFunction(f) for f in self.filters], self.sample_size, self.recheck_interval
+        )
+
+    def __call__(self, *args) -> Any:
+        if len(args) > 0 and getattr(args[0], "ndim", 0) > 0:
+            return self._call_arrays(args)
+
+        self.calls += 1
+        position = self.calls % self.recheck_interval
+        if 0 < position <= self.sample_size:
+            return self._call_measured(args, position == self.sample_size)
+
+        try:
+            for i in self.order:
+                if not self.filters[i](*args):
+                    return False
+        except Exception:
+            return self._call_declared(args)
+        return True
+
+    def _call_declared(self, args: tuple) -> bool:
+        for filter_funct in self.filters:
+            if not filter_funct(*args):
+                return False
+        return True
+
+    def _call_measured(self, args: tuple, last_sample: bool) -> bool:
+        if self.calls % self.recheck_interval == 1:
+            self._reset_measurements()
+
+        passed = True
+        try:
+            for i, filter_funct in enumerate(self.filters):
+                start = time.perf_counter()
+                result = filter_funct(*args)
+                self._seconds[i] += time.perf_counter() - start
+                self._evaluations[i] += 1
+                if not result:
+                    self._rejections[i] += 1
+                    passed = False
+        except Exception:
+            return self._call_declared(args)
+        finally:
+            if last_sample:
+                self._reorder()
+        return passed
+
+    def _call_arrays(self, args: tuple) -> Any:
+        import numpy as np  # type: ignore
+
+        size = len(args[0])
+        remaining = np.arange(size)
+        self._reset_measurements()
+
+        for i in self.order:
+            start = time.perf_counter()
+            passed = np.broadcast_to(np.asarray(self.filters[i](*args), dtype=bool), (len(remaining),))
+            self._seconds[i] += time.perf_counter() - start
+            self._evaluations[i] += len(remaining)
+            self._rejections[i] += len(remaining) - int(np.count_nonzero(passed))
+
+            remaining = remaining[passed]
+            args = tuple(a[passed] for a in args)
+            if len(remaining) == 0:
+                break
+
+        self.calls += size
+        self._reorder()
+
+        result = np.zeros(size, dtype=bool)
+        result[remaining] = True
+        return result
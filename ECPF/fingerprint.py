@@ -0,0 +1,193 @@
+"""
+Defines fingerprints of search problems, which identify a problem across processes and runs.
+
+A fingerprint is a hash of everything that decides the results of a search: the target, the values and tolerances
+of the inventory, the chaining functions, the filters and the calculation function. Functions are described by
+their source and bytecode, together with the values they read from closures and globals, so changing a constant
+a lambda uses changes the fingerprint too. The helper functions, classes,
+containers and arrays a function reads are described recursively, and problems reading a value that can not be
+described raise FingerprintError rather than getting a fingerprint that would not change with it.
+"""
+
+from typing import Tuple, List, Set, Iterable, Iterator, Callable, Any
+import hashlib
+import inspect
+import types
+
+_SIMPLE_TYPES = (bool, int, float, complex, str, bytes, type(None))
+
+
+class FingerprintError(ValueError):
+    """
+    Raised when a problem references a value that can not be described, so its fingerprint could not tell it apart
+    from a problem using another value
+    """
+
+
+def _describe_constant(value: Any, seen: Set[int]) -> Any:
+    """
+    Describe a value a function reads, without the memory addresses object reprs contain.
+    Containers, arrays, functions and objects are described by their content, recursively.
+    """
+    if isinstance(value, _SIMPLE_TYPES):
+        return repr(value)
+    if isinstance(value, (tuple, list, set, frozenset)):
+        described = [_describe_constant(v, seen) for v in value]
+        if isinstance(value, (set, frozenset)):
+            described.sort(key=repr)
+        return type(value).__name__, tuple(described)
+    if isinstance(value, dict):
+        return "dict", tuple(sorted(
+            ((_describe_constant(k, seen), _describe_constant(v, seen)) for k, v in value.items()), key=repr
+        ))
+    if isinstance(value, types.ModuleType):
+        return "module", value.__name__
+    if isinstance(value, type):
+        try:
+            source: Any = inspect.getsource(value)
+        except (OSError, TypeError):
+            source = None
+        return "class", value.__module__, value.__qualname__, source
+    if hasattr(value, "dtype") and hasattr(value, "shape") and hasattr(value, "tobytes"):
+        # Arrays are described by a hash of their content
+        return "array", str(value.dtype), tuple(value.shape), hashlib.sha256(value.tobytes()).hexdigest()
+    if callable(value):
+        return _describe_function(value, seen)
+    if hasattr(value, "__dict__"):
+        if id(value) in seen:
+            return "recursive", type(value).__qualname__
+        seen.add(id(value))
+        return (
+            "object", type(value).__module__, type(value).__qualname__,
+            tuple(sorted((k, _describe_constant(v, seen)) for k, v in vars(value).items()))
+        )
+    raise FingerprintError(
+        f"Values of type {type(value).__qualname__} can not be described, so problems using them are not fingerprinted"
+    )
+
+
+def _global_names(code: types.CodeType) -> Iterator[str]:
+    """
+    The names a code object and the functions defined in it may read from the globals
+    """
+    yield from code.co_names
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            yield from _global_names(constant)
+
+
+def _describe_code(code: types.CodeType, seen: Set[int]) -> Tuple[Any, ...]:
+    """
+    Describe the bytecode of a function, with its constants and the names it reads.
+    The source alone is not enough: it is the whole line for a lambda, which may define several of them.
+    """
+    constants = tuple(
+        _describe_code(c, seen) if isinstance(c, types.CodeType) else _describe_constant(c, seen)
+        for c in code.co_consts
+    )
+    return code.co_code, constants, code.co_names, code.co_varnames, code.co_argcount
+
+
+def _describe_function(function: Any, seen: Set[int]) -> Tuple[Any, ...]:
+    from ECPF.expression import Expression
+    from ECPF.partial_filters import PartialFilter
+
+    if isinstance(function, Expression):
+        return "expression", function.source, function.variables
+    if isinstance(function, PartialFilter):
+        return "partial", _describe_function(function.function, seen), function.positions
+
+    # A function calling itself, or helpers calling each other, are described once
+    if id(function) in seen:
+        return "recursive", getattr(function, "__module__", None), getattr(function, "__qualname__", None)
+    seen.add(id(function))
+
+    if isinstance(function, (staticmethod, classmethod)):
+        return type(function).__name__, _describe_function(function.__func__, seen)
+    if isinstance(function, types.MethodType):
+        return "method", _describe_constant(function.__self__, seen), _describe_function(function.__func__, seen)
+
+    code = getattr(function, "__code__", None)
+    if code is None:
+        # Builtins and callable objects are described by their name, or their class and attributes
+        attributes = getattr(function, "__dict__", {})
+        return (
+            "object", getattr(function, "__module__", None), getattr(function, "__qualname__", None),
+            type(function).__qualname__,
+            tuple(sorted((k, _describe_constant(v, seen)) for k, v in attributes.items()))
+        )
+
+    try:
+        source: Any = inspect.getsource(function)
+    except (OSError, TypeError):
+        source = None
+
+    closure = []
+    for cell in function.__closure__ or ():
+        try:
+            contents = cell.cell_contents
+        except ValueError:  # An empty cell
+            closure.append(None)
+            continue
+        closure.append(_describe_constant(contents, seen))
+
+    # Every global the function reads, including the helpers it calls and the tables it looks values up in
+    function_globals = getattr(function, "__globals__", {})
+    names: List[str] = sorted(set(name for name in _global_names(code) if name in function_globals))
+    referenced = tuple((name, _describe_constant(function_globals[name], seen)) for name in names)
+
+    return (
+        "function", function.__module__, function.__qualname__, source, _describe_code(code, seen),
+        tuple(closure), referenced
+    )
+
+
+def _describe_value_iterator(value_iterator: Any, seen: Set[int]) -> Tuple[Any, ...]:
+    from ECPF.value_permutator import ComponentPermutator, ChainPermutator, SeriesParallelPermutator
+
+    if isinstance(value_iterator, ComponentPermutator):
+        return "values", tuple(float(v) for v in value_iterator.values), float(value_iterator.tolerance)
+    if isinstance(value_iterator, ChainPermutator):
+        return (
+            "chain",
+            tuple(_describe_value_iterator(c, seen) for c in value_iterator.components),
+            tuple(_describe_function(f, seen) for f in value_iterator.chaining_functions),
+            value_iterator.canonical
+        )
+    if isinstance(value_iterator, SeriesParallelPermutator):
+        return (
+            "series_parallel",
+            _describe_value_iterator(value_iterator.components, seen),
+            tuple(_describe_function(f, seen) for f in value_iterator.chaining_functions),
+            value_iterator.max_parts, value_iterator.epsilon
+        )
+
+    # Any other iterable is described by the values and extremes of its components
+    return "components", tuple((float(c), float(c.min_val), float(c.max_val)) for c in value_iterator)
+
+
+def problem_fingerprint(target_value: float,
+                        value_iterators: Iterable[Any],
+                        calculation_function: Callable[..., Any],
+                        filters: Iterable[Callable[..., Any]],
+                        *extra: Any) -> str:
+    """
+    Hash a search problem.
+
+    :param target_value: The target of the search
+    :param value_iterators: The value iterators of every position
+    :param calculation_function: The calculation function
+    :param filters: The filters, in their declared order
+    :param extra: Further values deciding the results, hashed by their repr
+    :return: A hex digest identifying the problem
+    :raises FingerprintError: If a function reads a value that can not be described
+    """
+    seen: Set[int] = set()
+    description = (
+        float(target_value),
+        tuple(_describe_value_iterator(vi, seen) for vi in value_iterators),
+        _describe_function(calculation_function, seen),
+        tuple(_describe_function(f, seen) for f in filters),
+        tuple(repr(e) for e in extra),
+    )
+    return hashlib.sha256(repr(description).encode()).hexdigest()
@@ -0,0 +1,182 @@
+"""
+Defines the mixed radix numbering of the permutations of a product of value iterators.
+
+Every permutation is addressed by a single integer, the digits of which are the indices of its values in every
+position, the last position being the fastest changing digit like in itertools.product. Permutations can then be
+counted, addressed and split into ranges without enumerating or holding the product.
+"""
+
+from typing import Tuple, List, Iterable, Sequence, Iterator, Optional, Any
+import functools
+import itertools
+import operator
+
+
+class MixedRadix:
+    """
+    The numbering of the index tuples of a product of positions of the given sizes
+    """
+
+    def __init__(self, sizes: Sequence[int]):
+        self.sizes: Tuple[int, ...] = tuple(int(s) for s in sizes)
+
+        # The number of permutations a step of every position's index skips
+        self.strides: Tuple[int, ...] = tuple(
+            functools.reduce(operator.mul, self.sizes[p + 1:], 1) for p in range(len(self.sizes))
+        )
+        self.count: int = functools.reduce(operator.mul, self.sizes, 1)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def decode(self, index: int) -> Tuple[int, ...]:
+        """
+        :return: The index of every position of the permutation at a flat index
+        """
+        if not 0 <= index < self.count:
+            raise IndexError(f"Permutation index {index} out of range for {self.count} permutations")
+        return tuple((index // stride) % size for stride, size in zip(self.strides, self.sizes))
+
+    def encode(self, indices: Sequence[int]) -> int:
+        """
+        :return: The flat index of the permutation with the given index in every position
+        """
+        return sum(i * stride for i, stride in zip(indices, self.strides))
+
+    def indices(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[int, ...]]:
+        """
+        Iterate the index tuples of the flat indices from start to stop, in order, by incrementing the digits
+        like an odometer, so each step costs O(1) amortized.
+        """
+        stop = self.count if stop is None else min(stop, self.count)
+        if start >= stop:
+            return
+
+        digits: List[int] = list(self.decode(start))
+        last = len(digits) - 1
+        for _ in range(start, stop):
+            yield tuple(digits)
+
+            position = last
+            while position >= 0:
+                digits[position] += 1
+                if digits[position] < self.sizes[position]:
+                    break
+                digits[position] = 0
+                position -= 1
+
+    def shards(self, count: int) -> List[Tuple[int, int]]:
+        """
+        Split the flat indices into count contiguous (start, stop) ranges of nearly equal sizes
+        """
+        count = max(1, count)
+        bounds = [self.count * i // count for i in range(count + 1)]
+        return [(start, stop) for start, stop in zip(bounds, bounds[1:]) if start < stop]
+
+
+class PermutatorSequence:
+    """
+    A permutator seen as a sequence: its length is its permutation count, and its items are built from their index.
+    Nothing is held in memory, every access builds the component again.
+
+    Reading the items in order, as the outer positions of a product are read, continues an iterator of the
+    permutator instead, so permutators whose at() has to iterate up to the index are not iterated from the start
+    for every item.
+    """
+
+    def __init__(self, permutator: Any):
+        self.permutator = permutator
+        self._length: int = permutator.permutation_count
+        self._cursor: Optional[Iterator[Any]] = None
+        self._cursor_index: int = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> Any:
+        if not 0 <= index < self._length:
+            raise IndexError(f"Component index {index} out of range for {self._length} components")
+        if index == 0:
+            self._cursor, self._cursor_index = iter(self.permutator), 0
+        if self._cursor is not None and index == self._cursor_index:
+            self._cursor_index += 1
+            return next(self._cursor)
+        return self.permutator.at(index)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.permutator)
+
+
+def as_sequence(value_iterator: Any) -> Sequence[Any]:
+    """
+    A sequence of the components of a value iterator, only materialized for iterators that are not permutators
+    """
+    if hasattr(value_iterator, "at") and hasattr(value_iterator, "permutation_count"):
+        return PermutatorSequence(value_iterator)
+    return tuple(value_iterator)
+
+
+class LazyProduct:
+    """
+    The product of value iterators, in the order of itertools.product, addressed by flat permutation index.
+
+    Only the components of the last position are held in memory while iterating, the components of the other
+    positions are built every time their index changes.
+    """
+
+    def __init__(self, value_iterators: Iterable[Any]):
+        self.positions: List[Sequence[Any]] = [as_sequence(vi) for vi in value_iterators]
+        self.space: MixedRadix = MixedRadix([len(p) for p in self.positions])
+
+    def __len__(self) -> int:
+        return self.space.count
+
+    def __getitem__(self, index: int) -> Tuple[Any, ...]:
+        return tuple(p[i] for p, i in zip(self.positions, self.space.decode(index)))
+
+    def __iter__(self) -> Iterator[Tuple[Any, ...]]:
+        return self.iterate()
+
+    def iterate(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Tuple[Any, ...]]:
+        """
+        Iterate the permutations of the flat indices from start to stop
+        """
+        return itertools.chain.from_iterable(self.blocks(start, stop))
+
+    def blocks(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Iterator[Tuple[Any, ...]]]:
+        """
+        Iterate the permutations of the flat indices from start to stop, as one iterator per permutation of the
+        outer positions. The permutations inside a block are produced by itertools.product, without going through
+        Python code for every permutation.
+        """
+        stop = self.space.count if stop is None else min(stop, self.space.count)
+        if start >= stop:
+            return
+        if len(self.positions) == 0:
+            yield iter(((),))
+            return
+
+        inner = tuple(self.positions[-1])
+        outer_positions = self.positions[:-1]
+        outer_start, inner_start = divmod(start, len(inner))
+        remaining = stop - start
+
+        # The outer components, rebuilt only for the positions whose index changed
+        prefix: List[Tuple[Any]] = []
+        previous: Tuple[int, ...] = ()
+        for outer_indices in MixedRadix([len(p) for p in outer_positions]).indices(outer_start):
+            if len(prefix) == 0:
+                prefix = [(p[i],) for p, i in zip(outer_positions, outer_indices)]
+            else:
+                for position, (i, previous_i) in enumerate(zip(outer_indices, previous)):
+                    if i != previous_i:
+                        prefix[position] = (outer_positions[position][i],)
+            previous = outer_indices
+
+            inner_stop = min(len(inner), inner_start + remaining)
+            yield itertools.product(*prefix, inner[inner_start:inner_stop])
+
+            remaining -= inner_stop - inner_start
+            inner_start = 0
+            if remaining <= 0:
+                return
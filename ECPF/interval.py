@@ -0,0 +1,115 @@
+"""
+Defines a minimal interval arithmetic type used to bound the values a calculation function can reach
+"""
+
+from typing import Tuple, Union
+import math
+
+
+class Interval:
+    """
+    A closed range of real numbers [lo, hi].
+
+    Arithmetic between intervals (and plain numbers) produces an interval containing every value the
+    operation can produce for operands taken from the operand intervals.
+    Intervals deliberately have no float value, so functions that call float() on their arguments
+    raise a TypeError when evaluated with intervals.
+    """
+
+    __slots__ = ("lo", "hi")
+
+    def __init__(self, lo: float, hi: float):
+        if math.isnan(lo) or math.isnan(hi):
+            lo, hi = -math.inf, math.inf
+        self.lo: float = lo
+        self.hi: float = hi
+
+    def __repr__(self) -> str:
+        return f"Interval({self.lo}, {self.hi})"
+
+    @staticmethod
+    def _coerce(other: Union["Interval", float]) -> "Interval":
+        if isinstance(other, Interval):
+            return other
+        return Interval(float(other), float(other))
+
+    @classmethod
+    def _from_candidates(cls, *values: float) -> "Interval":
+        if any(math.isnan(v) for v in values):
+            return cls(-math.inf, math.inf)
+        return cls(min(values), max(values))
+
+    def contains(self, value: float) -> bool:
+        return self.lo <= value <= self.hi
+
+    def bounds(self) -> Tuple[float, float]:
+        return self.lo, self.hi
+
+    def __float__(self) -> float:
+        raise TypeError("An interval has no single float value")
+
+    def __add__(self, other):
+        other = self._coerce(other)
+        return Interval(self.lo + other.lo, self.hi + other.hi)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        other = self._coerce(other)
+        return Interval(self.lo - other.hi, self.hi - other.lo)
+
+    def __rsub__(self, other):
+        return self._coerce(other) - self
+
+    def __mul__(self, other):
+        other = self._coerce(other)
+        return self._from_candidates(
+            self.lo * other.lo, self.lo * other.hi, self.hi * other.lo, self.hi * other.hi
+        )
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        other = self._coerce(other)
+        if other.contains(0.0):
+            return Interval(-math.inf, math.inf)
+        return self * Interval(1.0 / other.hi, 1.0 / other.lo)
+
+    def __rtruediv__(self, other):
+        return self._coerce(other) / self
+
+    def __neg__(self):
+        return Interval(-self.hi, -self.lo)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        if self.lo >= 0.0:
+            return self
+        if self.hi <= 0.0:
+            return -self
+        return Interval(0.0, max(-self.lo, self.hi))
+
+    def __rpow__(self, base):
+        # A positive base raised to an interval is monotonic in the exponent
+        base = float(base)
+        if base <= 0.0:
+            return Interval(-math.inf, math.inf)
+        return self._from_candidates(base ** self.lo, base ** self.hi)
+
+    def __pow__(self, exponent):
+        if isinstance(exponent, Interval) or exponent != int(exponent):
+            # Non integer powers are only defined, and monotonic, for non negative bases
+            if isinstance(exponent, Interval) or self.lo < 0.0:
+                return Interval(-math.inf, math.inf)
+            return self._from_candidates(self.lo ** exponent, self.hi ** exponent)
+
+        exponent = int(exponent)
+        if exponent == 0:
+            return Interval(1.0, 1.0)
+        if exponent < 0:
+            return 1.0 / (self ** -exponent)
+        if exponent % 2 == 0 and self.contains(0.0):
+            return Interval(0.0, max(self.lo ** exponent, self.hi ** exponent))
+        return self._from_candidates(self.lo ** exponent, self.hi ** exponent)
@@ -0,0 +1,189 @@
+"""
+Defines a solver for searches whose calculation function is monotonic in one of its arguments.
+
+With every other argument fixed, the values of such a function are sorted like the components of the free argument,
+so the components closest to the target are found by bisecting the sorted components of the free position, which
+evaluates the function O(log(n)) times, then walking outwards from where the values cross the target.
+This replaces the innermost loop of the search, turning the O(n^k) scan of k positions into O(n^(k-1) log(n)).
+"""
+
+from typing import Tuple, List, Iterable, Sequence, Callable, Optional, Any
+
+from ECPF.components import iComponent
+from ECPF.component_config_functs import find_monotonicity
+from ECPF.bisect_solver import nearest_first
+from ECPF.partial_filters import PartialFilter
+from ECPF.index_space import MixedRadix
+from ECPF.expression import Expression
+from ECPF.result_store import TopKResults
+
+
+def argument_directions(calculation_function: Callable[..., Any], candidates: Sequence[Sequence[Any]],
+                        monotonicity: Optional[Sequence[int]] = None) -> List[Optional[int]]:
+    """
+    Find the direction the calculation function changes in with every argument, over the nominal values of the
+    candidates: the given monotonicity, the one declared with monotonic(), or the one an Expression proves for every
+    argument separately.
+
+    :param calculation_function: The calculation function of a ValueFilter
+    :param candidates: The components of every position
+    :param monotonicity: The monotonicity declared on the ValueFilter, if any
+    :return: 1 for every argument the function is non decreasing in, -1 for every argument it is non increasing in,
+        and None for every argument whose direction is not known
+    """
+    positions = len(candidates)
+
+    declared = monotonicity if monotonicity is not None else find_monotonicity(calculation_function)
+    if declared is not None and len(declared) == positions:
+        return [d if d in (1, -1) else None for d in declared]
+
+    if not isinstance(calculation_function, Expression) or len(calculation_function.variables) != positions:
+        return [None] * positions
+
+    intervals = []
+    for components in candidates:
+        values = [float(c) for c in components]
+        intervals.append((min(values), max(values)))
+
+    directions: List[Optional[int]] = []
+    for variable in calculation_function.variables:
+        try:
+            lo, hi = calculation_function.derivative(variable).bounds(*intervals)
+        except (ArithmeticError, ValueError):
+            directions.append(None)
+            continue
+        # An argument the function does not depend on is both, and sorted either way
+        directions.append(1 if lo >= 0.0 else -1 if hi <= 0.0 else None)
+    return directions
+
+
+class InversePlan:
+    """
+    The shape of a search that the inverse solver can answer.
+
+    candidates holds the components of every position, free_position the position the function is monotonic in,
+    whose components are bisected, and direction whether the function increases (1) or decreases (-1) with it.
+    """
+
+    def __init__(self, candidates: List[Tuple[Any, ...]], free_position: int, direction: int):
+        self.candidates = candidates
+        self.free_position = free_position
+        self.direction = direction
+
+        free_components = candidates[free_position]
+        self.sorted_indices: List[int] = sorted(range(len(free_components)), key=lambda i: float(free_components[i]))
+        self.sorted_components: List[Any] = [free_components[i] for i in self.sorted_indices]
+
+        # Results are ordered by their flat index in the product, like the results of a scan of the product
+        self.space: MixedRadix = MixedRadix([len(c) for c in candidates])
+
+
+def plan_inverse(candidates: Iterable[Sequence[Any]], calculation_function: Callable[..., Any],
+                 monotonicity: Optional[Sequence[int]] = None) -> Optional[InversePlan]:
+    """
+    Check if a search can be answered by the inverse solver.
+
+    :param candidates: The components of every position
+    :param calculation_function: The calculation function of a ValueFilter
+    :param monotonicity: The monotonicity declared on the ValueFilter, if any
+    :return: The plan describing the search, or None if the function is not known to be monotonic in any argument
+    """
+    candidates = [tuple(c) for c in candidates]
+    if len(candidates) == 0 or any(len(c) == 0 for c in candidates):
+        return None
+
+    directions = argument_directions(calculation_function, candidates, monotonicity)
+    monotonic_positions = [p for p, d in enumerate(directions) if d is not None]
+    if len(monotonic_positions) == 0:
+        return None
+
+    # Bisecting the position with the most components saves the most evaluations, the innermost one on ties
+    free_position = max(monotonic_positions, key=lambda p: (len(candidates[p]), p))
+    return InversePlan(candidates, free_position, directions[free_position])  # type: ignore
+
+
+def inverse_search(plan: InversePlan,
+                   calculation_function: Callable[..., Any],
+                   filters: Iterable[Callable[..., bool]],
+                   target_value: float,
+                   results: TopKResults) -> Tuple[int, int]:
+    """
+    Fill the result store with the permutations of the plan closest to the target.
+
+    The store ends up holding exactly what an exhaustive scan would have kept. For every permutation of the other
+    positions, only the components of the free position that could still make it into the store are evaluated.
+    Filters of positions that do not include the free position are tested once per permutation of the others,
+    and the permutations they reject count as tested and filtered.
+
+    :param plan: The plan returned by plan_inverse
+    :param calculation_function: The calculation function of the ValueFilter
+    :param filters: Filters that every kept permutation must satisfy
+    :param target_value: The value the calculation function aims to achieve
+    :param results: The store to add the best permutations to
+    :return: The number of permutations tested and the number of permutations filtered
+    """
+    target_value = float(target_value)
+    free_position = plan.free_position
+    direction = plan.direction
+    sorted_components = plan.sorted_components
+    free_count = len(sorted_components)
+    tested = 0
+    filtered = 0
+
+    outer_filters: List[PartialFilter] = []
+    free_filters: List[Callable[..., bool]] = []
+    for filter_funct in filters:
+        if isinstance(filter_funct, PartialFilter) and free_position not in filter_funct.positions:
+            outer_filters.append(filter_funct)
+        else:
+            free_filters.append(filter_funct)
+
+    outer_candidates = plan.candidates[:free_position] + plan.candidates[free_position + 1:]
+    arguments: List[Any] = [None] * len(plan.candidates)
+
+    def value_at(sorted_index: int) -> Any:
+        arguments[free_position] = sorted_components[sorted_index]
+        return calculation_function(*arguments)
+
+    for outer_indices in MixedRadix([len(c) for c in outer_candidates]).indices():
+        indices = list(outer_indices)
+        indices.insert(free_position, 0)
+        for position, (components, i) in enumerate(zip(plan.candidates, indices)):
+            if position != free_position:
+                arguments[position] = components[i]
+
+        if not all(f.test(arguments) for f in outer_filters):
+            tested += free_count
+            filtered += free_count
+            continue
+
+        # The first sorted component whose value is on the other side of the target
+        lo, hi = 0, free_count
+        while lo < hi:
+            middle = (lo + hi) // 2
+            if direction * (float(value_at(middle)) - target_value) < 0:
+                lo = middle + 1
+            else:
+                hi = middle
+
+        for sorted_index, value, error in nearest_first(free_count, lo, value_at, target_value):
+
+            # Every remaining component is further from the target than the worst kept result
+            if error > results.worst_error:
+                break
+
+            indices[free_position] = plan.sorted_indices[sorted_index]
+            order = plan.space.encode(indices)
+            if not results.accepts(error, order):
+                continue
+
+            permutation: Tuple[iComponent, ...] = tuple(arguments[:free_position]) + (
+                sorted_components[sorted_index],) + tuple(arguments[free_position + 1:])
+
+            tested += 1
+            if all(f(*permutation) for f in free_filters):
+                results.add(permutation, value, error, order=order)
+            else:
+                filtered += 1
+
+    return tested, filtered
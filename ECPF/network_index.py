@@ -0,0 +1,265 @@
+"""
+Defines a persistent, memory mapped index of the series/parallel networks that can be built from an inventory.
+
+Building the index enumerates every 1, 2 and 3 part network over the inventory once, and writes their values
+sorted into a float64 array next to a compact table describing the topology of each network.
+Loading the index memory maps both files, so finding the networks closest to a target is a binary search
+over the mapped values, and network objects are only created for the networks that are actually used.
+"""
+
+from typing import Tuple, List, Iterable, Iterator, Sequence, Generator, Type, TYPE_CHECKING
+import json
+import os
+import tempfile
+
+import numpy as np  # type: ignore
+
+from ECPF.checkpoint import write_atomically
+from ECPF.components import iComponent, Component, ChainPermutation
+from ECPF.value_permutator import iSortedPermutator
+from ECPF.component_config_functs import iConfiguration, CONFIGURATIONS
+
+if TYPE_CHECKING:
+    from ECPF.component_array import ComponentArray
+
+# The chaining functions, by name, of every topology code stored in the topology table
+TOPOLOGIES: Tuple[Tuple[str, ...], ...] = (
+    (),
+    ("series",),
+    ("parallel",),
+    ("series", "series"),
+    ("parallel", "parallel"),
+    ("parallel", "series"),
+    ("series", "parallel"),
+)
+
+_VALUES_FILE = "values.npy"
+_TOPOLOGY_FILE = "topology.npy"
+_BASE_FILE = "base_values.npy"
+_META_FILE = "meta.json"
+
+# The number of networks sorted into the index files per step
+_CHUNK_SIZE = 2 ** 20
+
+
+def _pairs(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Every index pair i <= j, so commutative networks are only enumerated once
+    """
+    return np.triu_indices(n)
+
+
+def _enumerate_networks(base: np.ndarray, configuration: Type[iConfiguration], max_parts: int
+                        ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Enumerate the networks in chunks of at most len(base) * (len(base) + 1) / 2 networks
+
+    :return: An iterator of the value of every network of a chunk, and its topology code followed by the indices
+        of its parts (-1 if unused)
+    """
+    n = len(base)
+
+    def chunk(code: int, network_values: np.ndarray, *parts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        table = np.full((len(network_values), 4), -1, dtype=np.int32)
+        table[:, 0] = code
+        for column, part in enumerate(parts, start=1):
+            table[:, column] = part
+        return np.asarray(network_values, dtype=np.float64), table
+
+    yield chunk(0, base.copy(), np.arange(n))
+
+    if max_parts >= 2:
+        i, j = _pairs(n)
+        yield chunk(1, configuration.series(base[i], base[j]), i, j)
+        yield chunk(2, configuration.parallel(base[i], base[j]), i, j)
+
+    if max_parts >= 3:
+        # Three parts with a single function are fully commutative: enumerate i <= j <= k
+        for k in range(n):
+            i, j = _pairs(k + 1)
+            kk = np.full(len(i), k)
+            for code in (3, 4):
+                function = getattr(configuration, TOPOLOGIES[code][0])
+                yield chunk(code, function(function(base[i], base[j]), base[kk]), i, j, kk)
+
+        # Mixed functions only commute inside the first pair
+        i, j = _pairs(n)
+        for code in (5, 6):
+            first, second = (getattr(configuration, name) for name in TOPOLOGIES[code])
+            pair_values = first(base[i], base[j])
+            for k in range(n):
+                yield chunk(code, second(pair_values, base[k]), i, j, np.full(len(i), k))
+
+
+class NetworkIndex(iSortedPermutator):
+    """
+    A memory mapped inventory of series/parallel networks sorted by value.
+
+    It can be used as a value iterator of a ValueFilter: searches whose calculation function returns its argument
+    are answered by bisecting the mapped values instead of regenerating every network.
+    """
+
+    def __init__(self, path: str):
+        self.path: str = path
+
+        with open(os.path.join(path, _META_FILE)) as f:
+            meta = json.load(f)
+        self.tolerance: float = meta["tolerance"]
+        self.configuration: Type[iConfiguration] = next(
+            c for c in CONFIGURATIONS if c.__name__ == meta["configuration"]
+        )
+
+        self._values: np.ndarray = np.load(os.path.join(path, _VALUES_FILE), mmap_mode="r")
+        self._topology: np.ndarray = np.load(os.path.join(path, _TOPOLOGY_FILE), mmap_mode="r")
+        self._base: np.ndarray = np.load(os.path.join(path, _BASE_FILE))
+
+    @classmethod
+    def build(cls, path: str, values: Iterable[float], configuration: Type[iConfiguration],
+              tolerance: float = 0.0, max_parts: int = 3) -> "NetworkIndex":
+        """
+        Enumerate every network of up to max_parts parts and write the index to a directory.
+        The networks are enumerated and sorted in chunks through scratch files, and the index files replace those
+        of a previous index only once they are complete.
+
+        :param path: The directory to write the index to, created if missing
+        :param values: The values of the parts in the inventory, for instance iterate_value_order_magnitude output
+        :param configuration: The configuration class providing the series and parallel functions
+        :param tolerance: The tolerance of every part
+        :param max_parts: The largest number of parts in a network, 1 to 3
+        :return: The loaded index
+        """
+        if configuration not in CONFIGURATIONS:
+            raise ValueError(f"Only the configurations of ECPF.component_config_functs can be indexed: {configuration}")
+        if not 1 <= max_parts <= 3:
+            raise ValueError(f"max_parts must be between 1 and 3: {max_parts}")
+
+        base = np.unique(np.fromiter((float(v) for v in values), dtype=np.float64))
+        os.makedirs(path, exist_ok=True)
+
+        temporary_paths: List[str] = []
+
+        def temporary(suffix: str) -> str:
+            descriptor, temporary_path = tempfile.mkstemp(dir=path, prefix=".tmp_", suffix=suffix)
+            os.close(descriptor)
+            temporary_paths.append(temporary_path)
+            return temporary_path
+
+        try:
+            # The networks are written unsorted to scratch files chunk by chunk rather than held in memory,
+            # then sorted into the index files chunk by chunk
+            unsorted_values_path, unsorted_topology_path = temporary(".values"), temporary(".topology")
+            with open(unsorted_values_path, "wb") as values_file, open(unsorted_topology_path, "wb") as topology_file:
+                for network_values, topology in _enumerate_networks(base, configuration, max_parts):
+                    network_values.tofile(values_file)
+                    topology.tofile(topology_file)
+
+            unsorted_values = np.memmap(unsorted_values_path, dtype=np.float64, mode="r")
+            unsorted_topology = np.memmap(unsorted_topology_path, dtype=np.int32, mode="r").reshape(-1, 4)
+            order = np.argsort(unsorted_values, kind="stable")
+
+            values_path, topology_path, base_path = temporary(".npy"), temporary(".npy"), temporary(".npy")
+            sorted_values = np.lib.format.open_memmap(values_path, mode="w+", dtype=np.float64, shape=(len(order),))
+            sorted_topology = np.lib.format.open_memmap(topology_path, mode="w+", dtype=np.int32,
+                                                        shape=(len(order), 4))
+            for start in range(0, len(order), _CHUNK_SIZE):
+                rows = order[start:start + _CHUNK_SIZE]
+                sorted_values[start:start + len(rows)] = unsorted_values[rows]
+                sorted_topology[start:start + len(rows)] = unsorted_topology[rows]
+            sorted_values.flush()
+            sorted_topology.flush()
+            del sorted_values, sorted_topology, unsorted_values, unsorted_topology
+            np.save(base_path, base)
+
+            # Without its metadata an index fails to load, so a crash while the files are replaced can not leave
+            # an index mixing the files of two builds
+            meta_path = os.path.join(path, _META_FILE)
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
+            for temporary_path, name in ((values_path, _VALUES_FILE), (topology_path, _TOPOLOGY_FILE),
+                                         (base_path, _BASE_FILE)):
+                os.replace(temporary_path, os.path.join(path, name))
+            write_atomically(meta_path, json.dumps(
+                {"configuration": configuration.__name__, "tolerance": tolerance, "max_parts": max_parts}
+            ))
+        finally:
+            for temporary_path in temporary_paths:
+                if os.path.exists(temporary_path):
+                    os.remove(temporary_path)
+
+        return cls(path)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @property
+    def permutation_count(self) -> int:
+        return len(self._values)
+
+    @property
+    def sorted_values(self) -> Sequence[float]:
+        return self._values
+
+    def component_at(self, index: int) -> iComponent:
+        code, *parts = (int(v) for v in self._topology[index])
+        chain_vals = tuple(Component(float(self._base[p]), self.tolerance) for p in parts if p >= 0)
+        chain_functions = tuple(getattr(self.configuration, name) for name in TOPOLOGIES[code])
+        return ChainPermutation(chain_vals, chain_functions)
+
+    def as_array(self) -> "ComponentArray":
+        """
+        The networks as columns read from the mapped values and topology table, without creating a network object
+        per entry. Every network is a chain of up to three base values, whose topology code selects its functions.
+        """
+        from ECPF.component_array import ComponentArray
+
+        topology = np.asarray(self._topology)
+        codes = topology[:, 0]
+        parts = topology[:, 1:]
+        base = ComponentArray.from_values(self._base, self.tolerance)
+        functions = [tuple(getattr(self.configuration, name) for name in names) for names in TOPOLOGIES]
+
+        # The series and parallel functions increase with both arguments, so the extremes of a network are the
+        # folds of the extremes of its parts, like ChainPermutation computes them
+        minimum = np.empty(len(codes), dtype=np.float64)
+        maximum = np.empty(len(codes), dtype=np.float64)
+        for code, chain_functions in enumerate(functions):
+            rows = np.flatnonzero(codes == code)
+            columns = parts[rows, :len(chain_functions) + 1]
+            low, high = base.minimum[columns[:, 0]], base.maximum[columns[:, 0]]
+            for column, function in zip(columns.T[1:], chain_functions):
+                low, high = function(low, base.minimum[column]), function(high, base.maximum[column])
+            minimum[rows], maximum[rows] = low, high
+
+        return ComponentArray(
+            self._values, minimum, maximum,
+            tolerance=np.full(len(codes), self.tolerance, dtype=np.float64),
+            topology=codes.astype(np.int32), functions=functions,
+            parts=parts, part_arrays=[base] * parts.shape[1]
+        )
+
+    def nearest(self, target_value: float, count: int = 1) -> List[iComponent]:
+        """
+        Find the networks whose values are closest to a target.
+
+        :param target_value: The value to look for
+        :param count: The number of networks to return
+        :return: The networks ordered from the closest to the furthest
+        """
+        position = int(np.searchsorted(self._values, target_value))
+        left, right = position - 1, position
+        found: List[int] = []
+
+        while len(found) < count and (left >= 0 or right < len(self._values)):
+            if right >= len(self._values) or (
+                    left >= 0 and target_value - self._values[left] <= self._values[right] - target_value):
+                found.append(left)
+                left -= 1
+            else:
+                found.append(right)
+                right += 1
+
+        return [self.component_at(i) for i in found]
+
+    def __iter__(self) -> Generator[iComponent, None, None]:
+        for i in range(len(self._values)):
+            yield self.component_at(i)
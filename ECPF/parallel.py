@@ -0,0 +1,245 @@
+"""
+Defines a process pool search that splits the permutation product into shards of the outermost value iterator.
+
+Every shard is evaluated by the vectorized search in a worker process with its own top results.
+The shard results are then merged deterministically, ties being broken by the permutation's index in the product.
+"""
+
+from typing import Tuple, List, Dict, Sequence, Callable, Optional, Any
+from concurrent.futures import ProcessPoolExecutor
+import importlib
+import marshal
+import pickle
+import types
+
+import numpy as np  # type: ignore
+
+from ECPF.vectorized import search_product, keep_best
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+
+class PortableFunction:
+    """
+    Wraps a function so it can be sent to worker processes.
+
+    Functions that pickle by reference (module level functions, or picklable callables) are sent as is.
+    Others, like lambdas and closures, are sent as their marshalled code together with the default arguments,
+    closure values and module globals they reference.
+    """
+
+    def __init__(self, function: Callable[..., Any]):
+        self.function = function
+
+    def __call__(self, *args, **kwargs):
+        return self.function(*args, **kwargs)
+
+    def __reduce__(self):
+        try:
+            pickle.dumps(self.function)
+            return PortableFunction, (self.function,)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            pass
+
+        function = self.function
+        closure = None
+        if function.__closure__ is not None:
+            closure = tuple(_portable_value(cell.cell_contents) for cell in function.__closure__)
+
+        return _rebuild_function, (
+            marshal.dumps(function.__code__),
+            _referenced_globals(function),
+            function.__name__,
+            tuple(_portable_value(d) for d in function.__defaults__) if function.__defaults__ else None,
+            closure,
+        )
+
+
+def _portable_value(value: Any) -> Any:
+    if isinstance(value, types.FunctionType):
+        return PortableFunction(value)
+    return value
+
+
+def _global_names(code: types.CodeType) -> List[str]:
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names.extend(_global_names(const))
+    return names
+
+
+def _referenced_globals(function: types.FunctionType) -> Dict[str, Tuple[str, Any]]:
+    """
+    Collect the module globals a function refers to, modules by name and other values by pickling them.
+    """
+    referenced: Dict[str, Tuple[str, Any]] = {}
+    for name in _global_names(function.__code__):
+        if name not in function.__globals__:
+            continue
+        value = function.__globals__[name]
+        if isinstance(value, types.ModuleType):
+            referenced[name] = ("module", value.__name__)
+        else:
+            try:
+                pickle.dumps(_portable_value(value))
+            except Exception:
+                continue
+            referenced[name] = ("value", _portable_value(value))
+    return referenced
+
+
+def _make_cell(value: Any) -> Any:
+    return (lambda: value).__closure__[0]  # type: ignore
+
+
+def _rebuild_function(code_bytes: bytes, referenced: Dict[str, Tuple[str, Any]], name: str,
+                      defaults: Optional[tuple], closure_values: Optional[tuple]) -> PortableFunction:
+    function_globals: Dict[str, Any] = {"__builtins__": __builtins__}
+    for global_name, (kind, value) in referenced.items():
+        function_globals[global_name] = importlib.import_module(value) if kind == "module" else value
+
+    closure = None
+    if closure_values is not None:
+        closure = tuple(_make_cell(v) for v in closure_values)
+
+    code = marshal.loads(code_bytes)
+    return PortableFunction(types.FunctionType(code, function_globals, name, defaults, closure))
+
+
+class SharedInventory:
+    """
+    The nominal values of every position packed into one float64 block.
+
+    When shared memory is available the block lives in a SharedMemory segment that workers attach to by name,
+    otherwise it is copied to every worker once, when the worker starts.
+    """
+
+    def __init__(self, values: Sequence[np.ndarray]):
+        self.sizes: List[int] = [len(v) for v in values]
+        packed = np.concatenate(values) if len(values) > 0 else np.empty(0, dtype=np.float64)
+
+        self._segment = None
+        if shared_memory is not None and packed.nbytes > 0:
+            self._segment = shared_memory.SharedMemory(create=True, size=packed.nbytes)
+            np.ndarray(packed.shape, dtype=np.float64, buffer=self._segment.buf)[:] = packed
+            self.descriptor: Tuple[Any, ...] = ("shared", self._segment.name, self.sizes)
+        else:
+            self.descriptor = ("copied", packed, self.sizes)
+
+    def close(self) -> None:
+        if self._segment is not None:
+            self._segment.close()
+            self._segment.unlink()
+            self._segment = None
+
+
+def _attach_inventory(descriptor: Tuple[Any, ...]) -> Tuple[Any, List[np.ndarray]]:
+    kind, data, sizes = descriptor
+    segment = None
+    if kind == "shared":
+        segment = shared_memory.SharedMemory(name=data)
+        packed = np.ndarray((sum(sizes),), dtype=np.float64, buffer=segment.buf)
+    else:
+        packed = data
+
+    offsets = np.cumsum([0] + list(sizes))
+    return segment, [packed[a:b] for a, b in zip(offsets[:-1], offsets[1:])]
+
+
+# The state of a worker process, set once by _initialize_worker
+_worker_state: Dict[str, Any] = {}
+
+
+def _initialize_worker(descriptor, calculation_function, filters, target_value, number_of_results, block_size,
+                       duplicate_tolerance):
+    segment, values = _attach_inventory(descriptor)
+    _worker_state.update(
+        segment=segment,
+        values=values,
+        calculation_function=calculation_function,
+        filters=filters,
+        target_value=target_value,
+        number_of_results=number_of_results,
+        block_size=block_size,
+        duplicate_tolerance=duplicate_tolerance,
+    )
+
+
+def _search_shard(start: int, stop: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int, int]:
+    """
+    Search the permutations whose outermost value index lies in [start, stop).
+    """
+    values = _worker_state["values"]
+    indices, errors, results, tested, filtered = search_product(
+        values=[values[0][start:stop]] + values[1:],
+        calculation_function=_worker_state["calculation_function"],
+        filters=_worker_state["filters"],
+        target_value=_worker_state["target_value"],
+        number_of_results=_worker_state["number_of_results"],
+        block_size=_worker_state["block_size"],
+        duplicate_tolerance=_worker_state["duplicate_tolerance"],
+    )
+
+    # Shift the shard local indices to indices in the full product
+    inner_size = int(np.prod([len(v) for v in values[1:]], dtype=np.int64))
+    return indices + start * inner_size, errors, results, tested, filtered
+
+
+def parallel_search_product(values: List[np.ndarray],
+                            calculation_function: Callable[..., Any],
+                            filters: Sequence[Callable[..., Any]],
+                            target_value: float,
+                            number_of_results: int,
+                            workers: int,
+                            block_size: int = 2 ** 16,
+                            shards_per_worker: int = 4,
+                            duplicate_tolerance: Optional[float] = None,
+                            ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int, int]:
+    """
+    The process pool counterpart of vectorized.search_product, with the same arguments and return value.
+
+    :param workers: The number of worker processes
+    :param shards_per_worker: How many shards to cut per worker, so uneven shards still balance out
+    """
+    if len(values) == 0 or len(values[0]) == 0 or number_of_results <= 0:
+        return search_product(values, calculation_function, filters, target_value, number_of_results, block_size,
+                              duplicate_tolerance)
+
+    outer_size = len(values[0])
+    shard_count = max(1, min(outer_size, workers * shards_per_worker))
+    bounds = [outer_size * s // shard_count for s in range(shard_count + 1)]
+
+    inventory = SharedInventory(values)
+    try:
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_initialize_worker,
+                initargs=(
+                    inventory.descriptor,
+                    PortableFunction(calculation_function),
+                    tuple(PortableFunction(f) for f in filters),
+                    float(target_value),
+                    number_of_results,
+                    block_size,
+                    duplicate_tolerance,
+                )
+        ) as executor:
+            shard_results = list(executor.map(_search_shard, bounds[:-1], bounds[1:]))
+    finally:
+        inventory.close()
+
+    best_errors, best_indices, best_values = keep_best(
+        np.concatenate([r[1] for r in shard_results]),
+        np.concatenate([r[0] for r in shard_results]),
+        np.concatenate([r[2] for r in shard_results]),
+        number_of_results, duplicate_tolerance
+    )
+    order = np.lexsort((best_indices, best_errors))
+    return (
+        best_indices[order], best_errors[order], best_values[order],
+        sum(r[3] for r in shard_results), sum(r[4] for r in shard_results)
+    )
@@ -0,0 +1,117 @@
+"""
+Defines filters that only depend on some of the calculation function's arguments.
+
+Such a filter can be tested as soon as the positions it depends on are bound, and when it fails the whole
+product of the remaining positions is skipped without being enumerated.
+"""
+
+from typing import Tuple, List, Iterable, Sequence, Callable, Optional, Any
+import inspect
+
+
+class PartialFilter:
+    """
+    A filter of the values at some positions of the permutation.
+
+    Calling it with a full permutation passes the values at its positions to the wrapped function,
+    so it can be used wherever a filter of the full permutation is expected.
+    """
+
+    def __init__(self, function: Callable[..., Any], positions: Sequence[int]):
+        """
+        :param function: The filter, taking the values at positions in the given order
+        :param positions: The positions of the permutation the filter takes
+        """
+        self.function: Callable[..., Any] = function
+        self.positions: Tuple[int, ...] = tuple(positions)
+
+        # The filter can be tested once every position up to depth is bound
+        self.depth: int = max(self.positions) if len(self.positions) > 0 else 0
+
+    def __call__(self, *args) -> Any:
+        return self.function(*[args[p] for p in self.positions])
+
+    def test(self, bound: Sequence[Any]) -> Any:
+        """
+        Test the filter on the values bound so far, which must include every position of the filter
+        """
+        return self.function(*[bound[p] for p in self.positions])
+
+    def __reduce__(self):
+        # Lambdas are sent to worker processes wrapped like the other search functions
+        from ECPF.parallel import PortableFunction
+
+        return PartialFilter, (PortableFunction(self.function), self.positions)
+
+
+def uses(*positions: int) -> Callable[[Callable[..., Any]], PartialFilter]:
+    """
+    Declare the positions a filter takes, for filters whose parameter names do not match
+    the calculation function's.
+
+        filters=[uses(0)(lambda r: float(r) > 100)]
+
+    :param positions: The positions of the permutation passed to the filter, in order
+    """
+    def declare(function: Callable[..., Any]) -> PartialFilter:
+        return PartialFilter(function, positions)
+    return declare
+
+
+def _positional_parameters(function: Callable[..., Any]) -> Optional[List[str]]:
+    """
+    The names of the positional parameters of a function, None if it takes *args or has no signature.
+    Parameters with defaults, such as the values captured by lambda r1, r2, lim=5000: ..., are not positions.
+    """
+    try:
+        parameters = inspect.signature(function).parameters.values()
+    except (TypeError, ValueError):
+        return None
+
+    names = []
+    defaults_reached = False
+    for parameter in parameters:
+        if parameter.kind == inspect.Parameter.VAR_POSITIONAL:
+            return None
+        if parameter.kind in (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD):
+            defaults_reached = defaults_reached or parameter.default is not inspect.Parameter.empty
+            if not defaults_reached:
+                names.append(parameter.name)
+    return names
+
+
+def bind_filters(filters: Iterable[Callable[..., Any]], calculation_function: Callable[..., Any],
+                 position_count: int) -> List[Callable[..., Any]]:
+    """
+    Find the positions every filter takes.
+
+    Filters taking as many arguments as there are positions are filters of the full permutation, and are
+    returned unchanged. Filters taking fewer arguments are matched to positions by their parameter names,
+    which must be names of the calculation function's parameters.
+
+    :param filters: The filters of a ValueFilter
+    :param calculation_function: The calculation function, whose parameter names name the positions
+    :param position_count: The number of positions of the permutations
+    :return: The filters, with the filters of some positions as PartialFilter objects
+    """
+    calculation_names = _positional_parameters(calculation_function) or []
+
+    bound: List[Callable[..., Any]] = []
+    for filter_funct in filters:
+        if isinstance(filter_funct, PartialFilter):
+            bound.append(filter_funct)
+            continue
+
+        names = _positional_parameters(filter_funct)
+        if names is None or len(names) == position_count:
+            bound.append(filter_funct)
+        elif all(name in calculation_names for name in names):
+            bound.append(PartialFilter(filter_funct, [calculation_names.index(name) for name in names]))
+        else:
+            raise ValueError(
+                f"The filter {getattr(filter_funct, '__name__', filter_funct)} takes {len(names)} arguments "
+                f"{tuple(names)}, but the permutations have {position_count} positions. "
+                f"Name its parameters after the calculation function's parameters {tuple(calculation_names)}, "
+                f"or declare the positions it takes with uses()"
+            )
+    return bound
@@ -0,0 +1,337 @@
+"""
+Defines an opt-in profile of where the time of a ValueFilter search goes.
+
+The scan of the whole product one permutation at a time counts its stages in its loop (see ScanCounts),
+and times every stage of one permutation in timing_interval. The other searches call the calculation function and
+filters far less often, or once per block of permutations, and while they run the calculation function, the
+filters and the result store are wrapped with counters and timers instead.
+Searches without a profile are neither wrapped nor counted, so they pay nothing for it.
+"""
+
+from typing import Dict, List, Callable, Optional, Any
+import functools
+import json
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore
+
+
+class CallCounter:
+    """
+    Counts the calls of a wrapped function, and times a sample of them.
+
+    The first calls and then one call in every timing_interval are timed, and the total time is extrapolated
+    from them. Searches evaluating one permutation per call make millions of calls, so timing every one of them
+    would cost more than many of the functions being timed.
+    """
+
+    def __init__(self, timing_interval: int):
+        self.timing_interval: int = max(1, timing_interval)
+        self.invocations: int = 0
+        self.timed_invocations: int = 0
+        self.timed_seconds: float = 0.0
+
+    def timed_call(self, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Call and time a function. Wrappers count every call themselves and only come here for the sampled calls,
+        so the untimed calls cost as little as possible.
+        """
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.timed_seconds += time.perf_counter() - start
+        self.timed_invocations += 1
+        return result
+
+    @property
+    def is_untimed(self) -> bool:
+        return self.invocations > self.timing_interval and self.invocations % self.timing_interval != 0
+
+    @property
+    def seconds(self) -> float:
+        if self.timed_invocations == 0:
+            return 0.0
+        return self.timed_seconds * self.invocations / self.timed_invocations
+
+
+def _size(result: Any) -> int:
+    """
+    The number of values a call evaluated: the size of an array result, 1 otherwise
+    """
+    return int(result.size) if getattr(result, "ndim", 0) > 0 else 1
+
+
+class FilterProfile:
+    """
+    The counters of one filter. Array calls (vectorized searches) count every element as a call.
+    """
+
+    def __init__(self, name: str, timing_interval: int):
+        self.name: str = name
+        self.calls: int = 0
+        self.rejections: int = 0
+        self.counter: CallCounter = CallCounter(timing_interval)
+
+    @property
+    def rejection_rate(self) -> float:
+        return self.rejections / self.calls if self.calls > 0 else 0.0
+
+    @property
+    def seconds(self) -> float:
+        return self.counter.seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "rejections": self.rejections,
+            "rejection_rate": self.rejection_rate,
+            "seconds": self.seconds,
+        }
+
+
+class SearchProfile:
+    """
+    Counters and timers of the searches run by a ValueFilter it is attached to.
+    Counters accumulate over searches until reset() is called.
+
+    Calls are counted exactly, while their times are estimated from a sample of the calls (see CallCounter).
+    The time spent outside the filters, the calculation function and the result store is attributed
+    to enumerating the permutations. Calls made in worker processes (populate_results(workers=...)) are not counted.
+
+    The scan of the whole product counts in its own loop, and the other searches call the wrapped functions once
+    per block or for a small part of the permutations, so profiling costs a few percent of most searches.
+    The branch and bound, inverse and anytime searches and the scan of filters of some positions are profiled
+    through wrappers, which cost more per call.
+    """
+
+    def __init__(self, timing_interval: int = 16, trace_memory: bool = False):
+        """
+        :param timing_interval: Time one call in this many, 1 to time every call
+        :param trace_memory: Measure the peak memory allocated by Python during the searches with tracemalloc,
+            as peak_memory_bytes. This slows the searches down noticeably, so by default only the peak resident set
+            size of the process is reported, which also covers whatever the process allocated before the searches.
+        """
+        self.timing_interval: int = timing_interval
+        self.trace_memory: bool = trace_memory
+        self.reset()
+
+    def reset(self) -> None:
+        self.searches: int = 0
+        self.filters: List[FilterProfile] = []
+        self.calculations: int = 0
+        self.insertions: int = 0
+        self.rejections: int = 0
+        self.total_seconds: float = 0.0
+
+        # The peak memory traced during the searches (with trace_memory), and the peak resident set size the
+        # process reached over its whole lifetime, up to the end of the last search
+        self.peak_memory_bytes: Optional[int] = None
+        self.process_peak_memory_bytes: Optional[int] = None
+
+        self._calculation_counter = CallCounter(self.timing_interval)
+        self._insertion_counter = CallCounter(self.timing_interval)
+        self._started: float = 0.0
+        self._traced = False
+
+    @property
+    def stage_seconds(self) -> Dict[str, float]:
+        """
+        The estimated time spent in every stage of the searches
+        """
+        filters = sum(f.seconds for f in self.filters)
+        calculation = self._calculation_counter.seconds
+        insertion = self._insertion_counter.seconds
+        return {
+            "enumeration": max(0.0, self.total_seconds - filters - calculation - insertion),
+            "filters": filters,
+            "calculation": calculation,
+            "insertion": insertion,
+        }
+
+    def _filter_profile(self, index: int, function: Callable[..., Any]) -> FilterProfile:
+        while len(self.filters) <= index:
+            self.filters.append(FilterProfile(
+                f"{len(self.filters)}: {getattr(function, '__name__', function)}", self.timing_interval
+            ))
+        return self.filters[index]
+
+    # Scans
+
+    def record_scan(self, filters: List[Callable[..., Any]], counts: "ScanCounts") -> None:
+        """
+        Add the counts a scan kept in its own loop to the profile
+
+        :param filters: The filters the scan tested, in order
+        :param counts: The counts of the scan
+        """
+        # Every permutation a filter did not reject reaches the next filter, and the calculation after the last one
+        reaching = counts.tested
+        for index, function in enumerate(filters):
+            profile = self._filter_profile(index, function)
+            rejected = counts.rejected[index]
+            timed, seconds = counts.filter_timing[index]
+            profile.calls += reaching
+            profile.rejections += rejected
+            profile.counter.invocations += reaching
+            profile.counter.timed_invocations += timed
+            profile.counter.timed_seconds += seconds
+            reaching -= rejected
+
+        self.calculations += reaching
+        self._calculation_counter.invocations += reaching
+        self._calculation_counter.timed_invocations += counts.calculation_timing[0]
+        self._calculation_counter.timed_seconds += counts.calculation_timing[1]
+
+        self.insertions += counts.insertions
+        self.rejections += counts.rejections
+        self._insertion_counter.invocations += counts.insertions + counts.rejections
+        self._insertion_counter.timed_invocations += counts.insertion_timing[0]
+        self._insertion_counter.timed_seconds += counts.insertion_timing[1]
+
+    # Wrappers
+
+    def wrap_calculation(self, function: Callable[..., Any]) -> Callable[..., Any]:
+        counter, interval = self._calculation_counter, self._calculation_counter.timing_interval
+
+        @functools.wraps(function)
+        def profiled(*args):
+            counter.invocations += 1
+            if counter.invocations > interval and counter.invocations % interval:
+                result = function(*args)
+            else:
+                result = counter.timed_call(function, *args)
+            self.calculations += _size(result)
+            return result
+        return profiled
+
+    def wrap_filter(self, index: int, function: Callable[..., Any]) -> Callable[..., Any]:
+        counters = self._filter_profile(index, function)
+        counter, interval = counters.counter, counters.counter.timing_interval
+
+        @functools.wraps(function)
+        def profiled(*args):
+            counter.invocations += 1
+            if counter.invocations > interval and counter.invocations % interval:
+                result = function(*args)
+            else:
+                result = counter.timed_call(function, *args)
+            if result is True:
+                counters.calls += 1
+            elif result is False:
+                counters.calls += 1
+                counters.rejections += 1
+            else:
+                size = _size(result)
+                counters.calls += size
+                counters.rejections += size - (int(result.sum()) if getattr(result, "ndim", 0) > 0 else bool(result))
+            return result
+        return profiled
+
+    def wrap_results(self, results: Any) -> "ProfiledResults":
+        return ProfiledResults(results, self, self._insertion_counter)
+
+    # Search boundaries
+
+    def start(self) -> None:
+        self.searches += 1
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._traced = True
+        self._started = time.perf_counter()
+
+    def finish(self) -> None:
+        self.total_seconds += time.perf_counter() - self._started
+
+        if self._traced:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self._traced = False
+            self.peak_memory_bytes = max(peak, self.peak_memory_bytes or 0)
+        if resource is not None:
+            # ru_maxrss is in kilobytes on Linux
+            self.process_peak_memory_bytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    # Export
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "searches": self.searches,
+            "total_seconds": self.total_seconds,
+            "stage_seconds": self.stage_seconds,
+            "calculations": self.calculations,
+            "filters": [f.to_dict() for f in self.filters],
+            "results": {"insertions": self.insertions, "rejections": self.rejections},
+            "peak_memory_bytes": self.peak_memory_bytes,
+            "process_peak_memory_bytes": self.process_peak_memory_bytes,
+        }
+
+    def to_json(self, **kwargs) -> str:
+        """
+        :param kwargs: Passed on to json.dumps, for instance indent
+        """
+        return json.dumps(self.to_dict(), **kwargs)
+
+
+class ScanCounts:
+    """
+    The counts a scan of permutations keeps in its own loop, so the calculation function, filters and result store
+    are called directly. Only the rejections of every filter are counted, the calls of every stage follow from them.
+    The timings are (timed calls, seconds) of the stages of the timed permutations.
+    """
+
+    def __init__(self, filter_count: int):
+        self.tested: int = 0
+        self.rejected: List[int] = [0] * filter_count
+        self.insertions: int = 0
+        self.rejections: int = 0
+        self.filter_timing: List[List[Any]] = [[0, 0.0] for _ in range(filter_count)]
+        self.calculation_timing: List[Any] = [0, 0.0]
+        self.insertion_timing: List[Any] = [0, 0.0]
+
+
+class ProfiledResults:
+    """
+    A result store that counts and times the insertions into the store it wraps
+    """
+
+    def __init__(self, results: Any, profile: SearchProfile, counter: CallCounter):
+        self._results = results
+        self._profile = profile
+        self._counter = counter
+
+    def accepts(self, error: float, order: Optional[int] = None) -> bool:
+        counter = self._counter
+        counter.invocations += 1
+        if counter.is_untimed:
+            accepted = self._results.accepts(error, order)
+        else:
+            accepted = counter.timed_call(self._results.accepts, error, order)
+        if not accepted:
+            self._profile.rejections += 1
+        return accepted
+
+    def add(self, *args, **kwargs) -> bool:
+        counter = self._counter
+        counter.invocations += 1
+        if counter.is_untimed:
+            kept = self._results.add(*args, **kwargs)
+        else:
+            kept = counter.timed_call(self._results.add, *args, **kwargs)
+        if kept:
+            self._profile.insertions += 1
+        else:
+            self._profile.rejections += 1
+        return kept
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._results, name)
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def __iter__(self):
+        return iter(self._results)
@@ -0,0 +1,158 @@
+"""
+Defines an on-disk cache of search results, shared by every run and process using the same directory.
+
+Entries are keyed by the fingerprint of a search problem (see fingerprint.problem_fingerprint), which does not
+include the number of results: an entry computed for K results also answers every search for fewer results.
+Searches collapsing duplicate results keep different results for different numbers of results, so their
+fingerprints should include it.
+Results are stored by the flat index of their permutation (see index_space) and rebuilt from the value iterators,
+so the cache holds no pickled components.
+"""
+
+from typing import Tuple, List, Dict, Optional, Any
+import json
+import os
+
+from ECPF.checkpoint import write_atomically
+
+CACHE_VERSION = 1
+
+
+class CachedResults:
+    """
+    The results of a completed search, sorted from the best to the worst
+    """
+
+    def __init__(self, number_of_results: int, results: List[Tuple[float, int, float]],
+                 tested: int, filtered: int, pruned: int):
+        """
+        :param number_of_results: The number of results the search kept
+        :param results: The (error, flat index, value) of every kept result
+        :param tested: The number of permutations the search tested
+        :param filtered: The number of permutations the search filtered
+        :param pruned: The number of permutations the search skipped without testing them
+        """
+        self.number_of_results: int = number_of_results
+        self.results: List[Tuple[float, int, float]] = results
+        self.tested: int = tested
+        self.filtered: int = filtered
+        self.pruned: int = pruned
+
+    def answers(self, number_of_results: int) -> bool:
+        """
+        Check whether the entry holds the results of a search for number_of_results results.
+        Without duplicate collapsing, the best results of a search for fewer results are the first results of this
+        one, and a search that never filled its store kept every permutation that passed the filters.
+        """
+        return number_of_results <= self.number_of_results or len(self.results) < self.number_of_results
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": CACHE_VERSION,
+            "number_of_results": self.number_of_results,
+            "results": [list(r) for r in self.results],
+            "tested": self.tested,
+            "filtered": self.filtered,
+            "pruned": self.pruned,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CachedResults":
+        if data.get("version") != CACHE_VERSION:
+            raise ValueError(f"Unsupported cache entry version: {data.get('version')}")
+        return cls(
+            int(data["number_of_results"]),
+            [(float(error), int(order), float(value)) for error, order, value in data["results"]],
+            int(data["tested"]), int(data["filtered"]), int(data["pruned"])
+        )
+
+
+class ResultCache:
+    """
+    A directory of cached search results, evicting the least recently used entries above a size limit.
+
+    Reading an entry marks it as used by touching its file, so the cache can be shared by concurrent processes
+    without any index file. Entries are written atomically, so readers never see a partly written entry.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 2 ** 20):
+        """
+        :param directory: The directory the entries are stored in, created if needed
+        :param max_bytes: The total size of the entries above which the least recently used ones are deleted
+        """
+        self.directory: str = directory
+        self.max_bytes: int = max_bytes
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def _path(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, f"{fingerprint}.json")
+
+    def load(self, fingerprint: str) -> Optional[CachedResults]:
+        """
+        :return: The entry of a problem, None if there is none or it can not be read
+        """
+        path = self._path(fingerprint)
+        try:
+            with open(path) as f:
+                entry = CachedResults.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:  # Evicted by another process meanwhile
+            pass
+        return entry
+
+    def get(self, fingerprint: str, number_of_results: int) -> Optional[CachedResults]:
+        """
+        Find the results of a search for number_of_results results of a problem
+
+        :return: The entry, whose results may hold more results than asked for, or None on a miss
+        """
+        entry = self.load(fingerprint)
+        if entry is None or not entry.answers(number_of_results):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, fingerprint: str, entry: CachedResults) -> None:
+        """
+        Store the results of a problem, unless an entry answering more searches is already stored
+        """
+        existing = self.load(fingerprint)
+        if existing is not None and existing.number_of_results > entry.number_of_results:
+            return
+
+        write_atomically(self._path(fingerprint), json.dumps(entry.to_dict()))
+        self._evict()
+
+    def _entry_names(self) -> List[str]:
+        # Files being written by write_atomically are not entries yet
+        if not os.path.isdir(self.directory):
+            return []
+        return [name for name in os.listdir(self.directory) if name.endswith(".json") and not name.startswith(".")]
+
+    def _evict(self) -> None:
+        entries = []
+        for name in self._entry_names():
+            try:
+                status = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((status.st_mtime, status.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        for name in self._entry_names():
+            os.remove(os.path.join(self.directory, name))
@@ -0,0 +1,176 @@
+"""
+Defines the bounded store that keeps the best permutations found by a search
+"""
+
+from typing import Tuple, List, Dict, Iterator, Optional, Any
+import heapq
+import math
+
+from ECPF.components import iComponent
+
+
+class TopKResults:
+    """
+    Keeps the maxlen permutations with the smallest error seen so far.
+
+    Every result is stored together with its calculated value and error, so neither has to be recalculated
+    when a new permutation is compared against the stored ones.
+    The worst result sits at the top of a heap: a permutation that cannot make the cut is rejected in O(1),
+    and one that does replaces the worst result in O(log(maxlen)).
+    Results with equal errors are ordered by the order they were added in, unless an explicit order is given.
+
+    With a duplicate_tolerance, results whose values are duplicates of each other (such as 100/82 and 1k/820
+    dividers) are collapsed into the best of them. Values are duplicates when they fall into the same logarithmic
+    bin of relative width duplicate_tolerance (see value_bin), so duplicates always lie within the tolerance of each
+    other, while two values within the tolerance that a bin boundary separates are both kept.
+    A duplicate_tolerance of 0 only collapses results of exactly equal values.
+    Being duplicates does not depend on the other results, so the store keeps the best result of each of the
+    maxlen best bins whatever the order results are added in, and a result evicted from the store could never
+    come back into it.
+    """
+
+    def __init__(self, maxlen: int, duplicate_tolerance: Optional[float] = None):
+        # The maximum number of results kept
+        self.maxlen: int = maxlen
+
+        # The relative tolerance below which two result values are considered duplicates, None to keep all
+        self.duplicate_tolerance: Optional[float] = duplicate_tolerance
+
+        # The kept entry of every logarithmic bin of values, used to find duplicates
+        self._bins: Dict[Tuple[Any, Any], Tuple[float, int, Any, Tuple[iComponent, ...]]] = {}
+
+        # A heap of (-error, -order, value, permutation) so the worst result is always at index 0
+        self._heap: List[Tuple[float, int, Any, Tuple[iComponent, ...]]] = []
+
+        # The order given to the next result added without an explicit order
+        self._next_order: int = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def is_full(self) -> bool:
+        return len(self._heap) >= self.maxlen
+
+    @property
+    def worst_error(self) -> float:
+        """
+        The error a permutation has to beat to be kept, infinite while the store is not yet full
+        """
+        if self.maxlen <= 0:
+            return -math.inf
+        if not self.is_full:
+            return math.inf
+        return -self._heap[0][0]
+
+    def accepts(self, error: float, order: Optional[int] = None) -> bool:
+        """
+        Check in O(1) whether a result with the given error would be kept.
+
+        :param error: The error of the candidate result
+        :param order: The tie breaking order of the candidate, later than every stored result if omitted
+        :return: True if adding the result would change the store
+        """
+        if math.isnan(error) or self.maxlen <= 0:
+            return False
+        if not self.is_full:
+            return True
+
+        worst_error, worst_order = -self._heap[0][0], -self._heap[0][1]
+        if order is None:
+            return error < worst_error
+        return (error, order) < (worst_error, worst_order)
+
+    def add(self, permutation: Tuple[iComponent, ...], value: Any, error: float,
+            order: Optional[int] = None) -> bool:
+        """
+        Offer a result to the store.
+
+        :param permutation: The permutation that was evaluated
+        :param value: The value the calculation function produced for the permutation
+        :param error: The error of the value relative to the target
+        :param order: The tie breaking order of the result, the order it was added in if omitted
+        :return: True if the result was kept
+        """
+        if not self.accepts(error, order):
+            if order is None:
+                self._next_order += 1
+            return False
+
+        if order is None:
+            order = self._next_order
+            self._next_order += 1
+
+        entry = (-error, -order, value, permutation)
+
+        if self.duplicate_tolerance is not None:
+            # The result replaces its duplicate, unless the duplicate is better
+            key = value_bin(value, self.duplicate_tolerance)
+            duplicate = self._bins.get(key) if key is not None else None
+            if duplicate is not None:
+                if (error, order) >= (-duplicate[0], -duplicate[1]):
+                    return False
+                self._heap.remove(duplicate)
+                heapq.heapify(self._heap)
+                self._unbin(duplicate)
+
+        if self.is_full:
+            self._unbin(heapq.heapreplace(self._heap, entry))
+        else:
+            heapq.heappush(self._heap, entry)
+        self._bin(entry)
+        return True
+
+    def _bin(self, entry: Tuple[float, int, Any, Tuple[iComponent, ...]]) -> None:
+        if self.duplicate_tolerance is None:
+            return
+        key = value_bin(entry[2], self.duplicate_tolerance)
+        if key is not None:
+            self._bins[key] = entry
+
+    def _unbin(self, entry: Tuple[float, int, Any, Tuple[iComponent, ...]]) -> None:
+        if self.duplicate_tolerance is None:
+            return
+        key = value_bin(entry[2], self.duplicate_tolerance)
+        if key is not None:
+            del self._bins[key]
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._bins.clear()
+        self._next_order = 0
+
+    def items(self) -> List[Tuple[float, Any, Tuple[iComponent, ...]]]:
+        """
+        :return: A list of (error, value, permutation) tuples sorted from the best to the worst result
+        """
+        return [(-e[0], e[2], e[3]) for e in sorted(self._heap, reverse=True)]
+
+    def entries(self) -> List[Tuple[float, int, Any, Tuple[iComponent, ...]]]:
+        """
+        :return: A list of (error, order, value, permutation) tuples sorted from the best to the worst result
+        """
+        return [(-e[0], -e[1], e[2], e[3]) for e in sorted(self._heap, reverse=True)]
+
+    def __iter__(self) -> Iterator[Tuple[iComponent, ...]]:
+        for _, _, permutation in self.items():
+            yield permutation
+
+
+def value_bin(value: Any, duplicate_tolerance: float) -> Optional[Tuple[Any, Any]]:
+    """
+    The logarithmic bin of a value: bins of a positive tolerance span a relative width of the tolerance, so values
+    of the same bin lie within the tolerance of each other. A tolerance of 0 puts every distinct value in its own bin.
+
+    :return: The key of the bin, None for values that are never duplicates (NaN and infinities)
+    """
+    value = float(value)
+    if math.isnan(value):
+        return None
+    if duplicate_tolerance <= 0.0:
+        return "exact", value
+    if value == 0.0:
+        return None, 0
+    if math.isinf(value):
+        return None
+    return value > 0.0, math.floor(math.log(math.fabs(value)) / math.log1p(duplicate_tolerance))
@@ -0,0 +1,138 @@
+"""
+Defines constant memory accumulators for the statistics of very large Monte Carlo runs.
+
+Samples are fed in chunks; only the running central moments and a fixed size sample of the values are kept,
+so memory does not grow with the number of samples.
+"""
+
+from typing import Sequence, Optional
+
+import numpy as np  # type: ignore
+
+
+class MomentAccumulator:
+    """
+    Accumulates the count, mean and the 2nd to 4th central moment sums of a stream of values.
+
+    Chunks are reduced with NumPy and merged into the running totals with the pairwise update formulas of
+    Pebay (2008), which stay numerically stable for long runs.
+    """
+
+    def __init__(self):
+        self.count: int = 0
+        self.mean: float = 0.0
+
+        # Sums of the 2nd, 3rd and 4th powers of the deviations from the mean
+        self.m2: float = 0.0
+        self.m3: float = 0.0
+        self.m4: float = 0.0
+
+    def update(self, chunk: np.ndarray) -> None:
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if len(chunk) == 0:
+            return
+
+        chunk_mean = float(np.mean(chunk))
+        deviations = chunk - chunk_mean
+        squared = deviations ** 2
+
+        other = MomentAccumulator()
+        other.count = len(chunk)
+        other.mean = chunk_mean
+        other.m2 = float(np.sum(squared))
+        other.m3 = float(np.sum(squared * deviations))
+        other.m4 = float(np.sum(squared ** 2))
+        self.merge(other)
+
+    def merge(self, other: "MomentAccumulator") -> None:
+        """
+        Combine the moments of another accumulator into this one, as if its values had been fed here.
+        """
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2, self.m3, self.m4 = other.count, other.mean, other.m2, other.m3, other.m4
+            return
+
+        na, nb = float(self.count), float(other.count)
+        n = na + nb
+        delta = other.mean - self.mean
+
+        m2 = self.m2 + other.m2 + delta ** 2 * na * nb / n
+        m3 = self.m3 + other.m3 \
+            + delta ** 3 * na * nb * (na - nb) / n ** 2 \
+            + 3.0 * delta * (na * other.m2 - nb * self.m2) / n
+        m4 = self.m4 + other.m4 \
+            + delta ** 4 * na * nb * (na ** 2 - na * nb + nb ** 2) / n ** 3 \
+            + 6.0 * delta ** 2 * (na ** 2 * other.m2 + nb ** 2 * self.m2) / n ** 2 \
+            + 4.0 * delta * (na * other.m3 - nb * self.m3) / n
+
+        self.count += other.count
+        self.mean += delta * nb / n
+        self.m2, self.m3, self.m4 = m2, m3, m4
+
+    @property
+    def standard_deviation(self) -> float:
+        """
+        The population standard deviation, as numpy.std computes it
+        """
+        return (self.m2 / self.count) ** 0.5
+
+    @property
+    def variance(self) -> float:
+        """
+        The sample variance
+        """
+        return self.m2 / (self.count - 1)
+
+    @property
+    def skewness(self) -> float:
+        """
+        The skewness, with the same correction generate_stat_data applies to buffered samples
+        """
+        n = self.count
+        return n / ((n - 1) * (n - 2)) * self.m3 / self.standard_deviation ** 3
+
+    @property
+    def kurtosis(self) -> float:
+        """
+        The excess kurtosis of the values
+        """
+        return self.count * self.m4 / self.m2 ** 2 - 3.0
+
+
+class QuantileSketch:
+    """
+    Estimates quantiles of a stream from a uniform random sample of fixed size (reservoir sampling).
+    """
+
+    def __init__(self, size: int = 2 ** 16, rng: Optional[np.random.Generator] = None):
+        self.size: int = size
+        self.seen: int = 0
+        self._reservoir: np.ndarray = np.empty(size, dtype=np.float64)
+        self._rng = np.random.default_rng(rng)
+
+    def update(self, chunk: np.ndarray) -> None:
+        chunk = np.asarray(chunk, dtype=np.float64)
+
+        # Fill the reservoir until it is full
+        filled = min(max(self.size - self.seen, 0), len(chunk))
+        self._reservoir[self.seen:self.seen + filled] = chunk[:filled]
+        self.seen += filled
+        chunk = chunk[filled:]
+        if len(chunk) == 0:
+            return
+
+        # The i-th value seen replaces a random reservoir entry with probability size / i
+        positions = np.arange(self.seen + 1, self.seen + len(chunk) + 1, dtype=np.float64)
+        slots = np.floor(self._rng.random(len(chunk)) * positions).astype(np.int64)
+        replaced = slots < self.size
+        self._reservoir[slots[replaced]] = chunk[replaced]
+        self.seen += len(chunk)
+
+    def quantiles(self, fractions: Sequence[float]) -> np.ndarray:
+        """
+        :param fractions: The quantiles to estimate, between 0 and 1
+        :return: The estimated value of every quantile
+        """
+        return np.quantile(self._reservoir[:min(self.seen, self.size)], fractions)
@@ -1,13 +1,27 @@
-from typing import Tuple, Deque, Iterable, Callable, Any
-from collections import deque
+from typing import Tuple, List, Iterable, Sequence, Callable, Generator, Optional, Union, Any, TYPE_CHECKING
+import contextlib
 import itertools
 import math
+import time
 
 from ECPF.float_representation_tools import eng_format
 from ECPF.components import iComponent
-
-from numpy import percentile, std, mean  # type: ignore
-from matplotlib import pyplot as plt  # type: ignore
+from ECPF.result_store import TopKResults
+from ECPF.bisect_solver import BisectPlan, plan_bisect, bisect_search, _is_identity
+from ECPF.inverse_solver import plan_inverse, inverse_search
+from ECPF.branch_and_bound import BranchAndBoundSearch
+from ECPF.partial_filters import PartialFilter, bind_filters
+from ECPF.index_space import LazyProduct
+from ECPF.expression import Expression
+
+# NumPy is only imported by the vectorized and statistical methods, and matplotlib only when plotting,
+# so scripts running small searches do not pay for importing them
+if TYPE_CHECKING:
+    import numpy as np  # type: ignore
+    from ECPF.profiling import SearchProfile, ScanCounts
+    from ECPF.checkpoint import Checkpointer, SearchCheckpoint
+    from ECPF.result_cache import ResultCache
+    from ECPF.component_array import ComponentArray
 
 
 class ValueFilter:
@@ -20,9 +34,13 @@ class ValueFilter:
     def __init__(self,
                  target_value: float,
                  value_iterators: Iterable[iComponent],
-                 calculation_function: Callable[..., float],
+                 calculation_function: Union[Callable[..., float], str],
                  filters: Iterable[Callable[..., bool]],
                  number_of_results: int,
+                 monotonicity: Optional[Sequence[int]] = None,
+                 duplicate_tolerance: Optional[float] = None,
+                 profile: Optional["SearchProfile"] = None,
+                 result_cache: Optional["ResultCache"] = None,
                  ):
         # print(signature(calculation_function).parameters)
 
@@ -32,91 +50,678 @@ class ValueFilter:
         # An iterable of values to feed into the calculation function
         self.value_iterators: Iterable[iComponent] = value_iterators
 
-        # The calculation preformed on all permutations of all value iterators
+        # The calculation preformed on all permutations of all value iterators.
+        # Expression strings, such as "ra / (ra + rb)", are parsed into an Expression taking the variables
+        # in alphabetical order. Pass an Expression with explicit variables for any other order.
+        if isinstance(calculation_function, str):
+            calculation_function = Expression(calculation_function)
         self.calculation_function: Callable[..., float] = calculation_function
 
-        # A list of filters to run to ensure that the values fit a certain criteria
+        # A list of filters to run to ensure that the values fit a certain criteria.
+        # Filters taking only some of the arguments (matched by parameter name, or declared with
+        # partial_filters.uses) are tested as soon as their arguments are bound.
         self.filters: Iterable[Callable[..., bool]] = filters
 
-        # A sorted Deque of results reprenenting the permutations that are closest to the target value
-        self.results: Deque[Tuple[iComponent]] = deque((), maxlen=number_of_results)
+        # Optionally, 1 or -1 for each argument the calculation function increases or decreases with.
+        # The inverse solver also accepts 0 for the arguments whose direction is not known.
+        self.monotonicity: Optional[Sequence[int]] = monotonicity
+
+        # The maximum number of results to keep
+        self.number_of_results: int = number_of_results
+
+        if duplicate_tolerance is not None and not duplicate_tolerance >= 0.0:
+            raise ValueError(f"duplicate_tolerance must be at least 0: {duplicate_tolerance}")
+
+        # The bounded store of results reprenenting the permutations that are closest to the target value.
+        # Results whose values fall into the same logarithmic bin of relative width duplicate_tolerance are collapsed
+        # into the best of them.
+        self.results: TopKResults = TopKResults(number_of_results, duplicate_tolerance)
 
         # A count taken to see how many permutations were tested
         self.total_permutations_tested: int = 0
         self.permutations_filtered: int = 0
 
+        # The permutations the search actually evaluated. The bisect and inverse solvers cover every permutation
+        # of the product, but skip the ones that can not make it into the results: those count as tested only.
+        self.permutations_evaluated: int = 0
+
+        # A count of the permutations skipped without testing by the branch and bound search
+        self.permutations_pruned: int = 0
+
+        # The fraction of the permutations the last search covered, and whether it ran to completion.
+        # Only a search stopped by a time or evaluation budget covers less than all of them.
+        self.search_coverage: float = 0.0
+        self.search_complete: bool = False
+
+        # Optionally, a SearchProfile recording where the time of every search goes
+        self.profile: Optional["SearchProfile"] = profile
+
+        # Optionally, a ResultCache answering searches of problems searched before, by this or another process
+        self.result_cache: Optional["ResultCache"] = result_cache
+
     def calc_error(self, val):
         return math.fabs(
             (float(self.target_value) - float(val)) /
             float(self.target_value)
         )
 
-    def process_permutation(self, permutation: Tuple[iComponent]) -> None:
+    def process_permutation(self, permutation: Tuple[iComponent], order: Optional[int] = None) -> bool:
         """
+        Evaluate a permutation and offer it to the result store.
+
         :param permutation: The permutation tuple to process
-        :return:
+        :param order: The tie breaking order of the result, see TopKResults.add
+        :return: True if the permutation was kept as one of the best results
         """
 
-        # Ensure that the first result gets added to the result deque, so there is something to compare against
-        if len(self.results) == 0:
-            self.results.append(permutation)
-            return
-
         # Calculate the value, and error of the passed permutation
         perm_val = self.calculation_function(*permutation)
         perm_calc_error = self.calc_error(perm_val)
 
-        insert_index = None
+        return self.results.add(permutation, perm_val, perm_calc_error, order=order)
 
-        # this currently takes O(n) time, with a binary search could take O(log(n))
-        for i in range(0, len(self.results)):
-            if i > len(self.results):
-                insert_index = i
-                break
+    @property
+    def permutation_count(self) -> int:
+        """
+        The number of permutations of the value iterators, counted without iterating them
+        """
+        return len(LazyProduct(self.value_iterators))
 
-            # Calculate the value, and error of the result being permutated over
-            existing_val = self.calculation_function(*self.results[i])
-            existing_calc_error = self.calc_error(existing_val)
+    def permutation_at(self, index: int) -> Tuple[iComponent, ...]:
+        """
+        The permutation at a flat index of the product of the value iterators, in the order of itertools.product.
+        Only the components of that permutation are built, so ranges of indices can be searched independently.
+        """
+        return LazyProduct(self.value_iterators)[index]
 
-            if perm_calc_error < existing_calc_error:
-                insert_index = i
-                break
+    @property
+    def best_error(self) -> float:
+        """
+        The error of the best result found so far, inf if there is none
+        """
+        items = self.results.items()
+        return items[0][0] if len(items) > 0 else math.inf
+
+    @contextlib.contextmanager
+    def _bound_filters(self):
+        """
+        Replace the filters taking some of the arguments with PartialFilter objects while a search runs
+        """
+        filters = self.filters
+        self.filters = bind_filters(
+            filters, self.calculation_function, sum(1 for _ in self.value_iterators)  # type: ignore
+        )
+        try:
+            yield
+        finally:
+            self.filters = filters
 
-        if insert_index is not None:
-            if self.results.maxlen is not None:
-                if len(self.results) >= self.results.maxlen:
-                    self.results.pop()
+    @contextlib.contextmanager
+    def _profiled(self, wrap: bool = True):
+        """
+        Time the searches run while the context is entered with the profile, and unless the search counts in its
+        own loop (see _scan), wrap the calculation function, filters and result store with its counters
+        """
+        if self.profile is None:
+            yield
+            return
 
-            self.results.insert(insert_index, permutation)
+        if not wrap:
+            self.profile.start()
+            try:
+                yield
+            finally:
+                self.profile.finish()
+            return
 
-    def populate_results(self) -> None:
+        calculation_function, filters, results = self.calculation_function, self.filters, self.results
+        self.calculation_function = self.profile.wrap_calculation(calculation_function)
+        self.filters = [
+            PartialFilter(self.profile.wrap_filter(i, f.function), f.positions) if isinstance(f, PartialFilter)
+            else self.profile.wrap_filter(i, f)
+            for i, f in enumerate(filters)
+        ]
+        self.results = self.profile.wrap_results(results)  # type: ignore
+        self.profile.start()
+        try:
+            yield
+        finally:
+            self.profile.finish()
+            self.calculation_function, self.filters, self.results = calculation_function, filters, results
+
+    @contextlib.contextmanager
+    def _adaptive_filters(self, enabled: bool):
+        """
+        Replace the filters with an AdaptiveFilterChain of them while a search runs
         """
-        Populate the result Deque with tuples of Component configurations.
+        filters = self.filters
+        if not enabled:
+            yield
+            return
+
+        from ECPF.filter_ordering import AdaptiveFilterChain
 
+        # Filters of some positions keep being tested as soon as their positions are bound
+        partial_filters = [f for f in filters if isinstance(f, PartialFilter)]
+        full_filters = [f for f in filters if not isinstance(f, PartialFilter)]
+        if len(full_filters) > 1:
+            self.filters = partial_filters + [AdaptiveFilterChain(full_filters)]
+        try:
+            yield
+        finally:
+            self.filters = filters
+
+    def _reset_results(self) -> None:
+        self.results.clear()
+        self.total_permutations_tested = 0
+        self.permutations_filtered = 0
+        self.permutations_evaluated = 0
+        self.permutations_pruned = 0
+        self.search_coverage = 0.0
+        self.search_complete = False
+
+    def populate_results(self, vectorized: bool = False, block_size: int = 2 ** 16, use_bisect: bool = True,
+                         branch_and_bound: bool = False, workers: Optional[int] = None,
+                         time_budget: Optional[float] = None, max_evaluations: Optional[int] = None,
+                         adaptive_filters: bool = False, checkpoint_path: Optional[str] = None,
+                         checkpoint_interval: float = 60.0, resume_from: Optional[str] = None,
+                         inverse_solve: bool = False) -> None:
+        """
+        Populate the result store with tuples of Component configurations.
+
+        Searches over a single value iterator whose calculation function returns its argument unchanged
+        (single components or two element series/parallel chains) are answered by bisecting a sorted inventory,
+        so only the candidates that could make it into the results are evaluated. total_permutations_tested still
+        counts every candidate, and permutations_evaluated the ones that were evaluated.
+
+        With a result_cache, searches of a problem already searched for at least as many results are answered from
+        the cache, and the results of completed searches are stored in it. Anytime searches are never cached,
+        nor are problems whose functions read values that can not be fingerprinted (see fingerprint).
+        Searches are only answered by the results of the same search mode.
+
+        :param vectorized: Evaluate the permutations in NumPy blocks instead of one tuple at a time.
+            The calculation function and filters are called with float64 arrays of nominal values,
+            so they should use plain arithmetic rather than float() to get the full speed up.
+        :param block_size: The number of permutations evaluated per block in vectorized mode
+        :param use_bisect: Use the bisect solver for searches it supports
+        :param branch_and_bound: Fix the value iterators one position at a time and skip every subtree that
+            cannot beat the worst kept result. This needs either the monotonicity of the calculation function,
+            or a calculation function that can be evaluated with Interval arguments.
+        :param workers: Split the vectorized search into shards of the first value iterator,
+            and evaluate them in this many worker processes
+        :param time_budget: Run an anytime search (see iter_improving_results) that stops after this many seconds
+        :param max_evaluations: Run an anytime search that stops after evaluating this many permutations
+        :param adaptive_filters: Measure the cost and rejection rate of the filters during the search, and evaluate
+            them in the order that rejects permutations the fastest (see AdaptiveFilterChain).
+            The results are the same as with the declared order.
+        :param checkpoint_path: Save the progress of the search to this file, so it can be resumed if the process
+            stops. Only the search of the whole product one permutation at a time saves checkpoints (filters of
+            some arguments are then tested on full permutations), searches answered by the bisect solver finish
+            too quickly to need them.
+        :param checkpoint_interval: Save a checkpoint at most once every this many seconds, and once the search
+            completes
+        :param resume_from: Continue the search saved in this checkpoint file, or start it if the file does not
+            exist. The checkpoint must have been saved by the same problem: target, value iterators, calculation
+            function, filters, monotonicity and number of results, otherwise a ValueError is raised. A problem whose
+            functions read values that can not be fingerprinted raises a FingerprintError (a ValueError).
+        :param inverse_solve: When the calculation function is monotonic in one of its arguments, replace the loop
+            over that argument by bisecting its sorted components for the ones closest to the target (see
+            inverse_solver), for O(n^(k-1) log(n)) instead of O(n^k) evaluations. The monotonicity is the declared
+            one (the monotonicity argument, or monotonic() on the function), or the one an Expression proves over
+            the values of every argument. A search whose monotonicity is not known raises a ValueError.
+            The results are the same as the scan of the whole product.
         :return: None
         """
+        checkpointing = checkpoint_path is not None or resume_from is not None
+        if checkpointing and (vectorized or workers is not None or branch_and_bound or inverse_solve
+                              or time_budget is not None or max_evaluations is not None):
+            raise ValueError(
+                "Checkpoints are only saved by the search of the whole product one permutation at a time, "
+                "not by the vectorized, parallel, branch and bound, inverse or anytime searches"
+            )
+
+        if time_budget is not None or max_evaluations is not None:
+            for _ in self.iter_improving_results(time_budget, max_evaluations, adaptive_filters):
+                pass
+            return
+
+        cache_key = None
+        if self.result_cache is not None:
+            cache_key = self._cache_key(_search_mode(vectorized, workers, branch_and_bound, inverse_solve))
+            if cache_key is not None and self._load_cached_results(cache_key):
+                return
+
+        checkpoint = None
+        if checkpointing:
+            checkpoint = self._open_checkpoint(checkpoint_path, checkpoint_interval, resume_from)
+
+        with self._bound_filters():
+            # The scan of the whole product counts in its own loop, the other searches are profiled by wrappers
+            count_scan = self.profile is not None and not (
+                    vectorized or workers is not None or branch_and_bound or inverse_solve or adaptive_filters
+                    or (use_bisect and _is_identity(self.calculation_function))
+                    or (checkpoint is None and any(isinstance(f, PartialFilter) for f in self.filters))
+            )
+            with self._profiled(wrap=not count_scan), self._adaptive_filters(adaptive_filters):
+                self._populate_results(vectorized, block_size, use_bisect, branch_and_bound, workers, checkpoint,
+                                       inverse_solve, count_scan)
+
+        if cache_key is not None:
+            self._cache_results(cache_key)
+
+    def _problem_fingerprint(self, *extra: Any) -> str:
+        from ECPF.fingerprint import problem_fingerprint
+
+        # A declared monotonicity changes what the branch and bound and inverse searches return
+        monotonicity = None if self.monotonicity is None else tuple(self.monotonicity)
+        return problem_fingerprint(
+            self.target_value, self.value_iterators, self.calculation_function, self.filters,
+            self.results.duplicate_tolerance, monotonicity, *extra
+        )
+
+    def _cache_key(self, search_mode: str) -> Optional[str]:
+        """
+        :return: The key of the search in the result cache, None if the problem can not be fingerprinted
+            and is not cached
+        """
+        from ECPF.fingerprint import FingerprintError
+
+        # The results of a search collapsing duplicates are not the first results of a search for more results
+        extra: Tuple[Any, ...] = (search_mode,)
+        if self.results.duplicate_tolerance is not None:
+            extra += (self.number_of_results,)
+        try:
+            return self._problem_fingerprint(*extra)
+        except FingerprintError:
+            return None
+
+    def _load_cached_results(self, cache_key: str) -> bool:
+        """
+        Fill the results from the result cache
+
+        :return: True if the cache held the results of the search
+        """
+        entry = self.result_cache.get(cache_key, self.number_of_results)  # type: ignore
+        if entry is None:
+            return False
+
+        self._reset_results()
+        self.total_permutations_tested, self.permutations_filtered = entry.tested, entry.filtered
+        self.permutations_pruned = entry.pruned
+        self.search_coverage = 1.0
+        self.search_complete = True
+        self._restore_results(entry.results[:self.number_of_results], LazyProduct(self.value_iterators))
+        return True
+
+    def _cache_results(self, cache_key: str) -> None:
+        """
+        Store the results of a completed search in the result cache.
+        Results are stored by the flat index they were ordered by, so searches whose orders are not flat indices
+        (the bisect solver over canonical chains) are not cached.
+        """
+        from ECPF.result_cache import CachedResults
+
+        if not self.search_complete:
+            return
+
+        entries = self.results.entries()
+        product = LazyProduct(self.value_iterators)
+        for _, order, _, permutation in entries:
+            if not 0 <= order < len(product) or not _same_permutation(product[order], permutation):
+                return
+
+        self.result_cache.put(cache_key, CachedResults(  # type: ignore
+            self.number_of_results, [(error, order, float(value)) for error, order, value, _ in entries],
+            self.total_permutations_tested, self.permutations_filtered, self.permutations_pruned
+        ))
+
+    def _open_checkpoint(self, checkpoint_path: Optional[str], checkpoint_interval: float,
+                         resume_from: Optional[str]) -> Tuple[Optional["Checkpointer"], Optional["SearchCheckpoint"]]:
+        """
+        :return: The checkpointer saving the search if any, and the checkpoint it resumes from if any
+        """
+        from ECPF.checkpoint import Checkpointer, SearchCheckpoint
+
+        fingerprint = self._problem_fingerprint(self.number_of_results)
+
+        resumed = None
+        if resume_from is not None:
+            resumed = SearchCheckpoint.load(resume_from)
+            if resumed is not None and resumed.fingerprint != fingerprint:
+                raise ValueError(
+                    f"The checkpoint {resume_from} was saved by a different problem: the target, value iterators, "
+                    f"calculation function, filters, monotonicity or number of results changed"
+                )
+
+        checkpointer = None
+        if checkpoint_path is not None:
+            checkpointer = Checkpointer(checkpoint_path, fingerprint, checkpoint_interval)
+        return checkpointer, resumed
+
+    def _populate_results(self, vectorized: bool, block_size: int, use_bisect: bool, branch_and_bound: bool,
+                          workers: Optional[int],
+                          checkpoint: Optional[Tuple[Optional["Checkpointer"], Optional["SearchCheckpoint"]]] = None,
+                          inverse_solve: bool = False, count_scan: bool = False) -> None:
         # Reset result stats
-        self.total_permutations_tested = 0
-        self.permutations_filtered = 0
+        self._reset_results()
+        self.search_coverage = 1.0
+        self.search_complete = True
+
+        if use_bisect:
+            plan = plan_bisect(self.value_iterators, self.calculation_function)
+            if plan is not None:
+                self._populate_results_bisect(plan)
+                return
+
+        if inverse_solve:
+            positions = LazyProduct(self.value_iterators).positions
+            inverse_plan = plan_inverse(positions, self.calculation_function, self.monotonicity)
+            if inverse_plan is None and all(len(p) > 0 for p in positions):
+                raise ValueError(
+                    "inverse_solve needs a calculation function known to be monotonic in one of its arguments: "
+                    "declare its monotonicity (the monotonicity argument, or monotonic() on the function), or use "
+                    "an Expression that is monotonic in one of its arguments over the values of every argument"
+                )
+            if inverse_plan is not None:
+                self.total_permutations_tested = len(inverse_plan.space)
+                self.permutations_evaluated, self.permutations_filtered = inverse_search(
+                    inverse_plan, self.calculation_function, self.filters, self.target_value, self.results
+                )
+                return
+
+        if branch_and_bound:
+            from ECPF.vectorized import materialize_value_iterators
+
+            search = BranchAndBoundSearch(
+                candidates=materialize_value_iterators(self.value_iterators)[0],
+                calculation_function=self.calculation_function,
+                filters=list(self.filters),
+                target_value=self.target_value,
+                results=self.results,
+                monotonicity=self.monotonicity
+            )
+            self.total_permutations_tested, self.permutations_filtered, self.permutations_pruned = search.run()
+            self.permutations_evaluated = self.total_permutations_tested
+            return
+
+        if vectorized or workers is not None:
+            self._populate_results_vectorized(block_size, workers)
+            return
 
-        vi_any: Iterable[Any] = self.value_iterators
+        product = LazyProduct(self.value_iterators)
 
-        # Iterate over all combinations
-        for val_product in itertools.product(*vi_any):
-            self.total_permutations_tested += 1
+        if checkpoint is None and any(isinstance(f, PartialFilter) for f in self.filters):
+            self._populate_results_pruned(product.positions)
+            self.permutations_evaluated = self.total_permutations_tested
+            return
+
+        checkpointer, resumed = checkpoint if checkpoint is not None else (None, None)
+        next_index = 0
+        if resumed is not None:
+            next_index = self._restore_checkpoint(resumed, product)
+
+        counts = None
+        if count_scan:
+            from ECPF.profiling import ScanCounts
+
+            counts = ScanCounts(len(list(self.filters)))
+
+        # Iterate over all combinations, from the outer positions' permutation to the next
+        filters = list(self.filters)
+        for block in product.blocks(next_index):
+            next_index = self._scan(block, next_index, filters, counts)
+            if checkpointer is not None and checkpointer.due:
+                checkpointer.save(next_index, self.total_permutations_tested, self.permutations_filtered, self.results)
+
+        if checkpointer is not None:
+            checkpointer.save(len(product), self.total_permutations_tested, self.permutations_filtered, self.results)
+        self.permutations_evaluated = self.total_permutations_tested
+        if counts is not None:
+            self.profile.record_scan(filters, counts)  # type: ignore
+
+    def _scan(self, permutations: Iterable[Tuple[iComponent, ...]], first_index: int,
+              filters: List[Callable[..., bool]], counts: Optional["ScanCounts"] = None) -> int:
+        """
+        Test permutations one at a time, offering the ones every filter passes to the result store.
+        The flat index orders results of equal errors, like the order they were found in.
+
+        A profiled scan passes counts, so every stage is counted in the loop rather than through wrappers, and every
+        stage of the permutations whose flat index is a multiple of the timing interval is timed.
+        The results are the same as the scan without a profile.
+
+        :param permutations: The permutations to test, from the flat index first_index on
+        :param first_index: The flat index of the first permutation
+        :param filters: The filters to test, in order
+        :param counts: The counts to add to, None if the scan is not profiled
+        :return: The flat index following the last permutation
+        """
+        if counts is None:
+            rejected = [0] * len(filters)
+            interval = 0
+        else:
+            rejected = counts.rejected
+            interval = max(1, self.profile.timing_interval)  # type: ignore
+
+        tested = filtered = insertions = 0
+        for flat_index, permutation in enumerate(permutations, first_index):
+            tested += 1
+            if interval and flat_index % interval == 0:
+                kept = self._scan_timed(permutation, flat_index, filters, counts)  # type: ignore
+                if kept is None:
+                    filtered += 1
+                elif kept:
+                    insertions += 1
+                continue
 
             # Check if permutation is valid given filters
-            perm_valid = True
-            for filter_funct in self.filters:
-                if not filter_funct(*val_product):
-                    perm_valid = False
+            for filter_index, filter_funct in enumerate(filters):
+                if not filter_funct(*permutation):
+                    rejected[filter_index] += 1
+                    filtered += 1
                     break
+            else:
+                if self.process_permutation(permutation, flat_index):
+                    insertions += 1
+
+        self.total_permutations_tested += tested
+        self.permutations_filtered += filtered
+        if counts is not None:
+            counts.tested += tested
+            counts.insertions += insertions
+            counts.rejections += tested - filtered - insertions
+        return first_index + tested
+
+    def _scan_timed(self, permutation: Tuple[iComponent, ...], flat_index: int, filters: List[Callable[..., bool]],
+                    counts: "ScanCounts") -> Optional[bool]:
+        """
+        Test a permutation like _scan, timing every stage
 
-            # Ensure that the permutation does not violate any filters defined
-            if perm_valid:
-                self.process_permutation(val_product)
+        :return: None if a filter rejected the permutation, otherwise whether the result store kept it
+        """
+        perf_counter = time.perf_counter
+        for filter_index, filter_funct in enumerate(filters):
+            start = perf_counter()
+            passed = filter_funct(*permutation)
+            timing = counts.filter_timing[filter_index]
+            timing[0] += 1
+            timing[1] += perf_counter() - start
+            if not passed:
+                counts.rejected[filter_index] += 1
+                return None
+
+        start = perf_counter()
+        value = self.calculation_function(*permutation)
+        counts.calculation_timing[0] += 1
+        counts.calculation_timing[1] += perf_counter() - start
+
+        start = perf_counter()
+        error = self.calc_error(value)
+        kept = self.results.add(permutation, value, error, order=flat_index)
+        counts.insertion_timing[0] += 1
+        counts.insertion_timing[1] += perf_counter() - start
+        return kept
+
+    def _restore_checkpoint(self, checkpoint: "SearchCheckpoint", product: LazyProduct) -> int:
+        """
+        Restore the counters and results of a checkpoint
+
+        :return: The flat index the search continues from
+        """
+        self.total_permutations_tested = checkpoint.tested
+        self.permutations_filtered = checkpoint.filtered
+        self._restore_results(checkpoint.results, product)
+        return checkpoint.next_index
+
+    def _restore_results(self, results: Iterable[Tuple[float, int, float]], product: LazyProduct) -> None:
+        """
+        Add results stored as (error, flat index, value), rebuilding their permutations
+        """
+        for error, order, value in results:
+            self.results.add(product[order], value, error, order=order)
+
+    def _populate_results_bisect(self, plan: BisectPlan) -> None:
+        self.total_permutations_tested = plan.candidate_count
+        self.permutations_evaluated, self.permutations_filtered = bisect_search(
+            plan, self.calculation_function, self.filters, self.target_value, self.results
+        )
+
+    def _populate_results_pruned(self, candidates: List[Sequence[Any]]) -> None:
+        """
+        Iterate over all combinations position by position, testing every PartialFilter once its positions are bound.
+        The permutations skipped because a partial filter failed count as tested and filtered.
+
+        :param candidates: The components of every position, as sequences (see index_space.as_sequence)
+        """
+        positions = len(candidates)
+
+        # The innermost position is iterated once per permutation of the others, so its components are built once
+        candidates = list(candidates)
+        if positions > 0:
+            candidates[-1] = tuple(candidates[-1])
+
+        filters_at: List[List[PartialFilter]] = [[] for _ in range(max(positions, 1))]
+        full_filters = []
+        for filter_funct in self.filters:
+            if isinstance(filter_funct, PartialFilter) and filter_funct.depth < positions - 1:
+                filters_at[filter_funct.depth].append(filter_funct)
             else:
-                self.permutations_filtered += 1
+                full_filters.append(filter_funct)
+
+        # The number of permutations below a bound value of every position
+        inner_sizes = [1] * positions
+        for depth in range(positions - 2, -1, -1):
+            inner_sizes[depth] = inner_sizes[depth + 1] * len(candidates[depth + 1])
+
+        # first_index is the flat index of the first permutation below the bound values
+        def visit(depth: int, bound: Tuple[Any, ...], first_index: int) -> None:
+            if depth == positions - 1 or positions == 0:
+                # The innermost position: test the remaining filters on every full permutation
+                inner = candidates[depth:depth + 1]
+                self._scan((bound + p for p in itertools.product(*inner)), first_index, full_filters)
+                return
+
+            for i, component in enumerate(candidates[depth]):
+                permutation = bound + (component,)
+                for filter_funct in filters_at[depth]:
+                    if not filter_funct.test(permutation):
+                        self.total_permutations_tested += inner_sizes[depth]
+                        self.permutations_filtered += inner_sizes[depth]
+                        break
+                else:
+                    visit(depth + 1, permutation, first_index + i * inner_sizes[depth])
+
+        visit(0, (), 0)
+
+    def iter_improving_results(self, time_budget: Optional[float] = None, max_evaluations: Optional[int] = None,
+                               adaptive_filters: bool = False) -> Generator[List[Tuple[float, Any, Tuple[iComponent, ...]]], None, None]:
+        """
+        Search the permutations from the most to the least promising, yielding the results every time they improve.
+
+        Candidates are ranked by how close they bring the calculation function to the target while the other
+        value iterators hold their median value, and permutations are visited by increasing sum of ranks.
+        Like the vectorized mode, the calculation function and filters are called with nominal float values.
+        Once the generator is exhausted, search_coverage holds the fraction of the permutations evaluated,
+        search_complete whether all of them were, and best_error the error of the best result.
+
+        :param time_budget: Stop after this many seconds, None to not limit the time
+        :param max_evaluations: Stop after evaluating this many permutations, None to not limit the evaluations
+        :param adaptive_filters: Reorder the filters by their measured cost and rejection rate, see populate_results
+        :return: A generator of the sorted (error, value, permutation) results, see TopKResults.items
+        """
+        from ECPF.vectorized import materialize_value_iterators
+        from ECPF.anytime import AnytimeSearch
+
+        with self._bound_filters(), self._profiled(), self._adaptive_filters(adaptive_filters):
+            self._reset_results()
+            search = AnytimeSearch(
+                candidates=materialize_value_iterators(self.value_iterators)[0],
+                calculation_function=self.calculation_function,
+                filters=list(self.filters),
+                target_value=self.target_value,
+                results=self.results,  # type: ignore
+                time_budget=time_budget,
+                max_evaluations=max_evaluations
+            )
+            try:
+                for snapshot in search.snapshots():
+                    self.total_permutations_tested, self.permutations_filtered = search.tested, search.filtered
+                    self.permutations_evaluated = search.tested
+                    self.search_coverage = search.coverage
+                    yield snapshot
+            finally:
+                self.total_permutations_tested, self.permutations_filtered = search.tested, search.filtered
+                self.permutations_evaluated = search.tested
+                self.search_coverage = search.coverage
+                self.search_complete = search.complete
+
+    def _populate_results_vectorized(self, block_size: int, workers: Optional[int] = None) -> None:
+        """
+        Populate the results by evaluating blocks of the permutation product with NumPy.
+
+        :param block_size: The number of permutations evaluated per block
+        :param workers: The number of worker processes to split the search over, or None to search in this process
+        :return: None
+        """
+        from ECPF.vectorized import materialize_value_iterators, search_product
+        from ECPF.parallel import parallel_search_product
+
+        candidates, values = materialize_value_iterators(self.value_iterators)
+
+        search_arguments = dict(
+            values=values,
+            calculation_function=self.calculation_function,
+            filters=list(self.filters),
+            target_value=self.target_value,
+            number_of_results=self.number_of_results,
+            block_size=block_size,
+            duplicate_tolerance=self.results.duplicate_tolerance
+        )
+        if workers is None:
+            search = search_product(**search_arguments)
+        else:
+            search = parallel_search_product(workers=workers, **search_arguments)
+        self._add_product_search_results(candidates, *search)
+
+    def _add_product_search_results(self, candidates: List["ComponentArray"], best_indices: "np.ndarray",
+                                    best_errors: "np.ndarray", best_values: "np.ndarray", tested: int, filtered: int
+                                    ) -> None:
+        """
+        Add the results of a vectorized search (see vectorized.search_product) and take its counters
+        """
+        import numpy as np  # type: ignore
+
+        shape = tuple(len(c) for c in candidates)
+        self.total_permutations_tested = tested
+        self.permutations_evaluated = tested
+        self.permutations_filtered = filtered
+
+        # Component objects are only built for the kept permutations
+        for flat_index, error, value in zip(best_indices, best_errors, best_values):
+            position_indices = np.unravel_index(int(flat_index), shape)
+            self.results.add(
+                tuple(c.build(int(i)) for c, i in zip(candidates, position_indices)), float(value), float(error),
+                order=int(flat_index)
+            )
 
     # Statistical methods
     def theoretical_min_max(self,permutation: Tuple[iComponent]
@@ -132,6 +737,14 @@ class ValueFilter:
         for c in permutation:
             perm_min_max_list.append((c.min_val, c.max_val))
 
+        # With declared directions the extremes are two opposite corners. Proving the directions of an Expression
+        # costs more than the corners of a single permutation, so only theoretical_min_max_many does it.
+        if self.monotonicity is not None:
+            directions = self.monotonicity
+            min_perm = tuple(lo if d >= 0 else hi for (lo, hi), d in zip(perm_min_max_list, directions))
+            max_perm = tuple(hi if d >= 0 else lo for (lo, hi), d in zip(perm_min_max_list, directions))
+            return self.calculation_function(*min_perm), min_perm, self.calculation_function(*max_perm), max_perm
+
         for extreme_perm in itertools.product(*perm_min_max_list):
             extreme_perm_val = self.calculation_function(*extreme_perm)
 
@@ -146,26 +759,108 @@ class ValueFilter:
 
         return theoretical_min, min_perm, theoretical_max, max_perm
 
+    def _extreme_directions(self, intervals: Sequence[Tuple[float, float]]) -> Optional[Tuple[int, ...]]:
+        """
+        The monotonicity of the calculation function over a box of argument intervals: the declared monotonicity,
+        or the one an Expression proves over the box. None if it is not known.
+        """
+        if self.monotonicity is not None:
+            return tuple(self.monotonicity)
+        function = self.calculation_function
+        if isinstance(function, Expression) and len(intervals) == len(function.variables):
+            try:
+                return function.monotonicity(*intervals)
+            except (ArithmeticError, ValueError):
+                return None
+        return None
+
+    def theoretical_min_max_many(self, permutations: Optional[Iterable[Tuple[iComponent, ...]]] = None,
+                                 block_size: int = 2 ** 16) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        The theoretical minimum and maximum of many permutations at once, evaluating the calculation function
+        over NumPy arrays (see vectorized.corner_min_max).
+        With a declared monotonicity, or an Expression whose monotonicity is proven over the extremes of all the
+        permutations, the calculation function is evaluated twice, otherwise on every corner of every permutation.
+
+        :param permutations: The permutations, the results in their order if omitted
+        :param block_size: The number of calculation function evaluations per array call
+        :return: Float64 arrays of the theoretical minimum and maximum of every permutation
+        """
+        import numpy as np  # type: ignore
+        from ECPF.vectorized import corner_min_max
+
+        if permutations is None:
+            permutations = [permutation for _, _, permutation in self.results.items()]
+        permutations = list(permutations)
+        count = len(permutations)
+        positions = len(permutations[0]) if count > 0 else 0
+
+        minimums = [np.fromiter((perm[p].min_val for perm in permutations), np.float64, count)
+                    for p in range(positions)]
+        maximums = [np.fromiter((perm[p].max_val for perm in permutations), np.float64, count)
+                    for p in range(positions)]
+
+        directions = None
+        if count > 0:
+            directions = self._extreme_directions(
+                [(float(lo.min()), float(hi.max())) for lo, hi in zip(minimums, maximums)]
+            )
+        return corner_min_max(self.calculation_function, minimums, maximums, directions, block_size)
+
+    def worst_case_errors(self, permutations: Optional[Iterable[Tuple[iComponent, ...]]] = None) -> "np.ndarray":
+        """
+        The largest error from the target value every permutation can reach within the tolerances of its components
+
+        :param permutations: The permutations, the results in their order if omitted
+        :return: A float64 array of the worst case relative error of every permutation
+        """
+        import numpy as np  # type: ignore
+
+        minimums, maximums = self.theoretical_min_max_many(permutations)
+        target = float(self.target_value)
+        return np.maximum(np.abs(target - minimums), np.abs(target - maximums)) / abs(target)
+
     def generate_monte_carlo_distribution_samples(
-            self, permutation: Tuple[iComponent], n_samples=500 * 10 ** 3) -> Deque[float]:
+            self, permutation: Tuple[iComponent], n_samples=500 * 10 ** 3, rng=None) -> "np.ndarray":
         """
-        The permutation to generate the samples for
+        The permutation to generate the samples for.
+        Every component is sampled n_samples times at once, and the calculation function is evaluated once over
+        the whole sample arrays (element by element if it cannot accept arrays).
+
         :param permutation: The permutation to take samples and calculate the value of.
         :param n_samples: The number of monte carlo samples to generate
-        :return:
+        :param rng: A numpy.random.Generator, or a seed for one, making the samples reproducible
+        :return: A float64 array of the sampled values
         """
-        sample_results: Deque[float] = deque(maxlen=n_samples)
-        for s in range(n_samples):
-            permutation_samples = (v.sample() for v in permutation)
-            sample_val = self.calculation_function(*permutation_samples)
-            sample_results.append(sample_val)
+        import numpy as np  # type: ignore
+        from ECPF.vectorized import apply_elementwise
 
-        return sample_results
+        rng = np.random.default_rng(rng)
+        component_samples = [v.sample_many(n_samples, rng) for v in permutation]
+        return apply_elementwise(self.calculation_function, component_samples, n_samples)
 
-    def generate_stat_data(self, permutation: Tuple[iComponent], samples=None
+    def generate_stat_data(self, permutation: Tuple[iComponent], samples=None, rng=None,
+                           streaming: bool = False, n_samples: int = 500 * 10 ** 3, chunk_size: int = 2 ** 16
                            ) -> Tuple[float, float, int, float, float, float, float, float, float, float]:
+        """
+        :param permutation: The permutation to generate statistics for
+        :param samples: Previously generated samples, new ones are generated if omitted
+        :param rng: A numpy.random.Generator, or a seed for one, used when generating samples
+        :param streaming: Generate the samples chunk by chunk and accumulate their statistics in constant memory
+            instead of buffering every sample. The quartiles are then estimated from a fixed size sample.
+        :param n_samples: The number of samples to generate
+        :param chunk_size: The number of samples generated per chunk in streaming mode
+        :return: theoretical min, theoretical max, sample count, std, variance, skewness, mean, q25, median, q75
+        """
+        import numpy as np  # type: ignore
+        from numpy import percentile, std, mean  # type: ignore
+
+        if streaming and samples is None:
+            return self._generate_streaming_stat_data(permutation, rng, n_samples, chunk_size)
+
         if samples is None:
-            samples = self.generate_monte_carlo_distribution_samples(permutation)
+            samples = self.generate_monte_carlo_distribution_samples(permutation, n_samples, rng=rng)
+        samples = np.asarray(samples, dtype=np.float64)
 
         sample_len = len(samples)
 
@@ -176,20 +871,82 @@ class ValueFilter:
         q25, median, q75 = percentile(
             samples,
             [25, 50, 75],
-            interpolation='midpoint'
+            method='midpoint'
         )
         # Generate statistical information
         standard_dev = std(samples)
         mean_val = mean(samples)
-        variance = sum((samp - mean_val) ** 2 for samp in samples) / (sample_len - 1)
+        deviations = samples - mean_val
+        variance = np.sum(deviations ** 2) / (sample_len - 1)
         skewness = sample_len / ((sample_len - 1) * (sample_len - 2)) \
-                   * sum((samp - mean_val) ** 3 for samp in samples) / standard_dev ** 3
+                   * np.sum(deviations ** 3) / standard_dev ** 3
 
         return theoretical_min, theoretical_max, sample_len, standard_dev, variance, skewness, mean_val, q25, median, q75
 
-    def get_stats_str(self, permutation: Tuple[iComponent], samples=None) -> str:
+    def _generate_streaming_stat_data(self, permutation: Tuple[iComponent], rng, n_samples: int, chunk_size: int
+                                      ) -> Tuple[float, float, int, float, float, float, float, float, float, float]:
+        import numpy as np  # type: ignore
+        from ECPF.streaming_stats import MomentAccumulator, QuantileSketch
+
+        rng = np.random.default_rng(rng)
+        moments = MomentAccumulator()
+        sketch = QuantileSketch(rng=rng)
+
+        for chunk in self._sample_chunks(permutation, rng, n_samples, chunk_size):
+            moments.update(chunk)
+            sketch.update(chunk)
+
+        theoretical_min, min_perm, theoretical_max, max_perm, = self.theoretical_min_max(permutation)
+        q25, median, q75 = sketch.quantiles([0.25, 0.5, 0.75])
+
+        return (
+            theoretical_min, theoretical_max, moments.count,
+            moments.standard_deviation, moments.variance, moments.skewness, moments.mean,
+            q25, median, q75
+        )
+
+    def _sample_chunks(self, permutation: Tuple[iComponent], rng, n_samples: int, chunk_size: int):
+        for start in range(0, n_samples, chunk_size):
+            yield self.generate_monte_carlo_distribution_samples(
+                permutation, min(chunk_size, n_samples - start), rng=rng
+            )
 
-        stat_data = self.generate_stat_data(permutation, samples)
+    def generate_sample_moments(self, permutation: Tuple[iComponent], samples=None, rng=None,
+                                n_samples: int = 500 * 10 ** 3, chunk_size: int = 2 ** 16):
+        """
+        Accumulate the moments of the sampled values of a permutation, including the excess kurtosis
+        generate_stat_data leaves out.
+
+        :param permutation: The permutation to take samples of
+        :param samples: Previously generated samples, new ones are generated chunk by chunk if omitted
+        :param rng: A numpy.random.Generator, or a seed for one, used when generating samples
+        :param n_samples: The number of samples to generate
+        :param chunk_size: The number of samples generated per chunk
+        :return: A streaming_stats.MomentAccumulator with the count, mean, standard deviation, variance, skewness
+            and kurtosis of the samples
+        """
+        import numpy as np  # type: ignore
+        from ECPF.streaming_stats import MomentAccumulator
+
+        moments = MomentAccumulator()
+        if samples is not None:
+            moments.update(samples)
+            return moments
+
+        rng = np.random.default_rng(rng)
+        for chunk in self._sample_chunks(permutation, rng, n_samples, chunk_size):
+            moments.update(chunk)
+        return moments
+
+    def get_stats_str(self, permutation: Tuple[iComponent], samples=None, streaming: bool = False, rng=None) -> str:
+        """
+        :param permutation: The permutation to describe
+        :param samples: Previously generated samples, new ones are generated if omitted
+        :param streaming: Accumulate the statistics of the generated samples in constant memory, see generate_stat_data
+        :param rng: A numpy.random.Generator, or a seed for one, used when generating samples
+        :return: The statistics of the permutation as text
+        """
+        stat_data = self.generate_stat_data(permutation, samples, rng=rng, streaming=streaming)
         theoretical_min, theoretical_max, sample_len,standard_dev, variance, skewness, mean_val, q25, median, q75 = stat_data
 
         # Display some statistical information about the range of values
@@ -208,6 +965,8 @@ class ValueFilter:
 
     @staticmethod
     def plot_sample_distribution(samples: Iterable[float]):
+        from matplotlib import pyplot as plt  # type: ignore
+
         plt.hist(
             x=samples,
             bins=100,
@@ -216,5 +975,28 @@ class ValueFilter:
         plt.show()
 
     def __iter__(self):
-        for result in self.results:
-            yield self.calculation_function(*result), result
+        for _, value, result in self.results.items():
+            yield value, result
+
+
+def _search_mode(vectorized: bool, workers: Optional[int], branch_and_bound: bool, inverse_solve: bool) -> str:
+    """
+    The search populate_results runs, for the modes that may keep different results, in the order it tries them
+    """
+    if inverse_solve:
+        return "inverse"
+    if branch_and_bound:
+        return "branch_and_bound"
+    if vectorized or workers is not None:
+        return "vectorized"
+    return "scalar"
+
+
+def _same_permutation(a: Tuple[iComponent, ...], b: Tuple[iComponent, ...]) -> bool:
+    """
+    Check whether two permutations hold the same values, combined by the same chaining functions
+    """
+    return len(a) == len(b) and all(
+        float(x) == float(y) and getattr(x, "chain_functions", None) == getattr(y, "chain_functions", None)
+        for x, y in zip(a, b)
+    )
@@ -2,13 +2,20 @@
 Defines objects that generate component permutations
 """
 
+import collections
 import decimal
-from typing import Set, Tuple, Dict, List, Deque, Iterable, Callable, Generator, Any
+from typing import Set, Tuple, Dict, List, Deque, Iterable, Sequence, Callable, Generator, Any
 import itertools
 import functools
 import operator
 import math
+from typing import TYPE_CHECKING
 from ECPF.components import iComponent, Component, ChainPermutation
+from ECPF.index_space import MixedRadix
+
+# The compact array representation needs NumPy, which is only imported when it is requested
+if TYPE_CHECKING:
+    from ECPF.component_array import ComponentArray
 
 
 class iPermutator:
@@ -19,6 +26,44 @@ class iPermutator:
     def __iter__(self) -> Generator[iComponent, None, None]:
         raise NotImplementedError
 
+    def at(self, index: int) -> iComponent:
+        """
+        The component at an index of the iteration order.
+        Subclasses that can build a component from its index should override this, by default the components
+        before it are iterated.
+        """
+        if index < 0:
+            raise IndexError(f"Negative component index: {index}")
+        for component in itertools.islice(self, index, None):
+            return component
+        raise IndexError(f"Component index {index} out of range")
+
+    def as_array(self) -> "ComponentArray":
+        """
+        The candidates stored column by column, without creating an object per candidate.
+        Subclasses that can compute the columns directly should override this, by default every candidate is created.
+        """
+        from ECPF.component_array import ComponentArray
+
+        return ComponentArray.from_components(tuple(self))
+
+
+class iSortedPermutator(iPermutator):
+    """
+    A permutator whose components are stored sorted by nominal value, and can be accessed by their sorted index
+    """
+
+    @property
+    def sorted_values(self) -> Sequence[float]:
+        raise NotImplementedError
+
+    def component_at(self, index: int) -> iComponent:
+        raise NotImplementedError
+
+    def at(self, index: int) -> iComponent:
+        # Sorted permutators iterate in sorted order
+        return self.component_at(index)
+
 
 class ComponentPermutator(iPermutator):
     """
@@ -26,36 +71,265 @@ class ComponentPermutator(iPermutator):
     """
 
     def __init__(self, values: Iterable, tolerance: float = 0.0):
-        self.values: Iterable = values
+        # Kept as a tuple, so values given as a generator can be iterated more than once
+        self.values: Tuple[Any, ...] = tuple(values)
         self.tolerance: float = tolerance
 
     @property
     def permutation_count(self) -> int:
-        return sum(1 for x in self.values)
+        return len(self.values)
 
     def __iter__(self) -> Generator[Component, None, None]:
         for v in self.values:
             yield Component(v, self.tolerance)
 
+    def at(self, index: int) -> Component:
+        return Component(self.values[index], self.tolerance)
+
+    def as_array(self) -> "ComponentArray":
+        from ECPF.component_array import ComponentArray
+
+        return ComponentArray.from_values([float(v) for v in self.values], self.tolerance)
+
 
 class ChainPermutator(iPermutator):
     """
     This class acts as a may of chaining PermutatorComponent devices
     """
 
-    def __init__(self, components: Iterable[ComponentPermutator], chaining_functions: Iterable[Callable]):
-        self.components: Iterable[ComponentPermutator] = components
-        self.chaining_functions: Iterable[Callable] = chaining_functions
+    def __init__(self, components: Iterable[ComponentPermutator], chaining_functions: Iterable[Callable],
+                 canonical: bool = False):
+        self.components: Tuple[ComponentPermutator, ...] = tuple(components)
+        self.chaining_functions: Tuple[Callable, ...] = tuple(chaining_functions)
+
+        # Only emit the canonical form of electrically equivalent chains (see ChainPermutation.is_canonical).
+        # Swapping the operands of a chain only gives another chain of the permutator when every position draws
+        # from the same inventory, otherwise the canonical form of a network may not be emitted at all.
+        if canonical and not same_inventory(self.components):
+            raise ValueError(
+                "canonical=True needs every position of the chain to draw from the same inventory, "
+                "otherwise networks whose canonical form no position can emit would be dropped"
+            )
+        self.canonical: bool = canonical
+
+    @property
+    def function_permutations(self) -> List[Tuple[Callable, ...]]:
+        """
+        The orders of chaining functions every chain of values is combined with
+        """
+        return list(itertools.permutations(self.chaining_functions, r=len(self.components) - 1))
 
     @property
     def permutation_count(self) -> int:
+        if self.canonical:
+            return self._canonical_count()
         return functools.reduce(operator.mul, [v.permutation_count for v in self.components], 1) * \
-               sum(1 for x in self.chaining_functions) ** (sum(1 for x in self.components) - 1)
+               len(self.function_permutations)
+
+    def _canonical_count(self) -> int:
+        """
+        Count the canonical chains without building them. The operands of every run of a chaining function are
+        sorted (see ChainPermutation.is_canonical) and drawn from the same inventory, so every order of chaining
+        functions has as many canonical chains as the product, over its runs, of the number of sorted sequences
+        of run length components of the inventory.
+        """
+        length = len(self.components)
+
+        # The number of sequences of every length whose component keys do not decrease. Components of equal keys
+        # can follow each other in any order, so a group of equal keys of size g contributes g ** c sequences of
+        # c of its components.
+        group_sizes = collections.Counter(ChainPermutation._operand_key(c) for c in self.components[0]).values()
+        sorted_sequences = [1] + [0] * length
+        for size in group_sizes:
+            for run_length in range(1, length + 1):
+                sorted_sequences[run_length] += size * sorted_sequences[run_length - 1]
+
+        count = 0
+        for functions in self.function_permutations:
+            # The first run also holds the first value of the chain
+            chains, run_length = 1, 1
+            for i, function in enumerate(functions):
+                if i > 0 and function is not functions[i - 1]:
+                    chains *= sorted_sequences[run_length]
+                    run_length = 0
+                run_length += 1
+            count += chains * sorted_sequences[run_length]
+        return count
 
     def __iter__(self) -> Generator[ChainPermutation, None, None]:
+        function_permutations = self.function_permutations
         for chain_vals in itertools.product(*self.components):
 
-            for funct_perm in itertools.permutations(self.chaining_functions, r=sum(1 for x in self.components) - 1):
-                # print(funct_perm)
+            for funct_perm in function_permutations:
+                chain = ChainPermutation(chain_vals, funct_perm)  # type: ignore
+                if self.canonical and not chain.is_canonical():
+                    continue
+                yield chain
+
+    def at(self, index: int) -> ChainPermutation:
+        if self.canonical:
+            return super().at(index)
+
+        # The chain values are digits of the index, with the order of chaining functions the fastest changing one
+        function_permutations = self.function_permutations
+        space = MixedRadix([c.permutation_count for c in self.components] + [len(function_permutations)])
+        *value_indices, function_index = space.decode(index)
+        return ChainPermutation(
+            tuple(c.at(i) for c, i in zip(self.components, value_indices)), function_permutations[function_index]
+        )
+
+    def as_array(self) -> "ComponentArray":
+        from ECPF.component_array import ComponentArray
+
+        components = list(self.components)
+        return ComponentArray.from_chains(
+            [c.as_array() for c in components],
+            self.function_permutations,
+            canonical=self.canonical
+        )
+
+
+def same_inventory(permutators: Sequence[Any]) -> bool:
+    """
+    Check if permutators emit the same components: they are the same object, or ComponentPermutators of the same
+    values and tolerance
+    """
+    first = permutators[0] if len(permutators) > 0 else None
+    for permutator in permutators[1:]:
+        if permutator is first:
+            continue
+        if not (isinstance(first, ComponentPermutator) and isinstance(permutator, ComponentPermutator)):
+            return False
+        if permutator.values != first.values or permutator.tolerance != first.tolerance:
+            return False
+    return True
+
+
+def _relative_bin(value: float, epsilon: float) -> Tuple[Any, ...]:
+    """
+    The bin of a value when values within a relative epsilon of each other are treated as equal.
+    Bins are logarithmic, so every bin spans the same relative width.
+    """
+    if epsilon <= 0.0 or value == 0.0 or math.isnan(value) or math.isinf(value):
+        return "exact", value
+    return value > 0.0, math.floor(math.log(math.fabs(value)) / math.log1p(epsilon))
+
+
+class SeriesParallelPermutator(iSortedPermutator):
+    """
+    Enumerates the distinct series/parallel networks of up to max_parts parts built from a set of components.
+
+    Unlike ChainPermutator, which only folds a chain from left to right, any two sub-networks can be combined,
+    so networks such as two parallel pairs in series are found too.
+    The networks are built by dynamic programming: the networks of k parts combine the reachable networks of
+    i and k - i parts. Networks whose values lie within a relative epsilon of each other fall into one bin,
+    which only keeps its cheapest network (the one with the fewest parts), so the enumeration grows with the
+    number of distinct values rather than with the number of parts combinations.
+
+    Networks are ChainPermutation objects whose chain values may themselves be networks.
+    The chaining functions must be commutative, like the series and parallel configuration functions.
+    """
+
+    def __init__(self, components: Iterable[iComponent], chaining_functions: Iterable[Callable],
+                 max_parts: int = 3, epsilon: float = 1e-3):
+        """
+        :param components: The parts networks are built from, for instance a ComponentPermutator
+        :param chaining_functions: The functions combining two sub-networks, for instance series and parallel
+        :param max_parts: The largest number of parts in a network
+        :param epsilon: The relative difference under which two network values are considered equal,
+            0 only merges networks of exactly the same value
+        """
+        if max_parts < 1:
+            raise ValueError(f"max_parts must be at least 1: {max_parts}")
+
+        self.components: Iterable[iComponent] = components
+        self.chaining_functions: Tuple[Callable, ...] = tuple(chaining_functions)
+        self.max_parts: int = max_parts
+        self.epsilon: float = epsilon
+
+        self._networks: List[iComponent] = []
+        self._part_counts: List[int] = []
+        self._sorted_values: List[float] = []
+        self._built: bool = False
+
+    def _build(self) -> None:
+        if self._built:
+            return
+
+        # The cheapest network of every bin reached so far, and the networks first reached with k parts
+        bins: Dict[Tuple[Any, ...], Tuple[int, iComponent]] = {}
+        by_parts: Dict[int, List[Tuple[float, iComponent]]] = {1: []}
+
+        for component in self.components:
+            value = float(component)
+            key = _relative_bin(value, self.epsilon)
+            if key not in bins:
+                bins[key] = (1, component)
+                by_parts[1].append((value, component))
+
+        for parts in range(2, self.max_parts + 1):
+            by_parts[parts] = []
+            for left_parts in range(1, parts // 2 + 1):
+                left_networks = by_parts[left_parts]
+                right_networks = by_parts[parts - left_parts]
+
+                for i, (left_value, left) in enumerate(left_networks):
+                    # Commutative functions: sub-networks of the same size are only combined once per pair
+                    start = i if left_parts == parts - left_parts else 0
+                    for right_value, right in right_networks[start:]:
+                        for function in self.chaining_functions:
+                            value = function(left_value, right_value)
+                            key = _relative_bin(value, self.epsilon)
+                            if key in bins:
+                                continue
+                            network = ChainPermutation((left, right), (function,))
+                            bins[key] = (parts, network)
+                            by_parts[parts].append((value, network))
+
+        entries = sorted(
+            ((value, parts, network) for parts, networks in by_parts.items() for value, network in networks),
+            key=lambda entry: (entry[0], entry[1])
+        )
+        self._sorted_values = [value for value, _, _ in entries]
+        self._part_counts = [parts for _, parts, _ in entries]
+        self._networks = [network for _, _, network in entries]
+        self._built = True
+
+    @property
+    def permutation_count(self) -> int:
+        self._build()
+        return len(self._networks)
+
+    @property
+    def sorted_values(self) -> Sequence[float]:
+        self._build()
+        return self._sorted_values
+
+    def component_at(self, index: int) -> iComponent:
+        self._build()
+        return self._networks[index]
+
+    def part_count(self, index: int) -> int:
+        """
+        :return: The number of parts in the network at a sorted index
+        """
+        self._build()
+        return self._part_counts[index]
+
+    def __iter__(self) -> Generator[iComponent, None, None]:
+        self._build()
+        yield from self._networks
+
+    def as_array(self) -> "ComponentArray":
+        # Nested networks can not be rebuilt from columns, so the cached networks are kept as the objects,
+        # with the nominal values taken from the sorted values computed while building them
+        from ECPF.component_array import ComponentArray
 
-                yield ChainPermutation(chain_vals, funct_perm)  # type: ignore
+        self._build()
+        networks = self._networks
+        return ComponentArray(
+            self._sorted_values,
+            [n.min_val for n in networks],
+            [n.max_val for n in networks],
+            objects=networks
+        )
@@ -0,0 +1,249 @@
+"""
+Defines helpers that evaluate calculation functions and filters over NumPy arrays of candidate values
+instead of one permutation tuple at a time.
+"""
+
+from typing import Tuple, List, Iterable, Sequence, Callable, Optional, Any, TYPE_CHECKING
+import functools
+import math
+import operator
+
+import numpy as np  # type: ignore
+
+from ECPF.components import iComponent
+from ECPF.partial_filters import PartialFilter
+from ECPF.result_store import value_bin
+
+if TYPE_CHECKING:
+    from ECPF.component_array import ComponentArray
+
+
+def materialize_value_iterators(value_iterators: Iterable[Iterable[iComponent]]
+                                ) -> Tuple[List["ComponentArray"], List[np.ndarray]]:
+    """
+    Expand every value iterator once into its compact array representation.
+
+    :param value_iterators: The value iterators of a ValueFilter
+    :return: A tuple of the ComponentArray of each position and a float64 array of their nominal values
+    """
+    from ECPF.component_array import as_component_array
+
+    candidates: List["ComponentArray"] = [as_component_array(vi) for vi in value_iterators]
+    return candidates, [c.nominal for c in candidates]
+
+
+def apply_elementwise(function: Callable[..., Any], arrays: List[np.ndarray], size: int) -> np.ndarray:
+    """
+    Evaluate a function over arrays of arguments.
+
+    The function is first called with whole arrays, which works for functions written with plain arithmetic.
+    Functions that cannot accept arrays (for instance ones that call float() on their arguments) are evaluated
+    element by element instead, which gives the same values at the speed of the scalar search.
+
+    :param function: The function to evaluate
+    :param arrays: One array per positional argument, all of the same length
+    :param size: The length of the argument arrays
+    :return: A float64 array holding the result for every element
+    """
+    try:
+        result = function(*arrays)
+    except (TypeError, ValueError):
+        return np.fromiter((function(*args) for args in zip(*arrays)), dtype=np.float64, count=size)
+    return np.broadcast_to(np.asarray(result, dtype=np.float64), (size,))
+
+
+def corner_min_max(function: Callable[..., Any], minimums: List[np.ndarray], maximums: List[np.ndarray],
+                   directions: Optional[Sequence[int]] = None, block_size: int = 2 ** 16
+                   ) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Evaluate the extremes of a function over boxes of arguments, one box per element of the argument arrays.
+
+    Without directions, the function is evaluated on every corner of every box, with the corners of a block of
+    boxes stacked into one array call. With directions, 1 for every argument the function increases with and -1
+    for every argument it decreases with (0 for arguments it does not depend on), the extremes are the two
+    opposite corners the directions point to, and the function is evaluated twice.
+
+    :param function: The function to evaluate
+    :param minimums: The lower bound of every argument, one array per argument
+    :param maximums: The upper bound of every argument, one array per argument
+    :param directions: The monotonicity of the function in every argument, if known
+    :param block_size: The number of function evaluations per array call when every corner is evaluated
+    :return: Float64 arrays of the minimum and maximum of the function over every box
+    """
+    size = len(minimums[0]) if len(minimums) > 0 else 0
+
+    if directions is not None:
+        low = [lo if d >= 0 else hi for lo, hi, d in zip(minimums, maximums, directions)]
+        high = [hi if d >= 0 else lo for lo, hi, d in zip(minimums, maximums, directions)]
+        return apply_elementwise(function, low, size), apply_elementwise(function, high, size)
+
+    # Bit p of a corner's number selects the maximum of argument p
+    corner_count = 2 ** len(minimums)
+    bits = (np.arange(corner_count)[:, None] >> np.arange(len(minimums))) & 1
+
+    result_min = np.empty(size)
+    result_max = np.empty(size)
+    boxes_per_block = max(1, block_size // corner_count)
+    for start in range(0, size, boxes_per_block):
+        stop = min(start + boxes_per_block, size)
+        corners = [
+            np.where(bits[:, p, None] == 1, maximums[p][None, start:stop], minimums[p][None, start:stop]).ravel()
+            for p in range(len(minimums))
+        ]
+        values = apply_elementwise(function, corners, corner_count * (stop - start))
+        values = values.reshape(corner_count, stop - start)
+        result_min[start:stop] = values.min(axis=0)
+        result_max[start:stop] = values.max(axis=0)
+    return result_min, result_max
+
+
+def value_bins(values: np.ndarray, duplicate_tolerance: float) -> np.ndarray:
+    """
+    The result_store.value_bin of every value, as rows of an array that are equal for values of the same bin.
+    Values whose bin can not be told from a NumPy logarithm that may differ from math.log in the last bit,
+    because it falls within rounding of a bin boundary, get the bin value_bin computes.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    bins = np.zeros((len(values), 2), dtype=np.float64)
+    if duplicate_tolerance <= 0.0:
+        bins[:, 1] = values
+        return bins
+
+    finite = np.isfinite(values) & (values != 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scaled = np.log(np.abs(values)) / math.log1p(duplicate_tolerance)
+    bins[:, 0] = np.sign(values)
+    bins[finite, 1] = np.floor(scaled[finite])
+    for i in np.flatnonzero(finite & (np.abs(scaled - np.round(scaled)) < 1e-9)):
+        bins[i, 1] = value_bin(values[i], duplicate_tolerance)[1]  # type: ignore
+
+    # Infinities are never duplicates: give each its own bin
+    infinite = np.flatnonzero(np.isinf(values))
+    bins[infinite, 0] = 2.0
+    bins[infinite, 1] = np.arange(len(infinite))
+    return bins
+
+
+def keep_best(errors: np.ndarray, indices: np.ndarray, values: np.ndarray, count: int,
+              duplicate_tolerance: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Select the count smallest errors, breaking ties by the smallest flat index so results are deterministic.
+
+    With a duplicate_tolerance, only the best result of every bin of values (see result_store.value_bin) can be
+    selected, like TopKResults keeps them. A bin's best result only improves as results are added, so selecting
+    the best of the previous selection and a new block gives the same results as selecting over all of them.
+    """
+    if duplicate_tolerance is not None and len(errors) > 0:
+        order = np.lexsort((indices, errors))
+        _, first = np.unique(value_bins(values[order], duplicate_tolerance), axis=0, return_index=True)
+        keep = order[np.sort(first)]
+        errors, indices, values = errors[keep], indices[keep], values[keep]
+
+    if len(errors) <= count:
+        return errors, indices, values
+
+    kth_error = np.partition(errors, count - 1)[count - 1]
+    below = errors < kth_error
+    tied = np.flatnonzero(errors == kth_error)
+    tied = tied[np.argsort(indices[tied], kind="stable")][:count - int(np.count_nonzero(below))]
+
+    keep = np.concatenate((np.flatnonzero(below), tied))
+    return errors[keep], indices[keep], values[keep]
+
+
+def search_product(values: List[np.ndarray],
+                   calculation_function: Callable[..., Any],
+                   filters: Iterable[Callable[..., Any]],
+                   target_value: float,
+                   number_of_results: int,
+                   block_size: int = 2 ** 16,
+                   duplicate_tolerance: Optional[float] = None,
+                   ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int, int]:
+    """
+    Evaluate the full product of the given value arrays in blocks, keeping only the best results.
+
+    :param values: The nominal values for each position of the calculation function
+    :param calculation_function: The calculation preformed on every permutation
+    :param filters: Filters that every kept permutation must satisfy
+    :param target_value: The value the calculation function aims to achieve
+    :param number_of_results: The number of best results to keep
+    :param block_size: The number of permutations evaluated per block
+    :param duplicate_tolerance: Only keep the best result of every bin of duplicate values, see TopKResults
+    :return: The flat product indices of the best results sorted by error, their errors, their values,
+        the number of permutations tested and the number of permutations filtered
+    """
+    return search_product_many(
+        values, [(calculation_function, filters, target_value, number_of_results, duplicate_tolerance)], block_size
+    )[0]
+
+
+def search_product_many(values: List[np.ndarray],
+                        jobs: Sequence[Tuple[Callable[..., Any], Iterable[Callable[..., Any]], float, int,
+                                             Optional[float]]],
+                        block_size: int = 2 ** 16,
+                        ) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray, int, int]]:
+    """
+    Evaluate the full product of the given value arrays for several searches at once.
+    Every block of the product is enumerated once, and evaluated by the calculation function of every search.
+
+    :param values: The nominal values for each position of the calculation functions
+    :param jobs: The (calculation function, filters, target value, number of results, duplicate tolerance)
+        of every search
+    :param block_size: The number of permutations evaluated per block
+    :return: The results of every search, as returned by search_product
+    """
+    shape = tuple(len(v) for v in values)
+    total = functools.reduce(operator.mul, shape, 1)
+    jobs = [(calculation_function, tuple(filters), float(target_value), number_of_results, duplicate_tolerance)
+            for calculation_function, filters, target_value, number_of_results, duplicate_tolerance in jobs]
+
+    best = [
+        (np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)) for _ in jobs
+    ]
+    permutations_filtered = [0] * len(jobs)
+    active = [j for j, job in enumerate(jobs) if job[3] > 0]
+
+    for start in range(0, total if len(active) > 0 else 0, block_size):
+        block_indices = np.arange(start, min(start + block_size, total), dtype=np.int64)
+        block_args = [v[i] for v, i in zip(values, np.unravel_index(block_indices, shape))]
+
+        for j in active:
+            calculation_function, filters, target_value, number_of_results, duplicate_tolerance = jobs[j]
+            flat_indices, args = block_indices, block_args
+
+            # Each filter only needs to run on permutations that passed the previous ones
+            for filter_funct in filters:
+                if isinstance(filter_funct, PartialFilter):
+                    passed = apply_elementwise(
+                        filter_funct.function, [args[p] for p in filter_funct.positions], len(flat_indices)
+                    ).astype(bool)
+                else:
+                    passed = apply_elementwise(filter_funct, args, len(flat_indices)).astype(bool)
+                flat_indices = flat_indices[passed]
+                args = [a[passed] for a in args]
+            permutations_filtered[j] += len(block_indices) - len(flat_indices)
+
+            if len(flat_indices) == 0:
+                continue
+
+            results = apply_elementwise(calculation_function, args, len(flat_indices))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                errors = np.abs((target_value - results) / target_value)
+
+            # Values that could not be calculated never make it into the results
+            calculated = ~np.isnan(errors)
+
+            best_errors, best_indices, best_values = best[j]
+            best[j] = keep_best(
+                np.concatenate((best_errors, errors[calculated])),
+                np.concatenate((best_indices, flat_indices[calculated])),
+                np.concatenate((best_values, results[calculated])),
+                number_of_results, duplicate_tolerance
+            )
+
+    searches = []
+    for j, (best_errors, best_indices, best_values) in enumerate(best):
+        order = np.lexsort((best_indices, best_errors))
+        tested = total if j in active else 0
+        searches.append((best_indices[order], best_errors[order], best_values[order], tested, permutations_filtered[j]))
+    return searches
@@ -0,0 +1,65 @@
+from ECPF.components import iterate_value_order_magnitude, ChainPermutation
+from ECPF.value_filter import ValueFilter
+from ECPF.value_permutator import ComponentPermutator, ChainPermutator
+from ECPF.constants import E_SERIES
+from ECPF.component_config_functs import ResistorConfiguration
+import time
+
+# Counts every call of the chaining functions, i.e. every step of a chain's value fold
+fold_calls = 0
+
+
+def series(r1, r2):
+    global fold_calls
+    fold_calls += 1
+    return ResistorConfiguration.series(r1, r2)
+
+
+def parallel(r1, r2):
+    global fold_calls
+    fold_calls += 1
+    return ResistorConfiguration.parallel(r1, r2)
+
+
+def resistor_divider_search():
+    # A typical scalar search: the calculation function calls float() on each chain several times
+    resistor_values = tuple(iterate_value_order_magnitude(E_SERIES["E12"], range(2, 5)))
+    chain = ChainPermutator(
+        components=[ComponentPermutator(values=resistor_values, tolerance=0.01)] * 2,
+        chaining_functions=(series, parallel)
+    )
+
+    vf = ValueFilter(
+        value_iterators=[chain, ComponentPermutator(values=resistor_values, tolerance=0.01)],
+        target_value=0.33,
+        calculation_function=lambda ra, rb: float(ra) / (float(ra) + float(rb)),
+        filters=[lambda ra, rb: 100 < float(ra) + float(rb) < 100 * 10 ** 3],
+        number_of_results=20
+    )
+    vf.populate_results(use_bisect=False)
+    return vf
+
+
+def measure(label):
+    global fold_calls
+    fold_calls = 0
+    start = time.perf_counter()
+    vf = resistor_divider_search()
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {fold_calls} fold calls for {vf.total_permutations_tested} permutations "
+          f"({fold_calls / vf.total_permutations_tested:.2f} per permutation) in {elapsed:.3f}s")
+    return fold_calls
+
+
+if __name__ == "__main__":
+    memoized = measure("Memoized value")
+
+    # Recompute the value on every access, as ChainPermutation did before the value was cached
+    cached_value = ChainPermutation.value
+    ChainPermutation.value = property(ChainPermutation._fold_value)
+    try:
+        refolded = measure("Refolded value")
+    finally:
+        ChainPermutation.value = cached_value
+
+    print(f"Fold calls reduced {refolded / memoized:.1f}x")
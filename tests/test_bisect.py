@@ -0,0 +1,62 @@
+import unittest
+
+from ECPF.components import ChainPermutation
+from ECPF.component_config_functs import ResistorConfiguration
+from ECPF.value_filter import ValueFilter
+from ECPF.value_permutator import ComponentPermutator, ChainPermutator
+
+VALUES = (100, 150, 220, 330, 470, 680, 1000, 1500, 2200, 3300, 4700, 6800)
+FUNCTIONS = (ResistorConfiguration.series, ResistorConfiguration.parallel)
+
+
+def identity(network):
+    return network
+
+
+def describe(component):
+    if isinstance(component, ChainPermutation):
+        return [describe(v) for v in component.chain_vals], [f.__name__ for f in component.chain_functions]
+    return float(component), component.min_val, component.max_val
+
+
+def described_results(vf):
+    return [(error, float(value), [describe(c) for c in perm]) for error, value, perm in vf.results.items()]
+
+
+class TestBisectSearch(unittest.TestCase):
+
+    def search(self, value_iterator, **options):
+        vf = ValueFilter(1234.0, [value_iterator], identity, [lambda n: float(n) > 300], 7)
+        vf.populate_results(**options)
+        return vf
+
+    def assert_same_as_scan(self, value_iterator):
+        bisected = self.search(value_iterator)
+        scanned = self.search(value_iterator, use_bisect=False)
+
+        # Canonical chains are ordered by their index in the full product rather than among the canonical chains,
+        # which keeps the order of ties
+        self.assertEqual(described_results(bisected), described_results(scanned))
+        if not getattr(value_iterator, "canonical", False):
+            self.assertEqual([order for _, order, _, _ in bisected.results.entries()],
+                             [order for _, order, _, _ in scanned.results.entries()])
+
+        # Every candidate counts as tested, only the ones the bisect solver reached are evaluated
+        self.assertEqual(bisected.total_permutations_tested, scanned.total_permutations_tested)
+        self.assertEqual(scanned.permutations_evaluated, scanned.total_permutations_tested)
+        self.assertLess(bisected.permutations_evaluated, bisected.total_permutations_tested)
+
+    def test_components(self):
+        self.assert_same_as_scan(ComponentPermutator(VALUES, 0.01))
+
+    def test_chains(self):
+        inventory = ComponentPermutator(VALUES, 0.01)
+        self.assert_same_as_scan(ChainPermutator([inventory, inventory], FUNCTIONS))
+
+    def test_canonical_chains(self):
+        inventory = ComponentPermutator(VALUES + (1000,), 0.01)
+        self.assert_same_as_scan(ChainPermutator([inventory, inventory], FUNCTIONS, canonical=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import itertools
+import unittest
+
+from ECPF.value_filter import ValueFilter
+from ECPF.value_permutator import ComponentPermutator, ChainPermutator
+from ECPF.component_config_functs import ResistorConfiguration
+from ECPF.component_array import ComponentArray
+
+FUNCTIONS = (ResistorConfiguration.series, ResistorConfiguration.parallel)
+VALUES = (100, 220, 470, 1000, 2200)
+
+
+def network_values(permutator):
+    return sorted(round(float(chain), 9) for chain in permutator)
+
+
+class TestCanonicalChains(unittest.TestCase):
+
+    def test_mixed_inventories_are_rejected(self):
+        with self.assertRaises(ValueError):
+            ChainPermutator([ComponentPermutator((200,)), ComponentPermutator((100,))], FUNCTIONS, canonical=True)
+
+        with self.assertRaises(ValueError):
+            ChainPermutator(
+                [ComponentPermutator(VALUES, 0.01), ComponentPermutator(VALUES, 0.05)], FUNCTIONS, canonical=True
+            )
+
+        with self.assertRaises(ValueError):
+            ComponentArray.from_chains(
+                [ComponentPermutator((200,)).as_array(), ComponentPermutator((100,)).as_array()],
+                [(f,) for f in FUNCTIONS], canonical=True
+            )
+
+    def test_mixed_inventories_emit_every_chain(self):
+        permutator = ChainPermutator([ComponentPermutator((200,)), ComponentPermutator((100,))], FUNCTIONS)
+        self.assertEqual(network_values(permutator), [round(200 * 100 / 300, 9), 300.0])
+
+    def test_equal_inventories_keep_every_network(self):
+        # Distinct but equal permutators share an inventory
+        components = [ComponentPermutator(VALUES, 0.01) for _ in range(3)]
+        full = ChainPermutator(components, FUNCTIONS)
+        canonical = ChainPermutator(components, FUNCTIONS, canonical=True)
+
+        self.assertEqual(sorted(set(network_values(full))), sorted(set(network_values(canonical))))
+        self.assertLess(canonical.permutation_count, full.permutation_count)
+        self.assertEqual(len(canonical.as_array()), canonical.permutation_count)
+
+    def test_permutation_count_matches_enumeration(self):
+        # Equal values in the inventory, and runs of the same chaining function
+        for values in (VALUES, (100, 100, 220, 470, 470)):
+            inventory = ComponentPermutator(values, 0.01)
+            for length, functions in ((1, FUNCTIONS), (2, FUNCTIONS), (3, FUNCTIONS), (4, FUNCTIONS * 2)):
+                with self.subTest(values=values, length=length):
+                    permutator = ChainPermutator([inventory] * length, functions, canonical=True)
+                    self.assertEqual(permutator.permutation_count, sum(1 for _ in permutator))
+
+    def test_canonical_search_finds_the_best_networks(self):
+        inventory = ComponentPermutator(VALUES, 0.01)
+        results = []
+        for canonical in (False, True):
+            vf = ValueFilter(
+                333, [ChainPermutator([inventory, inventory], FUNCTIONS, canonical=canonical)],
+                lambda r: r, [], 5, duplicate_tolerance=1e-9
+            )
+            vf.populate_results()
+            results.append([round(float(value), 9) for _, value, _ in vf.results.items()])
+        self.assertEqual(results[0], results[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import itertools
+import unittest
+
+import numpy as np
+
+from ECPF.components import iComponent, Component, ChainPermutation
+from ECPF.component_config_functs import monotonic, find_monotonicity, CONFIGURATIONS, ResistorConfiguration
+
+PARTS = (Component(100, 0.05), Component(470, 0.01), Component(2200, 0.1), Component(33, 0.02))
+
+
+def corner_min_max(chain):
+    """
+    The extremes of a chain over every combination of the extremes of its values
+    """
+    values = []
+    for corner in itertools.product(*[(v.min_val, v.max_val) for v in chain.chain_vals]):
+        value = corner[0]
+        for v, f in zip(corner[1:], chain.chain_functions):
+            value = f(value, v)
+        values.append(value)
+    return min(values), max(values)
+
+
+class ConstantSampler(iComponent):
+    __slots__ = ("calls",)
+
+    def __init__(self):
+        self.calls = 0
+
+    def sample(self) -> float:
+        self.calls += 1
+        return float(self.calls)
+
+
+class TestSampleMany(unittest.TestCase):
+
+    def test_component_samples_lie_within_tolerance(self):
+        component = Component(1000, 0.05)
+        samples = component.sample_many(10000, np.random.default_rng(1))
+        self.assertEqual(samples.shape, (10000,))
+        self.assertEqual(samples.dtype, np.float64)
+        self.assertGreaterEqual(samples.min(), component.min_val)
+        self.assertLessEqual(samples.max(), component.max_val)
+        self.assertAlmostEqual(samples.mean(), 1000, delta=1)
+
+    def test_seeded_samples_are_reproducible(self):
+        chain = ChainPermutation(PARTS[:3], (ResistorConfiguration.series, ResistorConfiguration.parallel))
+        first = chain.sample_many(100, np.random.default_rng(7))
+        np.testing.assert_array_equal(chain.sample_many(100, np.random.default_rng(7)), first)
+        self.assertFalse(np.array_equal(chain.sample_many(100, np.random.default_rng(8)), first))
+
+    def test_chain_samples_lie_within_its_bounds(self):
+        chain = ChainPermutation(PARTS[:3], (ResistorConfiguration.parallel, ResistorConfiguration.series))
+        samples = chain.sample_many(10000, np.random.default_rng(2))
+        self.assertGreaterEqual(samples.min(), chain.min_val)
+        self.assertLessEqual(samples.max(), chain.max_val)
+
+    def test_default_calls_sample(self):
+        component = ConstantSampler()
+        np.testing.assert_array_equal(component.sample_many(4), [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(component.calls, 4)
+
+
+class TestDeclaredMonotonicity(unittest.TestCase):
+
+    def test_configuration_functions_are_declared(self):
+        for configuration in CONFIGURATIONS:
+            for function in (configuration.series, configuration.parallel):
+                with self.subTest(configuration=configuration.__name__, function=function.__name__):
+                    self.assertEqual(find_monotonicity(function), (1, 1))
+
+    def test_declared_bounds_match_every_corner(self):
+        for configuration in CONFIGURATIONS:
+            functions = (configuration.series, configuration.parallel)
+            for length in (2, 3, 4):
+                for chain_functions in itertools.product(functions, repeat=length - 1):
+                    chain = ChainPermutation(PARTS[:length], chain_functions)
+                    with self.subTest(configuration=configuration.__name__,
+                                      functions=[f.__name__ for f in chain_functions]):
+                        low, high = corner_min_max(chain)
+                        self.assertAlmostEqual(chain.min_val, low)
+                        self.assertAlmostEqual(chain.max_val, high)
+
+    def test_decreasing_declarations(self):
+        @monotonic(1, -1)
+        def difference(v1, v2):
+            return v1 - v2
+
+        chain = ChainPermutation(PARTS[1:3], (difference,))
+        self.assertEqual((chain.min_val, chain.max_val), corner_min_max(chain))
+        self.assertEqual(chain.min_val, PARTS[1].min_val - PARTS[2].max_val)
+
+    def test_undeclared_functions_use_every_corner(self):
+        def distance(v1, v2):
+            return abs(v1 - v2)
+
+        self.assertIsNone(find_monotonicity(distance))
+        chain = ChainPermutation((Component(100, 0.1), Component(100, 0.1)), (distance,))
+        self.assertEqual(chain.min_val, 0.0)
+        self.assertAlmostEqual(chain.max_val, 20.0)
+
+    def test_invalid_directions_are_rejected(self):
+        with self.assertRaises(ValueError):
+            monotonic(1, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import pickle
+import unittest
+
+import numpy as np
+
+from ECPF.components import Component
+from ECPF.expression import Expression
+from ECPF.interval import Interval
+
+
+class TestExpression(unittest.TestCase):
+
+    def test_variables_are_sorted_unless_declared(self):
+        self.assertEqual(Expression("rb / (ra + rb)").variables, ("ra", "rb"))
+        self.assertEqual(Expression("ra / (ra + rb)").variables, ("ra", "rb"))
+        self.assertAlmostEqual(Expression("rb / (ra + rb)")(1000, 3000), 0.75)
+
+        declared = Expression("rb / (ra + rb)", variables=("rb", "ra"))
+        self.assertEqual(declared.variables, ("rb", "ra"))
+        self.assertAlmostEqual(declared(1000, 3000), 0.25)
+
+    def test_undeclared_variables_are_rejected(self):
+        with self.assertRaises(ValueError):
+            Expression("ra / (ra + rb)", variables=("ra",))
+
+    def test_scalar_calls(self):
+        expression = Expression("0.8 * (r1 + r2) / r2 + sqrt(r1) - abs(-r2) / 1000")
+        expected = 0.8 * (100 + 300) / 300 + 10 - 0.3
+        self.assertAlmostEqual(expression(100.0, 300.0), expected)
+        self.assertAlmostEqual(expression(Component(100, 0.05), Component(300, 0.05)), expected)
+        self.assertIsInstance(expression(100, 300), float)
+
+    def test_array_calls(self):
+        expression = Expression("exp(a) * log(b) + a ** 2")
+        a, b = np.array([0.0, 1.0, 2.0]), np.array([1.0, 10.0, 100.0])
+        np.testing.assert_allclose(expression(a, b), np.exp(a) * np.log(b) + a ** 2)
+
+    def test_interval_calls(self):
+        expression = Expression("a / (a + b)")
+        bounds = expression.bounds((100, 200), (300, 400))
+        self.assertLessEqual(bounds[0], 100 / 500)
+        self.assertGreaterEqual(bounds[1], 200 / 500)
+
+        result = expression(Interval(100, 200), Interval(300, 400))
+        self.assertIsInstance(result, Interval)
+        self.assertEqual(result.bounds(), bounds)
+
+    def test_derivatives(self):
+        expression = Expression("a ** 3 / b + exp(2 * a)")
+        self.assertAlmostEqual(expression.derivative("a")(2.0, 4.0), 3 * 4 / 4 + 2 * np.exp(4.0))
+        self.assertAlmostEqual(expression.derivative("b")(2.0, 4.0), -8 / 16)
+        with self.assertRaises(ValueError):
+            expression.derivative("c")
+
+    def test_monotonicity(self):
+        feedback = Expression("1.25 * (1 + top / bottom)", variables=("top", "bottom"))
+        self.assertEqual(feedback.monotonicity((100, 1000), (100, 1000)), (1, -1))
+        self.assertEqual(Expression("2 * a + 0 * b").monotonicity((1, 2), (1, 2)), (1, 0))
+
+        # (a - b) ** 2 falls then rises with a over a box where a - b changes sign
+        squared = Expression("(a - b) ** 2")
+        self.assertIsNone(squared.monotonicity((100, 1000), (100, 1000)))
+        self.assertEqual(squared.monotonicity((2000, 3000), (100, 1000)), (1, -1))
+
+    def test_disallowed_syntax_is_rejected(self):
+        for source in ("__import__('os')", "a.real", "a[0]", "a if b else 1", "a < b", "open(a)",
+                       "sqrt(a, b)", "sqrt(x=a)", "lambda a: a", "'text'", "_float(a)", "a +"):
+            with self.subTest(source):
+                with self.assertRaises(ValueError):
+                    Expression(source)
+
+    def test_pickles_as_its_source(self):
+        expression = Expression("rb / (ra + rb)", variables=("rb", "ra"))
+        copied = pickle.loads(pickle.dumps(expression))
+        self.assertEqual(copied.variables, ("rb", "ra"))
+        self.assertEqual(copied(1000, 3000), expression(1000, 3000))
+
+
+if __name__ == "__main__":
+    unittest.main()
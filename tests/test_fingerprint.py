@@ -0,0 +1,116 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from ECPF.fingerprint import problem_fingerprint, FingerprintError
+from ECPF.value_filter import ValueFilter
+from ECPF.value_permutator import ComponentPermutator
+from ECPF.result_cache import ResultCache
+
+INVENTORY = ComponentPermutator((100, 220, 470, 1000), 0.01)
+
+
+def namespace_function(source, **namespace):
+    """
+    Define the function calc of source in a fresh module namespace holding namespace
+    """
+    exec(source, namespace)
+    return namespace["calc"], namespace
+
+
+class TestProblemFingerprint(unittest.TestCase):
+
+    def fingerprint(self, function):
+        return problem_fingerprint(1.0, [INVENTORY], function, [])
+
+    def test_helpers_are_described(self):
+        calc, namespace = namespace_function(
+            "def helper(x):\n    return x * 2\n"
+            "def calc(a):\n    return helper(float(a))\n"
+        )
+        before = self.fingerprint(calc)
+        exec("def helper(x):\n    return x * 3\n", namespace)
+        self.assertNotEqual(before, self.fingerprint(calc))
+
+    def test_containers_and_nested_functions_are_described(self):
+        calc, namespace = namespace_function(
+            "def calc(a):\n    return (lambda v: v * TABLE['gain'])(float(a))\n", TABLE={"gain": 2.0}
+        )
+        before = self.fingerprint(calc)
+        self.assertEqual(before, self.fingerprint(calc))
+        namespace["TABLE"]["gain"] = 3.0
+        self.assertNotEqual(before, self.fingerprint(calc))
+
+    def test_lambdas_on_one_line(self):
+        top_ratio, bottom_ratio = lambda a, b: a / (a + b), lambda a, b: b / (a + b)
+        self.assertNotEqual(
+            problem_fingerprint(0.3, [INVENTORY, INVENTORY], top_ratio, []),
+            problem_fingerprint(0.3, [INVENTORY, INVENTORY], bottom_ratio, [])
+        )
+
+    def test_recursive_functions(self):
+        calc, _ = namespace_function("def calc(a, depth=2):\n    return float(a) if depth == 0 else calc(a, depth - 1)\n")
+        self.assertEqual(self.fingerprint(calc), self.fingerprint(calc))
+
+    def test_undescribable_values_are_refused(self):
+        calc, _ = namespace_function("def calc(a):\n    return float(a) if LOCK else 0.0\n", LOCK=threading.Lock())
+        with self.assertRaises(FingerprintError):
+            self.fingerprint(calc)
+
+
+class TestResultCacheKeys(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def search(self, calculation_function, monotonicity=None, target=0.5, **options):
+        vf = ValueFilter(target, [INVENTORY, INVENTORY], calculation_function, [], 3,
+                         monotonicity=monotonicity, result_cache=self.cache)
+        vf.populate_results(**options)
+        return vf
+
+    def test_monotonicity_and_search_mode_are_part_of_the_key(self):
+        ratio = lambda a, b: float(a) / (float(a) + float(b))
+        self.search(ratio, monotonicity=(1, -1), branch_and_bound=True)
+        self.search(ratio, monotonicity=(-1, 1), branch_and_bound=True)
+        self.search(ratio, monotonicity=(1, -1))
+        self.assertEqual(self.cache.hits, 0)
+        self.assertEqual(self.cache.misses, 3)
+
+        self.search(ratio, monotonicity=(1, -1), branch_and_bound=True)
+        self.assertEqual(self.cache.hits, 1)
+
+    def test_lambdas_on_one_line_are_cached_apart(self):
+        top_ratio, bottom_ratio = (lambda a, b: float(a) / (float(a) + float(b)),
+                                   lambda a, b: float(b) / (float(a) + float(b)))
+        top = self.search(top_ratio, target=0.3)
+        bottom = self.search(bottom_ratio, target=0.3)
+        self.assertEqual(self.cache.hits, 0)
+        self.assertGreater(bottom.permutations_evaluated, 0)
+        self.assertNotEqual([[float(c) for c in p] for _, _, p in top.results.items()],
+                            [[float(c) for c in p] for _, _, p in bottom.results.items()])
+
+    def test_undescribable_problems_are_not_cached(self):
+        calc, _ = namespace_function(
+            "def calc(a, b):\n    return float(a) / float(b) if LOCK else 0.0\n", LOCK=threading.Lock()
+        )
+        vf = self.search(calc)
+        self.assertEqual(len(vf.results), 3)
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+    def test_undescribable_problems_are_not_checkpointed(self):
+        calc, _ = namespace_function(
+            "def calc(a, b):\n    return float(a) / float(b) if LOCK else 0.0\n", LOCK=threading.Lock()
+        )
+        vf = ValueFilter(0.5, [INVENTORY, INVENTORY], calc, [], 3)
+        with self.assertRaises(FingerprintError):
+            vf.populate_results(checkpoint_path=os.path.join(self.directory.name, "checkpoint.json"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import itertools
+import unittest
+
+from ECPF.index_space import MixedRadix, LazyProduct
+from ECPF.value_permutator import ComponentPermutator, ChainPermutator
+from ECPF.component_config_functs import ResistorConfiguration
+
+INVENTORY = ComponentPermutator((100, 220, 470, 1000), 0.01)
+FUNCTIONS = (ResistorConfiguration.series, ResistorConfiguration.parallel)
+
+
+def describe(permutation):
+    return [(float(c), c.min_val, c.max_val) for c in permutation]
+
+
+class TestMixedRadix(unittest.TestCase):
+
+    def test_numbering_follows_itertools_product(self):
+        space = MixedRadix((3, 1, 4, 2))
+        expected = list(itertools.product(range(3), range(1), range(4), range(2)))
+        self.assertEqual(len(space), len(expected))
+        self.assertEqual([space.decode(i) for i in range(len(space))], expected)
+        self.assertEqual([space.encode(indices) for indices in expected], list(range(len(space))))
+        self.assertEqual(list(space.indices()), expected)
+        self.assertEqual(list(space.indices(5, 17)), expected[5:17])
+        self.assertEqual(list(space.indices(20, 100)), expected[20:])
+
+    def test_out_of_range_indices(self):
+        space = MixedRadix((2, 3))
+        for index in (-1, 6):
+            with self.assertRaises(IndexError):
+                space.decode(index)
+        self.assertEqual(list(space.indices(6)), [])
+
+    def test_empty_spaces(self):
+        self.assertEqual(len(MixedRadix(())), 1)
+        self.assertEqual(list(MixedRadix(()).indices()), [()])
+        self.assertEqual(len(MixedRadix((3, 0, 2))), 0)
+        self.assertEqual(list(MixedRadix((3, 0, 2)).indices()), [])
+
+    def test_shards_cover_every_index_once(self):
+        space = MixedRadix((5, 7))
+        for count in (1, 2, 3, 34, 35, 50):
+            shards = space.shards(count)
+            self.assertEqual([i for start, stop in shards for i in range(start, stop)], list(range(35)))
+
+
+class TestLazyProduct(unittest.TestCase):
+
+    def test_matches_itertools_product(self):
+        value_iterators = [ChainPermutator([INVENTORY, INVENTORY], FUNCTIONS), INVENTORY, [INVENTORY.at(1)]]
+        expected = [describe(p) for p in itertools.product(*value_iterators)]
+        product = LazyProduct(value_iterators)
+
+        self.assertEqual(len(product), len(expected))
+        self.assertEqual([describe(p) for p in product], expected)
+        self.assertEqual([describe(product[i]) for i in range(len(product))], expected)
+        for start, stop in ((0, 1), (3, 11), (5, 100), (len(expected) - 1, None)):
+            with self.subTest(start=start, stop=stop):
+                self.assertEqual([describe(p) for p in product.iterate(start, stop)], expected[start:stop])
+
+    def test_canonical_chains_are_indexed(self):
+        chains = ChainPermutator([INVENTORY, INVENTORY, INVENTORY], FUNCTIONS, canonical=True)
+        product = LazyProduct([chains, INVENTORY])
+        expected = [describe(p) for p in itertools.product(chains, INVENTORY)]
+        self.assertEqual(len(product), len(expected))
+        # Out of order, so the components are built from their index rather than read in order
+        indices = range(len(product) - 1, -1, -7)
+        self.assertEqual([describe(product[i]) for i in indices], [expected[i] for i in indices])
+
+    def test_out_of_range_index(self):
+        with self.assertRaises(IndexError):
+            LazyProduct([INVENTORY, INVENTORY])[16]
+
+
+if __name__ == "__main__":
+    unittest.main()
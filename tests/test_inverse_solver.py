@@ -0,0 +1,61 @@
+import unittest
+
+from ECPF.components import ChainPermutation
+from ECPF.component_config_functs import ResistorConfiguration
+from ECPF.value_filter import ValueFilter
+from ECPF.value_permutator import ComponentPermutator, ChainPermutator
+
+INVENTORY = ComponentPermutator((100, 150, 220, 330, 470, 680, 1000, 1500, 2200, 3300, 4700), 0.05)
+CHAINS = ChainPermutator([INVENTORY, INVENTORY], (ResistorConfiguration.series, ResistorConfiguration.parallel))
+
+
+def describe(component):
+    if isinstance(component, ChainPermutation):
+        return [describe(v) for v in component.chain_vals], [f.__name__ for f in component.chain_functions]
+    return float(component), component.min_val, component.max_val
+
+
+def described_results(vf):
+    return [(error, order, float(value), [describe(c) for c in perm])
+            for error, order, value, perm in vf.results.entries()]
+
+
+class TestInverseSolver(unittest.TestCase):
+
+    def search(self, calculation_function, value_iterators, filters=(), monotonicity=None, **options):
+        vf = ValueFilter(2.5, value_iterators, calculation_function, list(filters), 9, monotonicity=monotonicity)
+        vf.populate_results(**options)
+        return vf
+
+    def assert_same_as_scan(self, *arguments, **keywords):
+        inverse = self.search(*arguments, inverse_solve=True, **keywords)
+        scanned = self.search(*arguments, **keywords)
+        self.assertEqual(described_results(inverse), described_results(scanned))
+        self.assertEqual(inverse.total_permutations_tested, scanned.total_permutations_tested)
+        self.assertLess(inverse.permutations_evaluated, scanned.permutations_evaluated)
+
+    def test_decreasing_argument(self):
+        # The divider output decreases with the top resistor, the largest position
+        self.assert_same_as_scan(
+            lambda top, bottom: 5.0 * float(bottom) / (float(top) + float(bottom)), [CHAINS, INVENTORY],
+            monotonicity=(-1, 1)
+        )
+
+    def test_expression_with_filters(self):
+        self.assert_same_as_scan(
+            "1.25 * (1 + top / bottom)", [INVENTORY, CHAINS],
+            filters=[lambda top: float(top) >= 150, lambda top, bottom: float(top) < 10 * float(bottom)]
+        )
+
+    def test_non_monotonic_function_is_rejected(self):
+        with self.assertRaises(ValueError) as raised:
+            self.search("(a - b) ** 2 / 1000", [INVENTORY, INVENTORY], inverse_solve=True)
+        self.assertIn("monotonic", str(raised.exception))
+
+        # Without a declared monotonicity, a plain function is not known to be monotonic either
+        with self.assertRaises(ValueError):
+            self.search(lambda a, b: float(a) / float(b), [INVENTORY, INVENTORY], inverse_solve=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
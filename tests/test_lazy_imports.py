@@ -0,0 +1,31 @@
+import subprocess
+import sys
+import unittest
+
+# Modules that must not be imported as a side effect of importing the search modules
+LAZY_IMPORTS = ('matplotlib', 'numpy')
+
+
+def imported_lazy_modules(module_name):
+    """
+    Import a module in a fresh interpreter, and return the modules of LAZY_IMPORTS that it pulled in
+    """
+    probe = (
+        f"import sys, {module_name}\n"
+        f"print(','.join(m for m in {LAZY_IMPORTS!r} if m in sys.modules))"
+    )
+    output = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True).stdout
+    return [m for m in output.strip().split(',') if m]
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_value_filter(self):
+        self.assertEqual(imported_lazy_modules('ECPF.value_filter'), [])
+
+    def test_components(self):
+        self.assertEqual(imported_lazy_modules('ECPF.components'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from ECPF import network_index
+from ECPF.network_index import NetworkIndex
+from ECPF.component_config_functs import ResistorConfiguration
+from ECPF.value_filter import ValueFilter
+from ECPF.value_permutator import ComponentPermutator
+
+INVENTORY = (100, 150, 220, 330, 470, 680, 1000, 1500, 2200, 3300, 4700, 6800, 10000)
+
+
+class TestNetworkIndexArray(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.index = NetworkIndex.build(self.path, INVENTORY, ResistorConfiguration, 0.01)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_columns_match_networks(self):
+        array = self.index.as_array()
+        self.assertEqual(len(array), len(self.index))
+        for i in range(0, len(self.index), 11):
+            network = self.index.component_at(i)
+            self.assertEqual(array.nominal[i], float(network))
+            self.assertAlmostEqual(array.minimum[i], network.min_val)
+            self.assertAlmostEqual(array.maximum[i], network.max_val)
+
+            built = array.build(i)
+            self.assertEqual(built.chain_functions, network.chain_functions)
+            self.assertEqual([float(v) for v in built.chain_vals], [float(v) for v in network.chain_vals])
+
+    def test_vectorized_search_matches_scan(self):
+        divider = ComponentPermutator((1000, 2200, 4700), 0.01)
+
+        def search(**options):
+            vf = ValueFilter(3.3, [self.index, divider], lambda a, b: float(a) / float(b) * 1000, [], 8)
+            vf.populate_results(**options)
+            return [(error, float(value), [float(c) for c in perm]) for error, value, perm in vf.results.items()]
+
+        self.assertEqual(search(vectorized=True), search())
+
+
+class TestNetworkIndexBuild(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_chunked_build_matches_networks(self):
+        with mock.patch.object(network_index, "_CHUNK_SIZE", 100):
+            index = NetworkIndex.build(self.path, INVENTORY, ResistorConfiguration, 0.01)
+
+        # 1 part, 2 commutative functions of pairs, 2 of triples, 2 mixed functions commuting in their first pair
+        n = len(INVENTORY)
+        pairs, triples = n * (n + 1) // 2, n * (n + 1) * (n + 2) // 6
+        self.assertEqual(len(index), n + 2 * pairs + 2 * triples + 2 * pairs * n)
+
+        values = [float(v) for v in index.sorted_values]
+        self.assertEqual(values, sorted(values))
+        for i in range(0, len(index), 97):
+            self.assertAlmostEqual(float(index.component_at(i)), values[i])
+        self.assertEqual(sorted(os.listdir(self.path)),
+                         ["base_values.npy", "meta.json", "topology.npy", "values.npy"])
+
+    def test_failed_build_keeps_the_previous_index(self):
+        NetworkIndex.build(self.path, INVENTORY, ResistorConfiguration, 0.01, max_parts=2)
+
+        def failing(*arguments):
+            raise MemoryError
+
+        with mock.patch.object(network_index, "_enumerate_networks", failing):
+            with self.assertRaises(MemoryError):
+                NetworkIndex.build(self.path, INVENTORY, ResistorConfiguration, 0.01)
+
+        index = NetworkIndex(self.path)
+        self.assertEqual(len(index), len(INVENTORY) * (len(INVENTORY) + 2))
+        self.assertEqual(len(os.listdir(self.path)), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
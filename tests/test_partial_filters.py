@@ -0,0 +1,80 @@
+import itertools
+import unittest
+
+from ECPF.value_filter import ValueFilter
+from ECPF.value_permutator import ComponentPermutator
+from ECPF.partial_filters import PartialFilter, bind_filters, uses
+
+VALUES = (100, 150, 220, 330, 470, 680, 1000, 1500, 2200, 3300, 4700)
+
+
+def calculation(r1, r2, r3):
+    return 3.3 * (float(r1) + float(r2) / 2) / (float(r1) + float(r2) + float(r3))
+
+
+def brute_force(filters, number_of_results, target=1.8):
+    inventory = ComponentPermutator(VALUES, 0.05)
+    filters = bind_filters(filters, calculation, 3)
+    scored = []
+    for order, permutation in enumerate(itertools.product(inventory, repeat=3)):
+        if all(f(*permutation) for f in filters):
+            value = calculation(*permutation)
+            scored.append((abs((target - value) / target), order, value))
+    return sorted(scored)[:number_of_results]
+
+
+class TestBindFilters(unittest.TestCase):
+
+    def test_default_arguments_are_not_positions(self):
+        # The default argument capture idiom of full filters
+        full = lambda r1, r2, r3, lim=5000: float(r1) + float(r2) + float(r3) >= lim
+        bound = bind_filters([full], calculation, 3)
+        self.assertIs(bound[0], full)
+
+        partial = lambda r1, lim=500: float(r1) < lim
+        bound = bind_filters([partial], calculation, 3)
+        self.assertIsInstance(bound[0], PartialFilter)
+        self.assertEqual(bound[0].positions, (0,))
+
+    def test_unknown_parameter_names_are_rejected(self):
+        with self.assertRaises(ValueError):
+            bind_filters([lambda x: True], calculation, 3)
+
+
+class TestPartialFilterSearch(unittest.TestCase):
+
+    def search(self, filters, number_of_results=15, **options):
+        inventory = ComponentPermutator(VALUES, 0.05)
+        vf = ValueFilter(1.8, [inventory] * 3, calculation, filters, number_of_results)
+        vf.populate_results(**options)
+        return vf
+
+    def test_matches_brute_force(self):
+        filters = [
+            lambda r1, r2, r3, lim=2000: float(r1) + float(r2) + float(r3) >= lim,
+            lambda r1: float(r1) > 150,
+            uses(1)(lambda r: float(r) < 2000),
+        ]
+        expected = brute_force(filters, 15)
+        vf = self.search(filters)
+        # Ties are kept in the order of the product
+        self.assertEqual([(e, o, v) for e, o, v, _ in vf.results.entries()], expected)
+
+        # Every permutation is counted, whether its filters failed early or not
+        self.assertEqual(vf.total_permutations_tested, len(VALUES) ** 3)
+        bound = bind_filters(filters, calculation, 3)
+        passed = sum(1 for p in itertools.product(ComponentPermutator(VALUES, 0.05), repeat=3)
+                     if all(f(*p) for f in bound))
+        self.assertEqual(vf.total_permutations_tested - vf.permutations_filtered, passed)
+
+    def test_adaptive_filters_match_declared_order(self):
+        filters = [lambda r1: float(r1) > 150, lambda r3: float(r3) < 3000]
+        declared = self.search(filters)
+        adaptive = self.search(filters, adaptive_filters=True)
+        self.assertEqual(
+            [(e, v) for e, v, _ in declared.results.items()], [(e, v) for e, v, _ in adaptive.results.items()]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import itertools
+import unittest
+
+from ECPF.value_filter import ValueFilter
+from ECPF.value_permutator import ComponentPermutator
+from ECPF.profiling import SearchProfile
+
+INVENTORY = ComponentPermutator((100, 150, 220, 330, 470, 680, 1000, 1500, 2200, 3300, 4700), 0.05)
+
+
+def calculation(a, b, c):
+    return 3.3 * (float(a) + float(b) / 2) / (float(a) + float(b) + float(c))
+
+
+FILTERS = [
+    lambda a, b, c: float(a) + float(b) + float(c) >= 2000,
+    lambda a, b, c: float(a) < float(c) * 5,
+]
+
+
+class TestSearchProfile(unittest.TestCase):
+
+    def search(self, profile, **options):
+        vf = ValueFilter(1.8, [INVENTORY] * 3, calculation, list(FILTERS), 10, profile=profile)
+        vf.populate_results(use_bisect=False, **options)
+        return vf
+
+    def expected_filter_counts(self):
+        calls, rejections = [0] * len(FILTERS), [0] * len(FILTERS)
+        for permutation in itertools.product(INVENTORY, repeat=3):
+            for i, f in enumerate(FILTERS):
+                calls[i] += 1
+                if not f(*permutation):
+                    rejections[i] += 1
+                    break
+        return calls, rejections
+
+    def test_scan_counts(self):
+        profile = SearchProfile(timing_interval=7)
+        vf = self.search(profile)
+        plain = self.search(None)
+        self.assertEqual([(e, v) for e, v, _ in vf.results.items()], [(e, v) for e, v, _ in plain.results.items()])
+
+        calls, rejections = self.expected_filter_counts()
+        self.assertEqual([f.calls for f in profile.filters], calls)
+        self.assertEqual([f.rejections for f in profile.filters], rejections)
+        self.assertEqual(profile.calculations, vf.total_permutations_tested - vf.permutations_filtered)
+        self.assertEqual(profile.insertions + profile.rejections, profile.calculations)
+        self.assertTrue(all(seconds >= 0.0 for seconds in profile.stage_seconds.values()))
+
+    def test_wrapped_search_counts(self):
+        profile = SearchProfile()
+        self.search(profile, vectorized=True)
+        calls, rejections = self.expected_filter_counts()
+        self.assertEqual([f.calls for f in profile.filters], calls)
+        self.assertEqual([f.rejections for f in profile.filters], rejections)
+
+    def test_memory_peaks(self):
+        profile = SearchProfile()
+        self.search(profile)
+        self.assertIsNone(profile.peak_memory_bytes)
+
+        traced = SearchProfile(trace_memory=True)
+        self.search(traced)
+        self.assertGreater(traced.peak_memory_bytes, 0)
+        if traced.process_peak_memory_bytes is not None:
+            self.assertGreaterEqual(traced.process_peak_memory_bytes, traced.peak_memory_bytes)
+        self.assertIn("process_peak_memory_bytes", traced.to_dict())
+
+
+if __name__ == '__main__':
+    unittest.main()
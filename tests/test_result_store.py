@@ -0,0 +1,102 @@
+import math
+import random
+import unittest
+
+from ECPF.result_store import TopKResults
+from ECPF.value_filter import ValueFilter
+from ECPF.value_permutator import ComponentPermutator
+
+
+class TestTopKResults(unittest.TestCase):
+
+    def test_keeps_the_best_results_sorted(self):
+        errors = [0.5, 0.1, 0.9, 0.3, 0.05, 0.7, 0.2]
+        results = TopKResults(3)
+        for i, error in enumerate(errors):
+            results.add((i,), 1.0 + error, error)
+        self.assertEqual(len(results), 3)
+        self.assertEqual([e for e, _, _ in results.items()], [0.05, 0.1, 0.2])
+        self.assertEqual(list(results), [(4,), (1,), (6,)])
+        self.assertEqual(results.worst_error, 0.2)
+
+    def test_accepts(self):
+        results = TopKResults(2)
+        self.assertEqual(results.worst_error, math.inf)
+        self.assertTrue(results.accepts(10.0))
+        results.add(("a",), 1.0, 0.2)
+        results.add(("b",), 1.0, 0.4)
+        self.assertTrue(results.is_full)
+        self.assertTrue(results.accepts(0.3))
+        self.assertFalse(results.accepts(0.4))
+        self.assertFalse(results.accepts(float("nan")))
+        self.assertFalse(results.add(("c",), 1.0, 0.5))
+        self.assertEqual(list(results), [("a",), ("b",)])
+
+    def test_equal_errors_keep_the_earliest_results(self):
+        results = TopKResults(2)
+        for name in "abc":
+            results.add((name,), 1.0, 0.1)
+        self.assertEqual(list(results), [("a",), ("b",)])
+
+        # An explicit order places a result before results added earlier
+        self.assertTrue(results.add(("d",), 1.0, 0.1, order=-1))
+        self.assertEqual([(order, p) for _, order, _, p in results.entries()], [(-1, ("d",)), (0, ("a",))])
+
+    def test_no_results(self):
+        results = TopKResults(0)
+        self.assertFalse(results.add(("a",), 1.0, 0.0))
+        self.assertEqual(results.worst_error, -math.inf)
+        self.assertEqual(results.items(), [])
+
+    def test_clear(self):
+        results = TopKResults(2, duplicate_tolerance=0.01)
+        results.add(("a",), 1.0, 0.1)
+        results.clear()
+        self.assertEqual(len(results), 0)
+        self.assertTrue(results.add(("b",), 1.0, 0.2))
+        self.assertEqual(results.entries(), [(0.2, 0, 1.0, ("b",))])
+
+
+class TestDuplicateTolerance(unittest.TestCase):
+
+    def test_zero_tolerance_collapses_equal_values_only(self):
+        results = TopKResults(5, duplicate_tolerance=0.0)
+        self.assertTrue(results.add(("a",), 1.0, 0.1, order=0))
+        self.assertFalse(results.add(("b",), 1.0, 0.1, order=1))
+        self.assertTrue(results.add(("c",), 1.0 + 1e-12, 0.1, order=2))
+        self.assertTrue(results.add(("d",), 1.0, 0.05, order=3))
+        self.assertEqual([p for _, _, p in results.items()], [("d",), ("c",)])
+
+    def test_zero_tolerance_search(self):
+        inventory = ComponentPermutator((100, 200, 1000, 2000), 0.01)
+        vf = ValueFilter(0.5, [inventory, inventory], lambda a, b: float(a) / float(b), [], 10,
+                         duplicate_tolerance=0.0)
+        vf.populate_results()
+        values = [float(value) for _, value, _ in vf.results.items()]
+        self.assertEqual(len(values), len(set(values)))
+        self.assertEqual(values[0], 0.5)
+
+    def test_order_does_not_change_the_results(self):
+        # Pairs of duplicates, with the better of every pair sometimes added after results it evicts
+        candidates = [((i, copy), 1.0 + i * 0.1 + copy * 1e-4, abs(i - 4.5) + copy * 0.01)
+                      for i in range(10) for copy in range(2)]
+        expected = None
+        for seed in range(20):
+            random.Random(seed).shuffle(candidates)
+            results = TopKResults(5, duplicate_tolerance=0.001)
+            for permutation, value, error in candidates:
+                results.add(permutation, value, error, order=permutation[0] * 2 + permutation[1])
+            kept = [p for _, _, p in results.items()]
+            self.assertEqual(len(kept), 5)
+            if expected is None:
+                expected = kept
+            self.assertEqual(kept, expected)
+        self.assertEqual(sorted(expected), [(2, 0), (3, 0), (4, 0), (5, 0), (6, 0)])
+
+    def test_negative_tolerance_is_rejected(self):
+        with self.assertRaises(ValueError):
+            ValueFilter(1.0, [ComponentPermutator((1,))], lambda a: a, [], 1, duplicate_tolerance=-0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,261 @@
+import itertools
+import math
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from ECPF.batch import solve_batch, populate_results_batch
+from ECPF.checkpoint import SearchCheckpoint
+from ECPF.components import Component, ChainPermutation
+from ECPF.component_array import ComponentView
+from ECPF.component_config_functs import ResistorConfiguration
+from ECPF.result_cache import ResultCache
+from ECPF.result_store import value_bin
+from ECPF.value_filter import ValueFilter
+from ECPF.value_permutator import ComponentPermutator, ChainPermutator
+
+INVENTORY = ComponentPermutator((100, 150, 220, 330, 470, 680, 1000, 1500, 2200, 3300, 4700), 0.05)
+CHAINS = ChainPermutator([INVENTORY, INVENTORY], (ResistorConfiguration.series, ResistorConfiguration.parallel))
+TARGET = 1.1
+NUMBER_OF_RESULTS = 12
+
+
+def calculation(a, b, c):
+    return 3.3 * b / (a + b) * (1 + c / 10000)
+
+
+def scalar_calculation(a, b, c):
+    return calculation(float(a), float(b), float(c))
+
+
+def filter_sum(a, b, c):
+    return float(a) + float(b) >= 500
+
+
+def describe(component):
+    if isinstance(component, ChainPermutation):
+        return [describe(v) for v in component.chain_vals], [f.__name__ for f in component.chain_functions]
+    return type(component).__name__, float(component), component.min_val, component.max_val
+
+
+def described_results(vf):
+    return [(error, order, float(value), [describe(c) for c in perm])
+            for error, order, value, perm in vf.results.entries()]
+
+
+def brute_force(value_iterators, calculation_function, filters, target, number_of_results,
+                duplicate_tolerance=None):
+    """
+    The (error, flat index, value, permutation) of the best permutations of the product, ties in product order,
+    keeping only the best permutation of every bin of duplicate values when duplicate_tolerance is given
+    """
+    scored = []
+    for order, permutation in enumerate(itertools.product(*value_iterators)):
+        if all(f(*permutation) for f in filters):
+            value = calculation_function(*permutation)
+            scored.append((math.fabs((target - float(value)) / target), order, float(value),
+                           [describe(c) for c in permutation]))
+    scored.sort(key=lambda entry: (entry[0], entry[1]))
+    if duplicate_tolerance is not None:
+        bins = set()
+        distinct = []
+        for entry in scored:
+            key = value_bin(entry[2], duplicate_tolerance)
+            if key is None or key not in bins:
+                bins.add(key)
+                distinct.append(entry)
+        scored = distinct
+    return scored[:number_of_results]
+
+
+def new_filter(**keywords):
+    return ValueFilter(TARGET, [CHAINS, INVENTORY, INVENTORY], scalar_calculation, [filter_sum], NUMBER_OF_RESULTS,
+                       monotonicity=(-1, 1, 1), **keywords)
+
+
+EXPECTED = brute_force([CHAINS, INVENTORY, INVENTORY], scalar_calculation, [filter_sum], TARGET, NUMBER_OF_RESULTS)
+
+
+class TestSearchModes(unittest.TestCase):
+    """
+    Every search mode keeps the results of a brute force scan of the product, with ties in the order of the product
+    """
+
+    def search(self, **options):
+        vf = new_filter()
+        if options.pop("anytime", False):
+            for _ in vf.iter_improving_results(**options):
+                pass
+        else:
+            vf.populate_results(**options)
+        return vf
+
+    def assert_brute_force_results(self, **options):
+        vf = self.search(**options)
+        self.assertEqual(described_results(vf), EXPECTED)
+        for _, _, _, permutation in vf.results.entries():
+            for component in permutation:
+                self.assertNotIsInstance(component, ComponentView)
+                self.assertIsInstance(component, (Component, ChainPermutation))
+        return vf
+
+    def test_scan(self):
+        vf = self.assert_brute_force_results()
+        self.assertEqual(vf.total_permutations_tested, CHAINS.permutation_count * INVENTORY.permutation_count ** 2)
+
+    def test_vectorized(self):
+        self.assert_brute_force_results(vectorized=True, block_size=1000)
+
+    def test_parallel(self):
+        self.assert_brute_force_results(workers=2, block_size=1000)
+
+    def test_branch_and_bound(self):
+        self.assert_brute_force_results(branch_and_bound=True)
+
+    def test_inverse(self):
+        self.assert_brute_force_results(inverse_solve=True)
+
+    def test_anytime(self):
+        vf = self.assert_brute_force_results(anytime=True, max_evaluations=10 ** 9)
+        self.assertTrue(vf.search_complete)
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "search.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_resumed_search_matches_brute_force(self):
+        process_permutation = ValueFilter.process_permutation
+        calls = itertools.count()
+
+        def interrupted(vf, *arguments):
+            if next(calls) == 5000:
+                raise KeyboardInterrupt
+            return process_permutation(vf, *arguments)
+
+        with mock.patch.object(ValueFilter, "process_permutation", interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                new_filter().populate_results(checkpoint_path=self.path, checkpoint_interval=0.0)
+
+        # The search stopped part way through the product
+        checkpoint = SearchCheckpoint.load(self.path)
+        self.assertLess(0, checkpoint.next_index)
+        self.assertLess(checkpoint.next_index, new_filter().permutation_count)
+
+        vf = new_filter()
+        vf.populate_results(checkpoint_path=self.path, checkpoint_interval=0.0, resume_from=self.path)
+        self.assertEqual(described_results(vf), EXPECTED)
+
+        complete = new_filter()
+        complete.populate_results()
+        self.assertEqual(vf.total_permutations_tested, complete.total_permutations_tested)
+        self.assertEqual(vf.permutations_filtered, complete.permutations_filtered)
+
+
+class TestResultCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_cached_results_match_brute_force(self):
+        cache = ResultCache(self.directory)
+        searched = new_filter(result_cache=cache)
+        searched.populate_results()
+        self.assertGreater(searched.permutations_evaluated, 0)
+
+        # Answered from the cache by another ValueFilter, without evaluating anything
+        cached = new_filter(result_cache=ResultCache(self.directory))
+        cached.populate_results()
+        self.assertEqual(cached.permutations_evaluated, 0)
+        self.assertEqual(described_results(cached), EXPECTED)
+        self.assertEqual(cached.total_permutations_tested, searched.total_permutations_tested)
+
+        fewer = ValueFilter(TARGET, [CHAINS, INVENTORY, INVENTORY], scalar_calculation, [filter_sum], 5,
+                            monotonicity=(-1, 1, 1), result_cache=cache)
+        fewer.populate_results()
+        self.assertEqual(fewer.permutations_evaluated, 0)
+        self.assertEqual(described_results(fewer), EXPECTED[:5])
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_product_searches_match_brute_force(self):
+        jobs = [(0.55, lambda ra, rb: ra / (ra + rb)), (2.9, lambda ra, rb: (6 * ra / (ra + rb) - 1) / 0.4)]
+        value_filters = solve_batch([INVENTORY, INVENTORY], jobs, 10)
+
+        for (target, function), vf in zip(jobs, value_filters):
+            expected = brute_force([INVENTORY, INVENTORY], lambda a, b: function(float(a), float(b)), [],
+                                   target, 10)
+            self.assertEqual(described_results(vf), expected)
+
+    def test_bisect_and_product_searches_match_brute_force(self):
+        def identity(network):
+            return network
+
+        def doubled(network):
+            return 2 * network
+
+        value_filters = [
+            ValueFilter(1234.0, [CHAINS], identity, [], 8),
+            ValueFilter(1234.0, [CHAINS], doubled, [], 8),
+        ]
+        populate_results_batch(value_filters, block_size=100)
+
+        self.assertEqual(described_results(value_filters[0]), brute_force([CHAINS], identity, [], 1234.0, 8))
+        self.assertEqual(described_results(value_filters[1]),
+                         brute_force([CHAINS], lambda n: 2 * float(n), [], 1234.0, 8))
+
+
+class TestDuplicateTolerance(unittest.TestCase):
+    """
+    Every search mode keeps the best permutation of the same bins of duplicate values
+    """
+
+    VALUES = ComponentPermutator((100, 120, 150, 180, 220, 270, 330, 390, 470, 560, 680, 820, 1000), 0.05)
+
+    def search(self, duplicate_tolerance, **options):
+        vf = ValueFilter(0.45, [self.VALUES, self.VALUES], divider, [], 6, monotonicity=(-1, 1),
+                         duplicate_tolerance=duplicate_tolerance)
+        if options.pop("anytime", False):
+            for _ in vf.iter_improving_results(max_evaluations=10 ** 9):
+                pass
+        else:
+            vf.populate_results(**options)
+        return vf
+
+    def test_search_modes_match_brute_force(self):
+        for duplicate_tolerance in (0.0, 0.001, 0.02):
+            expected = brute_force([self.VALUES, self.VALUES], divider, [], 0.45, 6, duplicate_tolerance)
+            self.assertEqual(len(expected), 6)
+            for options in ({}, dict(vectorized=True, block_size=17), dict(workers=2, block_size=17),
+                            dict(branch_and_bound=True), dict(inverse_solve=True), dict(anytime=True)):
+                with self.subTest(duplicate_tolerance=duplicate_tolerance, **options):
+                    vf = self.search(duplicate_tolerance, **options)
+                    self.assertEqual(described_results(vf), expected)
+
+    def test_batch_matches_brute_force(self):
+        value_filters = [
+            ValueFilter(target, [self.VALUES, self.VALUES], divider, [], 6, duplicate_tolerance=0.02)
+            for target in (0.45, 0.3)
+        ]
+        populate_results_batch(value_filters, block_size=17)
+        for target, vf in zip((0.45, 0.3), value_filters):
+            self.assertEqual(described_results(vf), brute_force([self.VALUES, self.VALUES], divider, [], target, 6, 0.02))
+
+
+def divider(top, bottom):
+    return float(bottom) / (float(top) + float(bottom)) if isinstance(top, Component) else bottom / (top + bottom)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from ECPF.components import Component, ChainPermutation
+from ECPF.component_config_functs import ResistorConfiguration
+from ECPF.value_filter import ValueFilter
+from ECPF.value_permutator import ComponentPermutator, SeriesParallelPermutator
+
+INVENTORY = ComponentPermutator((100, 220, 470, 1000, 2200), 0.05)
+FUNCTIONS = (ResistorConfiguration.series, ResistorConfiguration.parallel)
+
+
+class TestSeriesParallelPermutator(unittest.TestCase):
+
+    def test_array_matches_networks(self):
+        permutator = SeriesParallelPermutator(INVENTORY, FUNCTIONS, max_parts=4)
+        array = permutator.as_array()
+        networks = list(permutator)
+        self.assertEqual(len(array), len(networks))
+        for i, network in enumerate(networks):
+            self.assertEqual(array.nominal[i], float(network))
+            self.assertEqual(array.minimum[i], network.min_val)
+            self.assertEqual(array.maximum[i], network.max_val)
+            self.assertIs(array.build(i), network)
+
+    def test_vectorized_search_matches_scan(self):
+        permutator = SeriesParallelPermutator(INVENTORY, FUNCTIONS, max_parts=3)
+
+        def search(**options):
+            vf = ValueFilter(5.0, [permutator, INVENTORY], lambda a, b: float(a) / float(b) * 10, [], 8)
+            vf.populate_results(**options)
+            return [(error, float(value), [float(c) for c in perm]) for error, value, perm in vf.results.items()]
+
+        self.assertEqual(search(vectorized=True), search())
+
+    def test_text_of_nested_network(self):
+        pair = ChainPermutation((Component(100, 0.0), Component(220, 0.0)), (ResistorConfiguration.parallel,))
+        network = ChainPermutation((Component(1000, 0.0), pair), (ResistorConfiguration.series,))
+        text = network.text_representation()
+        self.assertIn("(100.0 // 220.0)", text)
+        self.assertIn("1.0k", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+from ECPF.components import Component
+from ECPF.value_filter import ValueFilter
+from ECPF.value_permutator import ComponentPermutator
+
+INVENTORY = ComponentPermutator((1000, 2200, 4700), 0.05)
+
+
+class TestStats(unittest.TestCase):
+
+    def setUp(self):
+        self.vf = ValueFilter(1.0, [INVENTORY, INVENTORY], lambda a, b: a / (a + b) * 3.3, [], 5)
+        self.permutation = (Component(1000, 0.05), Component(2200, 0.05))
+
+    def test_streaming_stats_are_reproducible(self):
+        first = self.vf.get_stats_str(self.permutation, streaming=True, rng=42)
+        self.assertEqual(self.vf.get_stats_str(self.permutation, streaming=True, rng=42), first)
+        self.assertNotEqual(self.vf.get_stats_str(self.permutation, streaming=True, rng=43), first)
+
+    def test_buffered_stats(self):
+        samples = self.vf.generate_monte_carlo_distribution_samples(self.permutation, 1000, rng=1)
+        stat_data = self.vf.generate_stat_data(self.permutation, samples)
+        self.assertEqual(stat_data[2], 1000)
+        theoretical_min, theoretical_max = stat_data[:2]
+        for value in stat_data[6:]:
+            self.assertLessEqual(theoretical_min, value)
+            self.assertLessEqual(value, theoretical_max)
+        self.assertIn("q50:", self.vf.get_stats_str(self.permutation, samples))
+
+    def test_streaming_stats_match_buffered_stats(self):
+        buffered = self.vf.generate_stat_data(self.permutation, rng=1, n_samples=200000)
+        streamed = self.vf.generate_stat_data(self.permutation, rng=2, n_samples=200000, streaming=True,
+                                              chunk_size=10000)
+        self.assertEqual(streamed[:3], buffered[:3])
+        names = ("std", "variance", "skewness", "mean", "q25", "median", "q75")
+        for name, streamed_value, buffered_value in zip(names, streamed[3:], buffered[3:]):
+            with self.subTest(name):
+                if name == "skewness":
+                    # Close to 0, where the sampling noise of about sqrt(6 / n) outweighs a relative tolerance
+                    self.assertAlmostEqual(streamed_value, buffered_value, delta=0.02)
+                else:
+                    self.assertAlmostEqual(streamed_value, buffered_value, delta=abs(buffered_value) * 1e-2)
+
+    def test_moments_of_buffered_and_streamed_samples(self):
+        samples = self.vf.generate_monte_carlo_distribution_samples(self.permutation, 1000, rng=1)
+        stat_data = self.vf.generate_stat_data(self.permutation, samples)
+        moments = self.vf.generate_sample_moments(self.permutation, samples)
+        self.assertEqual(moments.count, 1000)
+        self.assertAlmostEqual(moments.standard_deviation, stat_data[3])
+        self.assertAlmostEqual(moments.skewness, stat_data[5])
+        self.assertAlmostEqual(moments.mean, stat_data[6])
+
+        # The samples of both components are uniform, so their ratio has a negative excess kurtosis
+        streamed = self.vf.generate_sample_moments(self.permutation, rng=1, n_samples=100000, chunk_size=10000)
+        self.assertEqual(streamed.count, 100000)
+        self.assertAlmostEqual(streamed.kurtosis, moments.kurtosis, delta=0.2)
+        self.assertLess(streamed.kurtosis, 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
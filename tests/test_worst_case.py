@@ -0,0 +1,60 @@
+import itertools
+import unittest
+
+from ECPF.component_config_functs import ResistorConfiguration
+from ECPF.expression import Expression
+from ECPF.value_filter import ValueFilter
+from ECPF.value_permutator import ComponentPermutator, ChainPermutator
+
+INVENTORY = ComponentPermutator((100, 220, 470, 1000, 2200), 0.05)
+CHAINS = ChainPermutator([INVENTORY, INVENTORY], (ResistorConfiguration.series, ResistorConfiguration.parallel))
+
+
+class TestWorstCase(unittest.TestCase):
+    """
+    The vectorized theoretical extremes and worst case errors match theoretical_min_max of every permutation
+    """
+
+    def assert_matches_theoretical_min_max(self, calculation_function, value_iterators, monotonicity=None):
+        vf = ValueFilter(0.4, value_iterators, calculation_function, [], 5, monotonicity=monotonicity)
+        permutations = list(itertools.product(*value_iterators))
+        minimums, maximums = vf.theoretical_min_max_many(permutations, block_size=7)
+        errors = vf.worst_case_errors(permutations)
+
+        self.assertEqual(len(minimums), len(permutations))
+        for permutation, minimum, maximum, error in zip(permutations, minimums, maximums, errors):
+            expected_min, _, expected_max, _ = vf.theoretical_min_max(permutation)
+            self.assertAlmostEqual(minimum, expected_min)
+            self.assertAlmostEqual(maximum, expected_max)
+            self.assertAlmostEqual(error, max(abs(0.4 - expected_min), abs(0.4 - expected_max)) / 0.4)
+        return vf
+
+    def test_function_without_monotonicity(self):
+        self.assert_matches_theoretical_min_max(lambda a, b: float(b) / (float(a) + float(b)), [INVENTORY, INVENTORY])
+
+    def test_declared_monotonicity(self):
+        self.assert_matches_theoretical_min_max(lambda a, b: float(b) / (float(a) + float(b)), [CHAINS, INVENTORY],
+                                                monotonicity=(-1, 1))
+
+    def test_monotonic_expression(self):
+        self.assert_matches_theoretical_min_max(Expression("1 / (1 + top / bottom)", variables=("top", "bottom")),
+                                                [CHAINS, INVENTORY])
+
+    def test_non_monotonic_function(self):
+        # Every corner is evaluated, for expressions and plain functions alike
+        self.assert_matches_theoretical_min_max(Expression("(a - b) ** 2 / 10 ** 6"), [INVENTORY, INVENTORY])
+        self.assert_matches_theoretical_min_max(lambda a, b: (float(a) - float(b)) ** 2 / 10 ** 6,
+                                                [INVENTORY, INVENTORY])
+
+    def test_results_are_the_default_permutations(self):
+        vf = ValueFilter(0.4, [INVENTORY, INVENTORY], lambda a, b: float(b) / (float(a) + float(b)), [], 5)
+        vf.populate_results()
+        expected = [max(abs(0.4 - low), abs(0.4 - high)) / 0.4
+                    for low, _, high, _ in (vf.theoretical_min_max(p) for _, _, p in vf.results.items())]
+        for error, expected_error in zip(vf.worst_case_errors(), expected):
+            self.assertAlmostEqual(error, expected_error)
+        self.assertEqual(len(vf.worst_case_errors()), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()